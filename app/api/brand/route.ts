@@ -2,7 +2,11 @@ import { NextRequest, NextResponse } from 'next/server';
 import { applySparkEnBranding } from '@/lib/pdf-branding';
 import { convertMarkdownToPdf } from '@/lib/markdown-to-pdf';
 import { convertMarkdownToPdfEnhanced } from '@/lib/enhanced-markdown-pdf';
-import { generatePythonPDF, checkPythonAvailability } from '@/lib/python-bridge';
+import { promises as fs } from 'fs';
+import {
+  renderPythonPDFToFile, openPDFStream, checkPythonAvailability, RenderBudgetError, MAX_INPUT_BYTES,
+  PythonPDFFileResult
+} from '@/lib/python-bridge';
 import { cleanPdfArtifacts } from '@/lib/clean-text';
 
 // Force Node.js runtime for fs access
@@ -30,10 +34,28 @@ function sanitizeText(text: string): string {
     .replace(/[^\x00-\xFF]/g, ''); // Remove any remaining non-Latin characters
 }
 
+// Structured response for renders rejected by a resource budget
+function budgetErrorResponse(error: RenderBudgetError) {
+  return NextResponse.json(
+    {
+      error: 'Document exceeds render limits',
+      limit: error.limit,
+      value: error.value,
+      budget: error.budget,
+      details: error.message
+    },
+    { status: error.limit === 'max_input_bytes' ? 413 : 422 }
+  );
+}
+
 export async function POST(request: NextRequest) {
   try {
     const formData = await request.formData();
     const file = formData.get('file') as File;
+    
+    // Optional quick-look mode: same pagination, no watermark/logos, optional page limit
+    const draft = formData.get('draft') === 'true';
+    const draftPages = Number(formData.get('draftPages')) || undefined;
 
     if (!file) {
       return NextResponse.json(
@@ -41,8 +63,15 @@ export async function POST(request: NextRequest) {
         { status: 400 }
       );
     }
+    
+    // Reject oversized uploads before reading them
+    if (file.size > MAX_INPUT_BYTES) {
+      return budgetErrorResponse(new RenderBudgetError('max_input_bytes', file.size, MAX_INPUT_BYTES));
+    }
 
-    let brandedPdfBytes: Uint8Array;
+    let brandedPdfBytes: Uint8Array | undefined;
+    let pdfFile: PythonPDFFileResult | undefined;  // Python renders are streamed from a file
+    let contentHash: string | undefined;  // Set for deterministic Python renders
 
     // Route to appropriate generator based on file type
     if (file.name.toLowerCase().endsWith('.md') || file.name.toLowerCase().endsWith('.txt')) {
@@ -70,13 +99,21 @@ export async function POST(request: NextRequest) {
               .replace(/\b\w/g, (char) => char.toUpperCase());
           }
           
-          brandedPdfBytes = await generatePythonPDF(markdownText, {
+          pdfFile = await renderPythonPDFToFile(markdownText, {
             title: title,
             subtitle: subtitleMatch ? subtitleMatch[1].trim() : undefined,
-            theme: 'formal' // Default to formal (purple) theme
+            theme: 'formal', // Default to formal (purple) theme
+            draft,
+            draftPages,
+            linearize: !draft  // Browsers can show page 1 of a large report while the rest downloads
           });
-          console.log('Python PDF generated, size:', brandedPdfBytes.length);
+          contentHash = pdfFile.contentHash;
+          console.log('Python PDF generated, size:', pdfFile.size);
         } catch (error) {
+          // Over-budget documents would be just as expensive for the fallback converter
+          if (error instanceof RenderBudgetError) {
+            return budgetErrorResponse(error);
+          }
           console.error('Python PDF generation failed, falling back to Enhanced TypeScript:', error);
           // Fallback to ENHANCED TypeScript converter (with tables and bold)
           let markdownText = await file.text();
@@ -173,10 +210,24 @@ export async function POST(request: NextRequest) {
       .replace(/[^a-zA-Z0-9-_. ]/g, '-')   // Replace special chars with dash
       .trim();
     
-    return new NextResponse(Buffer.from(brandedPdfBytes), {
+    // Deterministic renders are identified by their content hash, so repeat
+    // downloads of an unchanged document can be answered with 304
+    const etag = contentHash ? `"${contentHash}"` : undefined;
+    if (etag && request.headers.get('if-none-match') === etag) {
+      if (pdfFile) {
+        await fs.rm(pdfFile.path, { force: true });
+      }
+      return new NextResponse(null, { status: 304, headers: { ETag: etag } });
+    }
+    
+    // Python renders stream from the file the generator wrote, without copying the PDF into memory
+    const body = pdfFile ? await openPDFStream(pdfFile.path) : Buffer.from(brandedPdfBytes!);
+    return new NextResponse(body, {
       headers: {
         'Content-Type': 'application/pdf',
+        'Content-Length': String(pdfFile ? pdfFile.size : brandedPdfBytes!.length),
         'Content-Disposition': `attachment; filename="sparken-branded-${safeFilename}.pdf"`,
+        ...(etag ? { ETag: etag } : {}),
       },
     });
   } catch (error) {
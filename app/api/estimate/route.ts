@@ -0,0 +1,54 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { estimatePythonPDF, checkPythonAvailability, RenderBudgetError, MAX_INPUT_BYTES } from '@/lib/python-bridge';
+
+// Force Node.js runtime for child processes
+export const runtime = 'nodejs';
+
+/**
+ * Predict page count and render time for an upload before it is branded
+ *
+ * Accepts the same form fields as /api/brand. Only Markdown/Text files are
+ * rendered by the Python generator, so other files get a 204. The layout pass
+ * is skipped, but cleaning and Python start-up are not, so small documents
+ * cost nearly as much as rendering them.
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const formData = await request.formData();
+    const file = formData.get('file') as File;
+    const draft = formData.get('draft') === 'true';
+    const draftPages = Number(formData.get('draftPages')) || undefined;
+
+    if (!file) {
+      return NextResponse.json({ error: 'No file provided' }, { status: 400 });
+    }
+    if (!/\.(md|txt)$/i.test(file.name) || !(await checkPythonAvailability())) {
+      return new NextResponse(null, { status: 204 });
+    }
+    if (file.size > MAX_INPUT_BYTES) {
+      throw new RenderBudgetError('max_input_bytes', file.size, MAX_INPUT_BYTES);
+    }
+
+    // Same cover title /api/brand uses, so the estimate counts the cover page
+    const markdownText = await file.text();
+    const titleMatch = markdownText.match(/^#\s+(.+)$/m);
+    const title = titleMatch
+      ? titleMatch[1].trim()
+      : file.name.replace(/\.(md|txt)$/i, '').replace(/[-_]/g, ' ');
+
+    const estimate = await estimatePythonPDF(markdownText, { title, draft, draftPages });
+    return NextResponse.json(estimate);
+  } catch (error) {
+    if (error instanceof RenderBudgetError) {
+      return NextResponse.json(
+        { error: 'Document exceeds render limits', limit: error.limit, value: error.value, budget: error.budget },
+        { status: error.limit === 'max_input_bytes' ? 413 : 422 }
+      );
+    }
+    console.error('Estimate failed:', error);
+    return NextResponse.json(
+      { error: 'Failed to estimate document', details: error instanceof Error ? error.message : 'Unknown error' },
+      { status: 500 }
+    );
+  }
+}
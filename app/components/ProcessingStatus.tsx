@@ -1,12 +1,20 @@
 'use client';
 
+// Layout estimate from /api/estimate
+export interface RenderEstimate {
+  pages: number;
+  tocPages: number;
+  costMs: number;
+}
+
 interface ProcessingStatusProps {
   status: 'idle' | 'processing' | 'complete' | 'error';
   message?: string;
   fileName?: string;
+  estimate?: RenderEstimate;
 }
 
-export default function ProcessingStatus({ status, message, fileName }: ProcessingStatusProps) {
+export default function ProcessingStatus({ status, message, fileName, estimate }: ProcessingStatusProps) {
   if (status === 'idle') return null;
 
   return (
@@ -37,7 +45,10 @@ export default function ProcessingStatus({ status, message, fileName }: Processi
             'text-[#5E5592]'
           }`}>
             {message || (
-              status === 'processing' ? 'Applying branding...' :
+              status === 'processing' ? (estimate
+                ? `Applying branding... (about ${estimate.pages} page${estimate.pages === 1 ? '' : 's'}` +
+                  `${estimate.costMs >= 1000 ? `, ~${Math.round(estimate.costMs / 1000)}s` : ''})`
+                : 'Applying branding...') :
               status === 'complete' ? fileName ? `✓ ${fileName}` : 'Branding complete' :
               'Processing failed'
             )}
@@ -2,7 +2,7 @@
 
 import { useState } from 'react';
 import FileUpload from './components/FileUpload';
-import ProcessingStatus from './components/ProcessingStatus';
+import ProcessingStatus, { RenderEstimate } from './components/ProcessingStatus';
 
 type ProcessingState = 'idle' | 'processing' | 'complete' | 'error';
 
@@ -11,18 +11,26 @@ export default function Home() {
   const [fileName, setFileName] = useState<string>('');
   const [brandedFileUrl, setBrandedFileUrl] = useState<string>('');
   const [errorMessage, setErrorMessage] = useState<string>('');
+  const [estimate, setEstimate] = useState<RenderEstimate | undefined>();
 
   const handleFileAccepted = async (file: File) => {
     setFileName(file.name);
     setProcessingState('processing');
     setErrorMessage('');
     setBrandedFileUrl('');
+    setEstimate(undefined);
 
     try {
       // Create form data
       const formData = new FormData();
       formData.append('file', file);
 
+      // Predicted size, shown while branding runs (best-effort; skips layout but still starts Python)
+      fetch('/api/estimate', { method: 'POST', body: formData })
+        .then((response) => (response.status === 200 ? response.json() : undefined))
+        .then((result) => setEstimate(result))
+        .catch(() => undefined);
+
       // Send to branding API
       const response = await fetch('/api/brand', {
         method: 'POST',
@@ -63,6 +71,7 @@ export default function Home() {
     setFileName('');
     setBrandedFileUrl('');
     setErrorMessage('');
+    setEstimate(undefined);
     if (brandedFileUrl) {
       URL.revokeObjectURL(brandedFileUrl);
     }
@@ -106,6 +115,7 @@ export default function Home() {
           status={processingState}
           fileName={fileName}
           message={errorMessage || undefined}
+          estimate={estimate}
         />
 
         {/* Actions */}
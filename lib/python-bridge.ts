@@ -3,13 +3,96 @@
  */
 
 import { spawn } from 'child_process';
+import { randomUUID } from 'crypto';
+import { promises as fs } from 'fs';
+import os from 'os';
 import path from 'path';
+import { Readable } from 'stream';
 
 export interface PythonPDFOptions {
   title?: string;
   subtitle?: string;
   theme?: 'formal' | 'creative';
   includeToc?: boolean;  // Whether to include table of contents (default: true)
+  draft?: boolean;       // Fast preview: no watermark/logos, plain tables, same pagination
+  draftPages?: number;   // With draft, only render the first N pages
+  pageSize?: 'letter' | 'a4';
+  colors?: Record<string, string>;  // Brand color overrides, e.g. { BRAND_PURPLE: '#1F3A93' }
+  deterministic?: boolean;  // Byte-identical output for identical input (default: true)
+  inputFormat?: 'markdown' | 'csv' | 'tsv';  // csv/tsv: render the content as one branded table
+  linearize?: boolean;   // Fast web view: viewers can show page 1 before the rest has downloaded
+}
+
+export interface PythonPDFResult {
+  pdf: Uint8Array;
+  contentHash: string;  // sha256 of the PDF bytes - stable for deterministic renders
+  pages: number;
+}
+
+/**
+ * A PDF the generator wrote to a file instead of stdout
+ */
+export interface PythonPDFFileResult {
+  path: string;         // File holding the PDF - the caller owns it and must remove it
+  size: number;         // PDF size in bytes
+  contentHash: string;  // sha256 of the PDF bytes - stable for deterministic renders
+  pages: number;
+}
+
+/**
+ * Predicted size and cost of a render, from the layout estimator
+ */
+export interface PythonPDFEstimate {
+  pages: number;     // Estimated page count, including cover and TOC
+  tocPages: number;  // Estimated table of contents pages
+  costMs: number;    // Estimated generator layout time in milliseconds
+}
+
+export type PreviewFormat = 'html' | 'text';
+
+// Where file renders are written; point at a tmpfs such as /dev/shm to keep them off disk
+const OUTPUT_DIR = process.env.SPARKEN_OUTPUT_DIR || os.tmpdir();
+
+// Exit code the generator uses when a render goes over a resource budget (see python/guardrails.py)
+const BUDGET_EXIT_CODE = 3;
+
+// Input size budget; the generator enforces the same SPARKEN_MAX_INPUT_BYTES limit
+export const MAX_INPUT_BYTES = Number(process.env.SPARKEN_MAX_INPUT_BYTES) || 10 * 1024 * 1024;
+
+/**
+ * A render was rejected for going over one of its resource budgets
+ * (input bytes, blocks, table cells, pages, wall time or memory)
+ */
+export class RenderBudgetError extends Error {
+  limit: string;
+  value: number | null;
+  budget: number;
+
+  constructor(limit: string, value: number | null, budget: number, message?: string) {
+    super(message || `${limit} exceeded: ${value} > ${budget}`);
+    this.name = 'RenderBudgetError';
+    this.limit = limit;
+    this.value = value;
+    this.budget = budget;
+  }
+}
+
+/**
+ * Find the generator's structured budget error in its stderr output
+ */
+function parseBudgetError(stderr: string): RenderBudgetError | null {
+  const lines = stderr.trim().split('\n').reverse();
+  for (const line of lines) {
+    try {
+      const report = JSON.parse(line);
+      if (report && report.error === 'budget_exceeded') {
+        return new RenderBudgetError(report.limit, report.value, report.budget, report.message);
+      }
+    } catch {
+      // Not a JSON line - keep looking
+    }
+  }
+  return null;
 }
 
 /**
@@ -58,46 +141,37 @@ async function cleanPdfArtifacts(content: string): Promise<string> {
 }
 
 /**
- * Generate a PDF using the Python ReportLab generator
+ * Run the Python generator on already-cleaned content
  * 
- * @param markdownContent - Markdown or plain text content
- * @param options - PDF generation options
- * @returns Promise<Uint8Array> - PDF bytes
+ * @param content - Cleaned markdown or plain text content
+ * @param metadata - Metadata passed to the generator as JSON
+ * @returns Promise<Buffer> - Raw stdout of the generator
  */
-export async function generatePythonPDF(
-  markdownContent: string,
-  options: PythonPDFOptions = {}
-): Promise<Uint8Array> {
-  return new Promise(async (resolve, reject) => {
-    // First, clean any PDF artifacts from the content
-    let cleanedContent: string;
-    try {
-      cleanedContent = await cleanPdfArtifacts(markdownContent);
-      console.log('Content cleaned. Original length:', markdownContent.length, 'Cleaned length:', cleanedContent.length);
-    } catch (error) {
-      console.warn('Failed to clean content, using original:', error);
-      cleanedContent = markdownContent;
-    }
-    
-    const pythonScript = path.join(process.cwd(), 'python', 'sparken_pdf_generator.py');
-    
-    // Prepare metadata as JSON
-    const metadata = JSON.stringify({
-      title: options.title,
-      subtitle: options.subtitle,
-      theme: options.theme || 'formal',
-      includeToc: options.includeToc !== undefined ? options.includeToc : true
-    });
+function runGenerator(content: string, metadata: Record<string, unknown>): Promise<Buffer> {
+  return runPythonScript('sparken_pdf_generator.py', ['-', JSON.stringify(metadata)], content);
+}
+
+/**
+ * Run a script from python/, feeding input on stdin
+ * 
+ * @param script - Script file name in python/
+ * @param args - Command-line arguments
+ * @param input - Text written to stdin
+ * @returns Promise<Buffer> - Raw stdout of the script
+ */
+function runPythonScript(script: string, args: string[], input: string): Promise<Buffer> {
+  return new Promise((resolve, reject) => {
+    const pythonScript = path.join(process.cwd(), 'python', script);
     
     // Spawn Python process
-    const pythonProcess = spawn('python3', [pythonScript, '-', metadata], {
+    const pythonProcess = spawn('python3', [pythonScript, ...args], {
       cwd: process.cwd()
     });
     
     const chunks: Buffer[] = [];
     const errorChunks: Buffer[] = [];
     
-    // Collect stdout (PDF bytes)
+    // Collect stdout (PDF bytes or preview text)
     pythonProcess.stdout.on('data', (chunk: Buffer) => {
       chunks.push(chunk);
     });
@@ -112,12 +186,12 @@ export async function generatePythonPDF(
     pythonProcess.on('close', (code: number) => {
       if (code !== 0) {
         const errorMessage = Buffer.concat(errorChunks).toString();
-        reject(new Error(`Python process exited with code ${code}: ${errorMessage}`));
+        const budgetError = code === BUDGET_EXIT_CODE ? parseBudgetError(errorMessage) : null;
+        reject(budgetError || new Error(`Python process exited with code ${code}: ${errorMessage}`));
         return;
       }
       
-      const pdfBytes = Buffer.concat(chunks);
-      resolve(new Uint8Array(pdfBytes));
+      resolve(Buffer.concat(chunks));
     });
     
     // Handle process errors
@@ -125,12 +199,246 @@ export async function generatePythonPDF(
       reject(new Error(`Failed to start Python process: ${error.message}`));
     });
     
-    // Write cleaned content to stdin
-    pythonProcess.stdin.write(cleanedContent);
+    // Write input to stdin
+    pythonProcess.stdin.write(input);
     pythonProcess.stdin.end();
   });
 }
 
+/**
+ * Clean content, falling back to the original if cleaning fails
+ * 
+ * Oversized input is rejected up front, before any Python process is spawned.
+ */
+async function cleanContent(markdownContent: string): Promise<string> {
+  const inputBytes = Buffer.byteLength(markdownContent);
+  if (inputBytes > MAX_INPUT_BYTES) {
+    throw new RenderBudgetError('max_input_bytes', inputBytes, MAX_INPUT_BYTES);
+  }
+  
+  try {
+    const cleanedContent = await cleanPdfArtifacts(markdownContent);
+    console.log('Content cleaned. Original length:', markdownContent.length, 'Cleaned length:', cleanedContent.length);
+    return cleanedContent;
+  } catch (error) {
+    console.warn('Failed to clean content, using original:', error);
+    return markdownContent;
+  }
+}
+
+/**
+ * Generator metadata for a PDF render
+ */
+function pdfMetadata(options: PythonPDFOptions): Record<string, unknown> {
+  return {
+    title: options.title,
+    subtitle: options.subtitle,
+    theme: options.theme || 'formal',
+    includeToc: options.includeToc !== undefined ? options.includeToc : true,
+    draft: options.draft || false,
+    draftPages: options.draftPages,
+    pageSize: options.pageSize || 'letter',
+    colors: options.colors,
+    deterministic: options.deterministic !== undefined ? options.deterministic : true,
+    inputFormat: options.inputFormat || 'markdown',
+    linearize: options.linearize || false,
+  };
+}
+
+/**
+ * Clean markdown of PDF artifacts; CSV/TSV data is passed through untouched
+ */
+async function prepareContent(content: string, options: PythonPDFOptions): Promise<string> {
+  if (options.inputFormat === 'csv' || options.inputFormat === 'tsv') {
+    return content;
+  }
+  return cleanContent(content);
+}
+
+/**
+ * Generate a PDF using the Python ReportLab generator
+ * 
+ * @param markdownContent - Markdown or plain text content
+ * @param options - PDF generation options
+ * @returns Promise<Uint8Array> - PDF bytes
+ */
+export async function generatePythonPDF(
+  markdownContent: string,
+  options: PythonPDFOptions = {}
+): Promise<Uint8Array> {
+  const result = await renderPythonPDF(markdownContent, options);
+  return result.pdf;
+}
+
+/**
+ * Generate a PDF and the generator's report on it (content hash, page count)
+ * 
+ * @param markdownContent - Markdown or plain text content
+ * @param options - PDF generation options
+ * @returns Promise<PythonPDFResult> - PDF bytes, sha256 content hash and page count
+ */
+export async function renderPythonPDF(
+  markdownContent: string,
+  options: PythonPDFOptions = {}
+): Promise<PythonPDFResult> {
+  // First, clean any PDF artifacts from the content
+  const cleanedContent = await prepareContent(markdownContent, options);
+  
+  // The generator writes its report next to the PDF it streams to stdout
+  const reportPath = path.join(os.tmpdir(), `sparken-report-${randomUUID()}.json`);
+  try {
+    const pdfBytes = await runGenerator(cleanedContent, { ...pdfMetadata(options), reportPath });
+    const report = JSON.parse(await fs.readFile(reportPath, 'utf8'));
+    return { pdf: new Uint8Array(pdfBytes), contentHash: report.sha256, pages: report.pages };
+  } finally {
+    await fs.rm(reportPath, { force: true });
+  }
+}
+
+/**
+ * Generate a PDF into a file instead of collecting it in memory
+ * 
+ * The generator writes the PDF straight to outputPath and reports only its
+ * path, size, hash and page count, so large PDFs never pass through the pipe
+ * or Node buffers. Stream the file with openPDFStream.
+ * 
+ * @param markdownContent - Markdown or plain text content
+ * @param options - PDF generation options
+ * @param outputPath - File to write (defaults to a new file in SPARKEN_OUTPUT_DIR or the temp dir)
+ * @returns Promise<PythonPDFFileResult> - Where the PDF is and what it contains
+ */
+export async function renderPythonPDFToFile(
+  markdownContent: string,
+  options: PythonPDFOptions = {},
+  outputPath: string = path.join(OUTPUT_DIR, `sparken-${randomUUID()}.pdf`)
+): Promise<PythonPDFFileResult> {
+  const cleanedContent = await prepareContent(markdownContent, options);
+  
+  try {
+    const output = await runGenerator(cleanedContent, { ...pdfMetadata(options), outputPath });
+    const report = JSON.parse(output.toString('utf-8'));
+    return { path: report.path, size: report.bytes, contentHash: report.sha256, pages: report.pages };
+  } catch (error) {
+    await fs.rm(outputPath, { force: true });
+    throw error;
+  }
+}
+
+/**
+ * Open a rendered PDF file as a web stream for an HTTP response body
+ * 
+ * The file is unlinked as soon as it is open; its space is freed when the
+ * stream finishes or is cancelled.
+ * 
+ * @param pdfPath - Path from renderPythonPDFToFile
+ * @returns Promise<ReadableStream> - PDF bytes, read in chunks
+ */
+export async function openPDFStream(pdfPath: string): Promise<ReadableStream<Uint8Array>> {
+  const handle = await fs.open(pdfPath, 'r');
+  await fs.rm(pdfPath, { force: true });
+  return Readable.toWeb(handle.createReadStream()) as ReadableStream<Uint8Array>;
+}
+
+export interface BinderSection {
+  markdown: string;
+  title?: string;      // Section cover title (replaces the document's own title)
+  subtitle?: string;
+  theme?: 'formal' | 'creative';
+}
+
+export interface PythonBinderOptions extends PythonPDFOptions {
+  pageNumbering?: 'continuous' | 'section';  // One sequence, or "2-5" style per section
+}
+
+/**
+ * Render several documents into one binder PDF in a single Python process
+ * 
+ * Logos and the watermark image are embedded once for the whole binder, and
+ * sections are cleaned in-process instead of spawning a cleaner per document.
+ * 
+ * @param sections - Documents in binder order
+ * @param options - Binder cover (title/subtitle/theme), TOC, numbering and render options
+ * @returns Promise<PythonPDFResult> - PDF bytes, sha256 content hash and page count
+ */
+export async function renderPythonBinder(
+  sections: BinderSection[],
+  options: PythonBinderOptions = {}
+): Promise<PythonPDFResult> {
+  const reportPath = path.join(os.tmpdir(), `sparken-report-${randomUUID()}.json`);
+  const manifest = JSON.stringify({
+    title: options.title,
+    subtitle: options.subtitle,
+    theme: options.theme || 'formal',
+    includeToc: options.includeToc !== undefined ? options.includeToc : true,
+    pageNumbering: options.pageNumbering || 'continuous',
+    draft: options.draft || false,
+    pageSize: options.pageSize || 'letter',
+    colors: options.colors,
+    deterministic: options.deterministic !== undefined ? options.deterministic : true,
+    linearize: options.linearize || false,
+    clean: true,
+    reportPath,
+    sections
+  });
+  const inputBytes = Buffer.byteLength(manifest);
+  if (inputBytes > MAX_INPUT_BYTES) {
+    throw new RenderBudgetError('max_input_bytes', inputBytes, MAX_INPUT_BYTES);
+  }
+  
+  try {
+    const pdfBytes = await runPythonScript('binder.py', ['-'], manifest);
+    const report = JSON.parse(await fs.readFile(reportPath, 'utf8'));
+    return { pdf: new Uint8Array(pdfBytes), contentHash: report.sha256, pages: report.pages };
+  } finally {
+    await fs.rm(reportPath, { force: true });
+  }
+}
+
+/**
+ * Render a quick preview straight from the parsed document, without PDF layout
+ * 
+ * @param markdownContent - Markdown or plain text content
+ * @param format - 'html' for a styled page, 'text' for plain text
+ * @param options - Title/subtitle overrides
+ * @returns Promise<string> - Rendered preview
+ */
+export async function generatePythonPreview(
+  markdownContent: string,
+  format: PreviewFormat = 'html',
+  options: PythonPDFOptions = {}
+): Promise<string> {
+  const cleanedContent = await cleanContent(markdownContent);
+  
+  const output = await runGenerator(cleanedContent, {
+    title: options.title,
+    subtitle: options.subtitle,
+    format
+  });
+  return output.toString('utf-8');
+}
+
+/**
+ * Predict a render's page count, TOC size and layout cost without rendering it
+ * 
+ * Skips layout, but still spawns the cleaner and the generator, so each call
+ * costs two Python start-ups (a few hundred milliseconds). It is only much
+ * cheaper than the render for documents that take seconds to lay out.
+ * 
+ * @param markdownContent - Markdown or plain text content
+ * @param options - PDF generation options
+ * @returns Promise<PythonPDFEstimate> - Estimated pages, TOC pages and cost
+ */
+export async function estimatePythonPDF(
+  markdownContent: string,
+  options: PythonPDFOptions = {}
+): Promise<PythonPDFEstimate> {
+  const cleanedContent = await cleanContent(markdownContent);
+  
+  const output = await runGenerator(cleanedContent, { ...pdfMetadata(options), format: 'estimate' });
+  const estimate = JSON.parse(output.toString('utf-8'));
+  return { pages: estimate.pages, tocPages: estimate.tocPages, costMs: estimate.costMs };
+}
+
 /**
  * Check if Python and required packages are available
  * 
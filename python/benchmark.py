@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+Sparken PDF Benchmarks
+Micro-benchmarks for the hot paths of the Python PDF pipeline
+
+Usage:
+    python3 python/benchmark.py inline
+    python3 python/benchmark.py coalesce --pages 40
+    python3 python/benchmark.py preview
+    python3 python/benchmark.py draft --pages 80
+    python3 python/benchmark.py binder --sections 30
+    python3 python/benchmark.py sanitize --megabytes 8
+    python3 python/benchmark.py clean --megabytes 100 --workers 8
+    python3 python/benchmark.py logo --pages 40
+    python3 python/benchmark.py images --pages 20
+    python3 python/benchmark.py paragraph
+    python3 python/benchmark.py estimate
+    python3 python/benchmark.py layoutcache --sections 30
+    python3 python/benchmark.py linearize --pages 80 --kbps 1000
+"""
+
+import argparse
+import contextlib
+import copy
+import glob
+import http.client
+import http.server
+import os
+import random
+import re
+import tempfile
+import time
+import textwrap
+import threading
+from io import BytesIO
+
+from reportlab.platypus import Paragraph
+
+from inline_markup import to_paragraph_markup
+from components import BodyTextComponent
+from sparken_pdf_generator import SparkEnPDFGenerator, render_pdf
+from binder import render_binder
+from brand_constants import BrandConfig
+from markdown_parser import parse_markdown, parse_markdown_cached
+from document_ir import DocumentCache
+from preview import render_html
+import images
+from text_sanitizer import sanitize_text
+import clean_pdf_text
+from clean_pdf_text import clean_pdf_artifacts
+from layout_estimator import estimate_layout
+from layout_cache import layout_cache, stats_delta, format_stats
+from linearize import linearize, check_linearized
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _best_of(func, repeat=5, setup=None):
+    """Return the best wall time (seconds) of several runs of func
+
+    When setup is given, its (untimed) result is passed to func on every run.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _sample_lines(count, markup_ratio=0.6, seed=7):
+    """Generate markdown-ish body lines where markup_ratio of the words carry inline markup"""
+    rng = random.Random(seed)
+    words = ('behavioral', 'science', 'creative', 'research', 'campaign', 'client',
+             'insight', 'growth', 'R&D', 'metrics', '<50%', 'brand', 'strategy')
+    decorations = (
+        lambda w: f'**{w}**',
+        lambda w: f'*{w}*',
+        lambda w: f'`{w}`',
+        lambda w: f'[{w}](https://sparken.example/{w})',
+        lambda w: f'\\*{w}\\*',
+    )
+    lines = []
+    for _ in range(count):
+        picked = []
+        for _ in range(rng.randint(8, 24)):
+            word = rng.choice(words)
+            picked.append(rng.choice(decorations)(word) if rng.random() < markup_ratio else word)
+        lines.append(' '.join(picked))
+    return lines
+
+
+def _extracted_text(pages, seed=11):
+    """Generate hard-wrapped, PDF-extracted style text (roughly pages * 3 paragraphs)"""
+    rng = random.Random(seed)
+    vocabulary = ('the', 'client', 'research', 'shows', 'that', 'behavioral', 'nudges',
+                  'increase', 'engagement', 'across', 'every', 'channel', 'we', 'tested',
+                  'and', 'campaign', 'results', 'were', 'consistent', 'with', 'prior', 'work')
+    blocks = []
+    for _ in range(pages * 3):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(60, 140))]
+        blocks.append('\n'.join(textwrap.wrap(' '.join(words).capitalize() + '.', 80)))
+    return '\n\n'.join(blocks)
+
+
+def _giant_paragraph(size, seed=5):
+    """One unbroken paragraph of about size characters, as PDF extraction produces"""
+    rng = random.Random(seed)
+    vocabulary = ('the', 'client', '**research**', 'shows', 'that', 'behavioral', 'nudges',
+                  'increase', '*engagement*', 'across', 'every', 'channel', 'we', 'tested')
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(8, 30))).capitalize() + '.'
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(sentences)
+
+
+def _markdown_table(rows, seed=3):
+    """Generate a four-column markdown pipe table"""
+    rng = random.Random(seed)
+    lines = ['| Metric | Channel | Baseline | Result |', '|---|---|---|---|']
+    for i in range(rows):
+        lines.append(f"| Metric {i} | {rng.choice(('Email', 'Search', 'Social'))} | "
+                     f"{rng.randint(1, 99)}% | **{rng.randint(1, 99)}%** |")
+    return '\n'.join(lines)
+
+
+def _render(story):
+    """Lay out a prepared story with the standard page chrome"""
+    generator = SparkEnPDFGenerator(BytesIO(), include_toc=False)
+    generator.story = list(story)
+    return generator.generate()
+
+
+def _report(name, legacy, current):
+    """Print baseline vs. new timings"""
+    print(f"{name:<28} legacy {legacy * 1000:9.2f} ms   current {current * 1000:9.2f} ms   "
+          f"speedup {legacy / current:5.2f}x")
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def _legacy_strip_inline(line):
+    """The multi-regex path parse_markdown used before the single-pass converter"""
+    line = re.sub(r'\*\*(.+?)\*\*', r'\1', line)
+    line = re.sub(r'\*(.+?)\*', r'\1', line)
+    line = re.sub(r'`(.+?)`', r'\1', line)
+    line = re.sub(r'\\([~=\-+*_\[\](){}|<>$#@!&^%])', r'\1', line)
+    line = re.sub(r'(\d+)\\.', r'\1.', line)
+    return line
+
+
+def bench_inline(args):
+    """Single-pass inline converter vs. the old strip-only regex chain"""
+    for label, ratio in (('full', 1.0), ('dense', 0.6), ('prose', 0.1)):
+        lines = _sample_lines(args.lines, markup_ratio=ratio)
+        legacy = _best_of(lambda: [_legacy_strip_inline(line) for line in lines])
+        current = _best_of(lambda: [to_paragraph_markup(line) for line in lines])
+        _report(f"inline {label} ({args.lines} lines)", legacy, current)
+
+
+def bench_coalesce(args):
+    """Layout time for one Paragraph per source line vs. coalesced paragraphs"""
+    text = _extracted_text(args.pages)
+
+    # Flowables carry layout state, so each run gets a freshly built story
+    def per_line():
+        return [BodyTextComponent.create(to_paragraph_markup(line))
+                for line in text.split('\n') if line.strip()]
+
+    def coalesced():
+        generator = SparkEnPDFGenerator(BytesIO(), include_toc=False)
+        generator.add_content_from_markdown(text)
+        return generator.story
+
+    legacy = _best_of(_render, repeat=3, setup=per_line)
+    current = _best_of(_render, repeat=3, setup=coalesced)
+    print(f"flowables: {len(per_line())} per-line vs {len(coalesced())} coalesced")
+    _report(f"coalesce ({args.pages} pages)", legacy, current)
+
+
+def bench_preview(args):
+    """Full PDF build vs. HTML preview from the IR (uncached and cached parse)"""
+    text = '# Benchmark Report\n\n' + _extracted_text(args.pages)
+
+    def full_pdf():
+        generator = SparkEnPDFGenerator(BytesIO())
+        generator.add_content_from_markdown(text)
+        generator.generate()
+
+    cache = DocumentCache()
+    parse_markdown_cached(text, cache)
+    pdf = _best_of(full_pdf, repeat=3)
+    uncached = _best_of(lambda: render_html(parse_markdown(text)))
+    cached = _best_of(lambda: render_html(parse_markdown_cached(text, cache)))
+    _report(f"preview html ({args.pages} pages)", pdf, uncached)
+    _report("preview html, cached IR", pdf, cached)
+
+
+def bench_draft(args):
+    """Final render vs. draft render vs. draft limited to the first 3 pages"""
+    text = '# Benchmark Report\n\n' + _extracted_text(args.pages) + '\n\n' + _markdown_table(200)
+
+    def render(**options):
+        generator = SparkEnPDFGenerator(BytesIO(), **options)
+        generator.add_content_from_markdown(text)
+        return generator.generate()
+
+    final = _best_of(render, repeat=3)
+    draft = _best_of(lambda: render(draft=True), repeat=3)
+    first_pages = _best_of(lambda: render(draft=True, max_pages=3), repeat=3)
+    _report(f"draft ({args.pages} pages)", final, draft)
+    _report("draft, first 3 pages", final, first_pages)
+
+
+def bench_binder(args):
+    """Separate renders (sizes summed, as a lower bound for concatenation) vs. one binder"""
+    sections = [f"# Proposal {i}\n\n## Client {i}\n\n" + _extracted_text(3, seed=i)
+                for i in range(args.sections)]
+    sizes = {}
+
+    def separate():
+        sizes['separate'] = sum(len(render_pdf(text, {'includeToc': False}).pdf) for text in sections)
+
+    def binder():
+        sizes['binder'] = len(render_binder({'sections': [{'markdown': text} for text in sections]}).pdf)
+
+    legacy = _best_of(separate, repeat=3)
+    current = _best_of(binder, repeat=3)
+    print(f"output: {sizes['separate'] / 1024:.0f} KB separate vs {sizes['binder'] / 1024:.0f} KB binder")
+    _report(f"binder ({args.sections} sections)", legacy, current)
+
+
+# The replace chain route.ts runs before sending text to the WinAnsi fonts
+_LEGACY_SANITIZE = (('\t', '    '), ('→', '->'), ('←', '<-'), ('↑', '^'), ('↓', 'v'), ('⇒', '=>'),
+                    ('⇐', '<='), ('•', '*'), ('…', '...'), ('“', '"'), ('”', '"'), ('‘', "'"),
+                    ('’', "'"), ('—', '-'), ('–', '-'))
+_NON_LATIN = re.compile(r'[^\x00-\xff]')
+
+
+def _legacy_sanitize(text):
+    for old, new in _LEGACY_SANITIZE:
+        text = text.replace(old, new)
+    return _NON_LATIN.sub('', text)
+
+
+def bench_sanitize(args):
+    """Translation-table sanitizer vs. the route.ts replace chain on multi-megabyte text"""
+    rng = random.Random(5)
+    size = args.megabytes * 1024 * 1024
+    typographic = ('“quoted” insight', 'growth — and more…', '• bullet', 'it’s')
+    symbols = ('A → B ⟶ C', 'Δ = 5μs', 'ﬁnal ﬂow', '◦ sub item', '①', '中文', 'x\u200by')
+    # (label, special words, share of words that are special)
+    samples = (('typographic', typographic, 0.1), ('symbols 1%', symbols, 0.01), ('symbols 10%', symbols, 0.1))
+    for label, specials, ratio in samples:
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(specials) if rng.random() < ratio else rng.choice(('campaign', 'results', 'were'))
+            words.append(word)
+            length += len(word) + 1
+        text = ' '.join(words)
+        megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+        legacy = _best_of(lambda: _legacy_sanitize(text), repeat=3)
+        current = _best_of(lambda: sanitize_text(text), repeat=3)
+        _report(f"sanitize {label} ({megabytes:.0f} MB)", legacy, current)
+        print(f"{'':<28} legacy {megabytes / legacy:6.0f} MB/s   current {megabytes / current:6.0f} MB/s")
+
+
+def _extracted_pages(size, seed=13):
+    """PDF-extracted text of about size characters, with TOC numbers, footers and page markers"""
+    rng = random.Random(seed)
+    body = _extracted_text(6, seed=seed)
+    pages = []
+    length = 0
+    while length < size:
+        number = len(pages) + 1
+        start = rng.randrange(len(body) // 2)
+        page = (f"**[SECTION {number} OVERVIEW\nAND FINDINGS](#section-{number})**\nRESULTS &amp; METHODS\n{number}\n\n"
+                f"{body[start:start + 3000]}\n•\n--\n\nPage {number} of 9999 Sparken\n-- {number} of 9999 --\n")
+        pages.append(page)
+        length += len(page)
+    return ''.join(pages)
+
+
+def bench_clean(args):
+    """Serial vs. chunked multi-process cleaning of a large extracted-text upload"""
+    text = _extracted_pages(args.megabytes * 1024 * 1024)
+    megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+    serial_part = _best_of(lambda: clean_pdf_text._strip_links(text), repeat=1)
+    started = time.perf_counter()
+    expected = clean_pdf_artifacts(text)
+    legacy = time.perf_counter() - started
+    started = time.perf_counter()
+    cleaned = clean_pdf_artifacts(text, workers=args.workers)
+    current = time.perf_counter() - started
+    assert cleaned == expected, 'parallel cleaning changed the output'
+    _report(f"clean {args.workers} workers ({megabytes:.0f} MB)", legacy, current)
+    print(f"{'':<28} {len(clean_pdf_text._split(text, clean_pdf_text.CHUNK_CHARS))} chunks, "
+          f"whole-text link pass {serial_part * 1000:.0f} ms")
+
+
+def bench_logo(args):
+    """Raster PNG logos vs. the vector SVG logo drawn through PDF forms"""
+    text = '# Benchmark Report\n\n' + _extracted_text(args.pages)
+    raster = BrandConfig()
+    vector = copy.copy(raster)
+    vector.assets = raster._load_logos(vector=True)
+    sizes = {}
+
+    def render(config):
+        generator = SparkEnPDFGenerator(BytesIO(), config=config)
+        generator.add_content_from_markdown(text)
+        sizes[config is vector] = len(generator.generate())
+
+    legacy = _best_of(lambda: render(raster), repeat=3)
+    current = _best_of(lambda: render(vector), repeat=3)
+    print(f"output: {sizes[False] / 1024:.0f} KB raster vs {sizes[True] / 1024:.0f} KB vector")
+    _report(f"logo ({args.pages} pages)", legacy, current)
+
+
+def bench_images(args):
+    """Rendering a document that repeats a large chart: no image cache vs. a warm shared cache"""
+    from PIL import Image, ImageDraw
+    with tempfile.TemporaryDirectory() as image_dir:
+        chart = Image.new('RGB', (3000, 1800), 'white')
+        draw = ImageDraw.Draw(chart)
+        for i in range(10):
+            draw.rectangle([100 + i * 280, 1700 - i * 150, 300 + i * 280, 1700], fill=(94, 85, 146))
+        chart.save(os.path.join(image_dir, 'chart.png'))
+        text = '\n\n'.join(f"## Chart {i}\n\n{_extracted_text(1, seed=i)}\n\n![Chart](chart.png)"
+                             for i in range(args.pages))
+
+        def render(cache):
+            images.image_cache = cache
+            render_pdf(text, {'imageDir': image_dir, 'includeToc': False})
+
+        shared = images.ImageCache()
+        render(shared)
+        try:
+            legacy = _best_of(lambda: render(images.ImageCache(max_bytes=0)), repeat=3)
+            current = _best_of(lambda: render(shared), repeat=3)
+        finally:
+            images.image_cache = shared
+    print(f"cache: {shared.bytes / 1024 / 1024:.1f} MB for {len(shared)} image(s)")
+    _report(f"images ({args.pages} charts)", legacy, current)
+
+
+def bench_paragraph(args):
+    """Layout time per KB for one giant paragraph: ReportLab's Paragraph vs. one reusing its line breaks"""
+    style = BodyTextComponent.style()
+    for kilobytes in (1, 4, 16, 64, 256, 1024):
+        markup = to_paragraph_markup(_giant_paragraph(kilobytes * 1024))
+        repeat = 3 if kilobytes < 256 else 1
+        current = _best_of(_render, repeat=repeat, setup=lambda: [BodyTextComponent.create(markup)])
+        line = (f"paragraph {kilobytes:>5} KB   "
+                f"current {current * 1000:9.1f} ms ({current / kilobytes * 1000:6.2f} ms/KB)")
+        # ReportLab re-breaks the rest at every page - beyond 256 KB it takes minutes
+        if kilobytes <= 256:
+            legacy = _best_of(_render, repeat=repeat, setup=lambda: [Paragraph(markup, style)])
+            line += f"   legacy {legacy * 1000:9.1f} ms ({legacy / kilobytes * 1000:6.2f} ms/KB)"
+        print(line)
+
+
+def bench_estimate(args):
+    """Layout estimator accuracy and speed against real renders of the test documents and generated inputs"""
+    tests_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests')
+    documents = []
+    for path in sorted(glob.glob(os.path.join(tests_dir, '*.md'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            documents.append((os.path.basename(path), f.read()))
+    documents += [(f"extracted {pages} pages", '# Report\n\n' + _extracted_text(pages)) for pages in (5, 20, 60)]
+    documents += [(f"table {rows} rows", '# Data\n\n## Results\n\n' + _markdown_table(rows)) for rows in (20, 200)]
+    documents += [('giant paragraph 64 KB', _giant_paragraph(64 * 1024)),
+                  ('dense markup', '# Notes\n\n' + '\n\n'.join(_sample_lines(400)))]
+
+    page_errors, cost_errors = [], []
+    for name, text in documents:
+        document = parse_markdown(text)
+        estimate_time = _best_of(lambda: estimate_layout(document), repeat=3)
+        estimate = estimate_layout(document)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+            render_time = _best_of(lambda: render_pdf(text), repeat=3)
+            pages = render_pdf(text).pages
+        page_errors.append(abs(estimate.pages - pages))
+        cost_errors.append(abs(estimate.cost_ms / (render_time * 1000) - 1))
+        print(f"{name[:26]:<26} pages {estimate.pages:4d} est {pages:4d} real   "
+              f"cost {estimate.cost_ms:8.1f} est {render_time * 1000:8.1f} real ms   "
+              f"estimate {estimate_time * 1000:6.2f} ms ({render_time / estimate_time:5.0f}x faster)")
+    print(f"page error: mean {sum(page_errors) / len(page_errors):.2f}, max {max(page_errors)} pages; "
+          f"cost error: mean {sum(cost_errors) / len(cost_errors) * 100:.0f}%, "
+          f"max {max(cost_errors) * 100:.0f}%")
+
+
+def _proposal(i, boilerplate):
+    """A proposal: client-specific text framed by the shared boilerplate sections"""
+    return (f"# Proposal {i}\n\n## Overview\n\n{_extracted_text(2, seed=i)}\n\n{boilerplate}\n\n"
+            f"## Findings\n\n{_extracted_text(2, seed=1000 + i)}")
+
+
+def bench_layoutcache(args):
+    """Rendering proposals that share boilerplate sections: no layout cache vs. a cache warmed by earlier renders"""
+    boilerplate = '\n\n'.join([
+        '## Methodology', '\n\n'.join(_sample_lines(12, seed=21)),
+        '## Standard Rates', _markdown_table(40),
+        '## Terms', '\n'.join(f"- {line}" for line in _sample_lines(15, markup_ratio=0.2, seed=22)),
+        '## Disclaimer', '> ' + ' '.join(_sample_lines(3, markup_ratio=0, seed=23)),
+    ])
+    batches = [[_proposal(batch * args.sections + i, boilerplate) for i in range(args.sections)]
+               for batch in range(4)]
+
+    def render_all(proposals):
+        for text in proposals:
+            render_pdf(text, {'includeToc': False})
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        legacy = _best_of(lambda: render_all(batches[0]), repeat=3)
+        layout_cache.max_entries = 2048
+        try:
+            render_all(batches[0])  # Earlier proposals left the boilerplate in the cache
+            before = layout_cache.stats()
+            # New proposals every run, so only the boilerplate can hit
+            unseen = iter(batches[1:])
+            current = _best_of(lambda: render_all(next(unseen)), repeat=3)
+            delta = stats_delta(before, layout_cache.stats())
+        finally:
+            layout_cache.max_entries = 0
+            layout_cache._entries.clear()
+    print(format_stats(delta))
+    _report(f"layoutcache ({args.sections} proposals)", legacy, current)
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the benchmark's PDFs with Range support over a simulated slow link"""
+
+    def do_GET(self):
+        pdf = self.server.files[self.path]
+        start, end = 0, len(pdf) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(pdf)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        time.sleep(self.server.rtt)
+        chunk = 8192
+        for offset in range(start, end + 1, chunk):
+            piece = pdf[offset:min(offset + chunk, end + 1)]
+            self.wfile.write(piece)
+            time.sleep(len(piece) / self.server.bytes_per_second)
+
+    def log_message(self, *args):
+        pass
+
+
+def _fetch(connection, path, first=None, last=None):
+    """GET path (optionally a byte range) and return the body"""
+    headers = {'Range': f"bytes={first}-{last}"} if first is not None else {}
+    connection.request('GET', path, headers=headers)
+    return connection.getresponse().read()
+
+
+def bench_linearize(args):
+    """Time to first page over a slow link: plain PDF (whole file) vs. linearized (first /E bytes)"""
+    text = '\n\n'.join(f"## Section {i}\n\n{_extracted_text(2, seed=i)}\n\n{_markdown_table(10, seed=i)}"
+                        for i in range(max(1, args.pages // 2)))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        result = render_pdf(text, {'title': 'Benchmark Report', 'deterministic': True})
+    cost = _best_of(lambda: linearize(result.pdf), repeat=3)
+    linearized = linearize(result.pdf)
+    params = check_linearized(linearized)
+    print(f"linearize: {result.pages} pages, {len(result.pdf)} -> {len(linearized)} bytes "
+          f"in {cost * 1000:.1f} ms; first page section {params['E']} bytes")
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+    server.files = {'/plain.pdf': result.pdf, '/linearized.pdf': linearized}
+    server.bytes_per_second = args.kbps * 1000 / 8
+    server.rtt = 0.05
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+
+        def plain():
+            # Without linearization a viewer needs the whole file for page 1
+            _fetch(connection, '/plain.pdf')
+
+        def fast_web_view():
+            # The first 1024 bytes hold the linearization dictionary; page 1 ends at /E
+            head = _fetch(connection, '/linearized.pdf', 0, 1023)
+            end = int(re.search(rb'/E\s+(\d+)', head).group(1))
+            _fetch(connection, '/linearized.pdf', 1024, end - 1)
+
+        legacy = _best_of(plain, repeat=3)
+        current = _best_of(fast_web_view, repeat=3)
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    _report(f"first page at {args.kbps} kbit/s", legacy, current)
+
+
+BENCHMARKS = {
+    'inline': bench_inline,
+    'coalesce': bench_coalesce,
+    'preview': bench_preview,
+    'draft': bench_draft,
+    'binder': bench_binder,
+    'sanitize': bench_sanitize,
+    'clean': bench_clean,
+    'logo': bench_logo,
+    'images': bench_images,
+    'paragraph': bench_paragraph,
+    'estimate': bench_estimate,
+    'layoutcache': bench_layoutcache,
+    'linearize': bench_linearize,
+}
+
+
+def main():
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f"benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    parser.add_argument('--lines', type=int, default=20000, help='lines of input for text benchmarks')
+    parser.add_argument('--pages', type=int, default=40, help='approximate pages of input for layout benchmarks')
+    parser.add_argument('--sections', type=int, default=30, help='documents per binder')
+    parser.add_argument('--megabytes', type=int, default=8, help='input size for the sanitize and clean benchmarks')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes for the clean benchmark')
+    parser.add_argument('--kbps', type=int, default=1000, help='simulated link speed for the linearize benchmark')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    # Benchmarks repeat renders of the same text; time them without the layout
+    # cache unless it is what is being measured
+    layout_cache.max_entries = 0
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Sparken Binder
+Renders many markdown documents into one branded PDF in a single pass
+
+Every section keeps its own cover page; logos and the watermark image are
+embedded once for the whole binder instead of once per document.
+
+Usage:
+    python3 python/binder.py manifest.json > binder.pdf
+    cat manifest.json | python3 python/binder.py - > binder.pdf
+
+Manifest:
+    {
+      "title": "Client Proposals 2026",       (optional binder cover)
+      "pageNumbering": "continuous",           (or "section")
+      "clean": true,                           (strip PDF-extraction artifacts)
+      "linearize": true,                       (fast web view: page 1 shows before the rest downloads)
+      "outputPath": "/dev/shm/binder.pdf",     (write the PDF there; stdout gets a JSON report)
+      "imageDir": "/srv/assets",               (images of inline sections; off for stdin without it)
+      "sections": [
+        {"markdown": "# Proposal A ...", "title": "Proposal A", "theme": "formal"},
+        {"path": "proposals/b.md", "subtitle": "Prepared For: B"}  (inside the manifest's directory)
+      ]
+    }
+"""
+
+import sys
+import os
+import json
+from io import BytesIO
+
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.platypus import Paragraph, Spacer, PageBreak, Table, TableStyle, Flowable
+from reportlab.platypus.doctemplate import BaseDocTemplate, PageTemplate, NextPageTemplate
+from reportlab.platypus.frames import Frame
+from reportlab.lib.units import inch
+
+from brand_constants import get_config
+from guardrails import BudgetExceeded, RenderLimits, BUDGET_EXIT_CODE, read_limited, cap_address_space
+from inline_markup import escape_markup
+from clean_pdf_text import clean_pdf_artifacts
+from text_sanitizer import sanitize_text
+from components import CoverPageComponent, HeaderComponent, FooterComponent, WatermarkComponent
+from linearize import linearize_or_keep
+from outline import TOC_MARK
+from document_ir import Document
+from markdown_parser import parse_markdown_cached
+from sparken_pdf_generator import SparkEnPDFGenerator, RenderResult
+
+
+PAGE_NUMBERING = ('continuous', 'section')
+
+
+class _PageRef(Flowable):
+    """TOC page number drawn from a form that is only filled in when the binder is saved"""
+
+    def __init__(self, form_name, width, style):
+        Flowable.__init__(self)
+        self.form_name = form_name
+        self.width = width
+        self.style = style
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.style.leading or self.style.fontSize * 1.2
+
+    def draw(self):
+        # Forms are drawn at the current origin; the label is right-aligned at x=0
+        self.canv.saveState()
+        self.canv.translate(self.width, self.height - self.style.fontSize)
+        self.canv.doForm(self.form_name)
+        self.canv.restoreState()
+
+
+class _BinderSection:
+    """One input document: its rendered story, cover data and TOC entries"""
+
+    def __init__(self, index, generator):
+        self.index = index
+        self.story = generator.story
+        self.cover_data = generator.cover_data if generator.has_cover else None
+        if self.cover_data:
+            self.title = self.cover_data['title']
+        else:
+            self.title = generator.metadata.get('title') or f"Section {index + 1}"
+        self.toc_entries = generator.toc_entries
+
+
+class _BinderDocTemplate(BaseDocTemplate):
+    """Doc template that records heading pages and checks the render budget"""
+
+    def __init__(self, filename, binder, **kwargs):
+        BaseDocTemplate.__init__(self, filename, **kwargs)
+        self.binder = binder
+
+    def afterFlowable(self, flowable):
+        key = getattr(flowable, TOC_MARK, None)
+        if key is not None:
+            self.binder._pages.setdefault(key, self.page)
+
+    def afterPage(self):
+        if self.binder.budget:
+            self.binder.budget.check_page(self.page)
+
+    def handle_flowable(self, flowables):
+        if self.binder.budget:
+            self.binder.budget.check_time()
+        BaseDocTemplate.handle_flowable(self, flowables)
+
+
+class SparkEnBinder:
+    """Combine several documents into one PDF with a shared TOC"""
+
+    def __init__(self, output_path=None, include_toc=True, page_numbering='continuous',
+                 config=None, budget=None, draft=False, deterministic=False):
+        """
+        Initialize binder
+
+        Args:
+            output_path: Path to save PDF (or None for BytesIO)
+            include_toc: Whether to add a combined table of contents (default: True)
+            page_numbering: 'continuous' (one sequence across the binder) or
+                            'section' (numbers restart per section, shown as "2-5")
+            config: BrandConfig shared by every section
+            budget: Optional RenderBudget for the whole binder
+            draft: Draft rendering for every section (see SparkEnPDFGenerator)
+            deterministic: Byte-identical output for identical input
+        """
+        if page_numbering not in PAGE_NUMBERING:
+            raise ValueError(f"Unknown page numbering: {page_numbering}")
+        self.output_path = output_path or BytesIO()
+        self.include_toc = include_toc
+        self.page_numbering = page_numbering
+        self.config = config or get_config()
+        self.budget = budget
+        self.draft = draft
+        self.deterministic = deterministic
+        self.cover_data = None
+        self.sections = []
+        self.page_count = 0
+        self._pages = {}          # TOC key -> physical page number
+        self._content_start = {}  # section index -> first content page
+
+    def add_cover_page(self, title, subtitle='', theme='formal'):
+        """Add a cover page for the whole binder, before the TOC"""
+        self.cover_data = {'title': sanitize_text(title), 'subtitle': sanitize_text(subtitle), 'theme': theme}
+
+    def add_section(self, markdown_text, title=None, subtitle=None, theme='formal', image_dir=None):
+        """
+        Parse and lay out one document as a binder section
+
+        Args:
+            markdown_text: Raw markdown text
+            title: Section cover title; overrides the document's own title (its H1)
+            subtitle: Section cover subtitle
+            theme: 'formal' (purple) or 'creative' (yellow) cover
+            image_dir: Directory the section's images are resolved against
+        """
+        generator = SparkEnPDFGenerator(BytesIO(), include_toc=True, draft=self.draft,
+                                        config=self.config, budget=self.budget, image_dir=image_dir)
+        document = parse_markdown_cached(markdown_text, budget=self.budget)
+        if title:
+            # The manifest's title wins, so drop the parsed one before it can replace the cover's
+            subtitle = subtitle or document.metadata.get('subtitle', '')
+            generator.add_cover_page(title, subtitle, theme)
+            metadata = {key: value for key, value in document.metadata.items() if key not in ('title', 'subtitle')}
+            document = Document(metadata, document.blocks)
+        generator.add_document(document)
+        if generator.has_cover:
+            generator.cover_data['theme'] = theme
+        self.sections.append(_BinderSection(len(self.sections), generator))
+
+    # ------------------------------------------------------------------
+    # Page labels and decorations
+    # ------------------------------------------------------------------
+
+    def _section_at(self, page):
+        """Index of the section a content page belongs to, or None for front matter"""
+        current = None
+        for index, start in self._content_start.items():
+            if start <= page:
+                current = index
+        return current
+
+    def _page_label(self, page, key=None):
+        """Footer/TOC label for a physical page (key: the TOC entry it is for)"""
+        if self.page_numbering == 'continuous':
+            return str(page)
+        if key and key[0] == 'section':
+            # Section entries point at the cover; label them with the first numbered page
+            return f"{key[1] + 1}-1"
+        index = self._section_at(page)
+        if index is None:
+            return str(page)
+        return f"{index + 1}-{page - self._content_start[index] + 1}"
+
+    def _draw_cover(self, canvas_obj, cover_data):
+        logo_path = None if self.draft else self.config.assets['horizontal_logo']
+        CoverPageComponent.create(canvas_obj, cover_data['title'], cover_data.get('subtitle', ''),
+                                  cover_data.get('theme', 'formal'), logo_path, self.config)
+
+    def _decorate(self, canvas_obj, doc):
+        """Watermark, header and footer for content and TOC pages"""
+        horizontal_logo = self.config.assets['horizontal_logo']
+        vertical_logo = self.config.assets['vertical_logo']
+        if self.draft:
+            vertical_logo = horizontal_logo = None
+
+        label = self._page_label(doc.page)
+        WatermarkComponent.create(canvas_obj, vertical_logo, self.config)
+        HeaderComponent.create(canvas_obj, horizontal_logo, label, self.config)
+        FooterComponent.create(canvas_obj, label, None, self.config)
+
+    def _page_templates(self):
+        """One cover and one content template per section, plus front matter"""
+        layout = self.config.layout
+
+        def frame():
+            return Frame(layout.MARGIN_LEFT, layout.MARGIN_BOTTOM + layout.FOOTER_HEIGHT,
+                         layout.CONTENT_WIDTH, layout.CONTENT_HEIGHT, id='normal')
+
+        def cover(cover_data, key):
+            def on_page(canvas_obj, doc):
+                self._pages.setdefault(key, doc.page)
+                self._draw_cover(canvas_obj, cover_data)
+            return on_page
+
+        def content(section):
+            def on_page(canvas_obj, doc):
+                self._content_start.setdefault(section.index, doc.page)
+                self._pages.setdefault(('section', section.index), doc.page)
+                self._decorate(canvas_obj, doc)
+            return on_page
+
+        templates = []
+        if self.cover_data:
+            templates.append(PageTemplate('binder_cover', [frame()], onPage=cover(self.cover_data, None)))
+        templates.append(PageTemplate('front', [frame()], onPage=self._decorate))
+        for section in self.sections:
+            if section.cover_data:
+                templates.append(PageTemplate(f'cover{section.index}', [frame()],
+                                              onPage=cover(section.cover_data, ('section', section.index))))
+            templates.append(PageTemplate(f'content{section.index}', [frame()], onPage=content(section)))
+        return templates
+
+    # ------------------------------------------------------------------
+    # Table of contents
+    # ------------------------------------------------------------------
+
+    def _toc_rows(self):
+        """(TOC key, level, text) for section titles and their H1/H2 headings"""
+        rows = []
+        for section in self.sections:
+            rows.append((('section', section.index), 0, section.title))
+            for position, (level, text, heading) in enumerate(section.toc_entries):
+                if level <= 1:
+                    key = ('heading', section.index, position)
+                    setattr(heading, TOC_MARK, key)
+                    rows.append((key, level + 1, text))
+        return rows
+
+    def _create_toc(self, rows):
+        """Combined TOC; page numbers are forms filled in once layout is done"""
+        styles = self.config.styles
+        layout = self.config.layout
+        elements = [Paragraph('<b>TABLE OF CONTENTS</b>', styles['toc_title']), Spacer(1, 0.3 * inch)]
+
+        indents = ("", "&nbsp;&nbsp;&nbsp;", "&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;")
+        data = []
+        for position, (key, level, text) in enumerate(rows):
+            display_text = text.upper() if level == 0 else text
+            heading_para = Paragraph(f'{indents[level]}{escape_markup(display_text)}', styles[f'toc_h{level + 1}'])
+            data.append([heading_para, _PageRef(f'tocPage{position}', 50, styles[f'toc_page_h{level + 1}'])])
+
+        table = Table(data, colWidths=[layout.CONTENT_WIDTH - 50, 50])
+        table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]))
+        elements.append(table)
+        return elements
+
+    def _fill_toc_forms(self, canvas_obj, rows):
+        """Define the TOC page-number forms now that every page is known"""
+        styles = self.config.styles
+        for position, (key, level, _) in enumerate(rows):
+            page = self._pages.get(key)
+            style = styles[f'toc_page_h{level + 1}']
+            canvas_obj.beginForm(f'tocPage{position}', lowerx=-100, lowery=-10, upperx=10, uppery=30)
+            if page is not None:
+                canvas_obj.setFont(style.fontName, style.fontSize)
+                canvas_obj.setFillColor(style.textColor)
+                canvas_obj.drawRightString(0, 0, self._page_label(page, key))
+            canvas_obj.endForm()
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def generate(self):
+        """
+        Generate the binder PDF
+
+        Returns:
+            PDF bytes (if output_path is BytesIO) or None (if writing to file)
+        """
+        if not self.sections:
+            raise ValueError("Binder has no sections")
+
+        toc_rows = self._toc_rows() if self.include_toc else []
+
+        story = []
+        if self.cover_data:
+            story += [NextPageTemplate('front'), PageBreak()]
+        if toc_rows:
+            story += self._create_toc(toc_rows)
+        for section in self.sections:
+            first = f'cover{section.index}' if section.cover_data else f'content{section.index}'
+            if story:
+                story += [NextPageTemplate(first), PageBreak()]
+            else:
+                story.append(NextPageTemplate(first))
+            if section.cover_data:
+                story += [NextPageTemplate(f'content{section.index}'), PageBreak()]
+            story += section.story
+
+        templates = self._page_templates()
+        if not self.cover_data and not toc_rows:
+            # Without front matter the first page already belongs to the first section
+            first = self.sections[0]
+            name = f'cover{first.index}' if first.cover_data else f'content{first.index}'
+            templates.sort(key=lambda template: template.id != name)
+
+        binder = self
+
+        class BinderCanvas(pdf_canvas.Canvas):
+            def save(self):
+                binder._fill_toc_forms(self, toc_rows)
+                pdf_canvas.Canvas.save(self)
+
+        layout = self.config.layout
+        doc = _BinderDocTemplate(
+            self.output_path,
+            self,
+            pageTemplates=templates,
+            pagesize=self.config.pagesize,
+            invariant=1 if self.deterministic else None,
+            leftMargin=layout.MARGIN_LEFT,
+            rightMargin=layout.MARGIN_RIGHT,
+            topMargin=layout.MARGIN_TOP + layout.HEADER_HEIGHT,
+            bottomMargin=layout.MARGIN_BOTTOM + layout.FOOTER_HEIGHT
+        )
+        doc.build(story, canvasmaker=BinderCanvas)
+        self.page_count = doc.page
+
+        if isinstance(self.output_path, BytesIO):
+            return self.output_path.getvalue()
+        return None
+
+
+def _section_path(path, base_dir):
+    """
+    Resolve a section's path, which must stay inside base_dir
+
+    Like images (see images.resolve_image_path), sections cannot read files
+    outside the manifest's directory; manifests without one (stdin) can
+    only have inline markdown sections.
+
+    Raises:
+        ValueError: If the path is not allowed
+    """
+    if base_dir is None:
+        raise ValueError(f"Section path {path!r} needs a manifest file; stdin manifests take inline markdown only")
+    root = os.path.realpath(base_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Section path {path!r} is outside the manifest's directory")
+    return resolved
+
+
+def render_binder(manifest, budget=None, base_dir='.'):
+    """
+    Render a binder manifest (see module docstring) to PDF
+
+    Args:
+        manifest: Manifest dict; also accepts pageSize, colors, includeToc,
+                  draft, deterministic, linearize (fast web view output), clean
+                  (strip PDF-extraction artifacts from every section) and
+                  binder-level title/subtitle/theme
+        budget: RenderBudget (defaults to a fresh one with the standard RenderLimits)
+        base_dir: Directory section paths are resolved against and must stay inside
+                  (None: only inline markdown sections are allowed); images resolve next
+                  to their section file, or for inline markdown against manifest imageDir,
+                  else base_dir (None disables them)
+
+    Returns:
+        RenderResult
+    """
+    budget = budget or RenderLimits().start()
+    config = get_config(manifest.get('pageSize', 'letter'), manifest.get('colors'))
+    binder = SparkEnBinder(
+        BytesIO(),
+        include_toc=manifest.get('includeToc', True),
+        page_numbering=manifest.get('pageNumbering', 'continuous'),
+        config=config,
+        budget=budget,
+        draft=bool(manifest.get('draft', False)),
+        deterministic=bool(manifest.get('deterministic', False))
+    )
+    if manifest.get('title'):
+        binder.add_cover_page(manifest['title'], manifest.get('subtitle', ''), manifest.get('theme', 'formal'))
+
+    for section in manifest.get('sections', []):
+        if 'markdown' in section:
+            markdown_text = section['markdown']
+            image_dir = manifest.get('imageDir', base_dir)
+        else:
+            path = _section_path(section['path'], base_dir)
+            with open(path, 'rb') as f:
+                markdown_text = read_limited(f, budget)
+            image_dir = os.path.dirname(os.path.abspath(path))
+        if manifest.get('clean'):
+            markdown_text = clean_pdf_artifacts(markdown_text)
+        binder.add_section(markdown_text, section.get('title'), section.get('subtitle'),
+                           section.get('theme', 'formal'), image_dir)
+
+    pdf_bytes = binder.generate()
+    if manifest.get('linearize'):
+        pdf_bytes = linearize_or_keep(pdf_bytes)
+    return RenderResult(pdf_bytes, binder.page_count)
+
+
+def main():
+    """Main entry point for command-line usage"""
+    limits = RenderLimits()
+    budget = limits.start()
+    cap_address_space(limits)
+
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] != '-':
+            with open(sys.argv[1], 'rb') as f:
+                manifest = json.loads(read_limited(f, budget))
+            base_dir = os.path.dirname(os.path.abspath(sys.argv[1]))
+        else:
+            manifest = json.loads(read_limited(sys.stdin.buffer, budget))
+            # Stdin manifests come from the web bridge: inline sections only load
+            # images from an explicit imageDir, never from the app's working directory
+            base_dir = None
+        result = render_binder(manifest, budget, base_dir)
+    except BudgetExceeded as e:
+        print(e.to_json(), file=sys.stderr)
+        sys.exit(BUDGET_EXIT_CODE)
+    except MemoryError:
+        print(BudgetExceeded('max_rss_mb', None, limits.max_rss_mb).to_json(), file=sys.stderr)
+        sys.exit(BUDGET_EXIT_CODE)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        result.write(manifest.get('outputPath'), manifest.get('reportPath'))
+    except OSError as e:
+        print(f"Error: Could not write output: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,18 @@ Sparken Brand Identity System - Constants
 All brand colors, fonts, and layout specifications in one place.
 """
 
+import os
+import re
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+
+from vector_logo import load_logo
 
 # ============================================================================
 # COLOR PALETTE - Sparken Brand Colors
@@ -33,6 +44,8 @@ class BrandColors:
     DEEP_COGNITIVE_PURPLE_HEX = "5E5592"
     BEHAVIORAL_YELLOW_HEX = "F8D830"
     TEXT_BLACK_HEX = "030403"
+    SOFT_LAVENDER_HEX = "D0C6E1"
+    SOFT_GRAY_HEX = "F4F5F7"
 
 # ============================================================================
 # TYPOGRAPHY - Font Definitions
@@ -190,3 +203,240 @@ class DocumentTheme:
         'subtitle_color': BrandColors.BRAND_PURPLE,
         'logo': 'logos/sparken-logo-horizontal-white.png'  # White logo for consistency
     }
+
+# ============================================================================
+# RENDER CONFIGURATION
+# ============================================================================
+
+# Page sizes in points (width, height)
+PAGE_SIZES = {
+    'letter': (612, 792),
+    'a4': (595.28, 841.89),
+}
+
+# Color constants paired with the hex strings used in Paragraph/HTML markup
+_COLOR_HEX_NAMES = {
+    'BRAND_PURPLE': 'DEEP_COGNITIVE_PURPLE_HEX',
+    'BRAND_YELLOW': 'BEHAVIORAL_YELLOW_HEX',
+    'TEXT_BLACK': 'TEXT_BLACK_HEX',
+    'BRAND_LAVENDER': 'SOFT_LAVENDER_HEX',
+    'SOFT_GRAY': 'SOFT_GRAY_HEX',
+}
+
+LOGO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'public', 'logos')
+
+# sparken-logo.svg is different artwork from the PNG brand mark (a circle with
+# a yellow dot and a wordmark, not the four-point star "S"), so the PNGs stay
+# the default until matching SVG artwork exists; SPARKEN_VECTOR_LOGOS=1 opts in
+VECTOR_LOGOS = os.environ.get('SPARKEN_VECTOR_LOGOS') == '1'
+
+
+def _snapshot(cls, overrides=None):
+    """Copy a constants class's UPPER_CASE attributes into a per-instance namespace"""
+    values = {name: getattr(cls, name) for name in dir(cls) if name.isupper()}
+    values.update(overrides or {})
+    return SimpleNamespace(**values)
+
+
+class BrandConfig:
+    """
+    Brand and layout settings for one render
+
+    The module-level classes above stay the defaults. A BrandConfig snapshots
+    them per instance, applies page-size and color overrides, and precompiles
+    everything components need (ParagraphStyles, cover themes, logo paths), so
+    renders with different configurations never share mutable state. Instances
+    are read-only once built and can be shared between threads; use
+    get_config() to reuse them.
+    """
+
+    def __init__(self, page_size='letter', colors=None):
+        """
+        Args:
+            page_size: Key of PAGE_SIZES ('letter' or 'a4')
+            colors: Optional {constant name: '#RRGGBB'} overrides, e.g. {'BRAND_PURPLE': '#1F3A93'}
+        """
+        page_size, colors = _check_settings(page_size, colors)
+        color_overrides = _color_overrides(colors)
+
+        self.page_size = page_size
+        self.colors = _snapshot(BrandColors, color_overrides)
+        self.typography = _snapshot(Typography)
+
+        width, height = PAGE_SIZES[page_size]
+        layout = _snapshot(Layout, {'PAGE_WIDTH': width, 'PAGE_HEIGHT': height})
+        layout.CONTENT_WIDTH = width - layout.MARGIN_LEFT - layout.MARGIN_RIGHT
+        layout.CONTENT_HEIGHT = (height - layout.MARGIN_TOP - layout.MARGIN_BOTTOM
+                                 - layout.HEADER_HEIGHT - layout.FOOTER_HEIGHT)
+        self.layout = layout
+
+        self.themes = {
+            'formal': {
+                'background': self.colors.BRAND_PURPLE,
+                'title_color': self.colors.WHITE,
+                'subtitle_color': self.colors.WHITE,
+            },
+            'creative': {
+                'background': self.colors.BRAND_YELLOW,
+                'title_color': self.colors.BRAND_PURPLE,
+                'subtitle_color': self.colors.BRAND_PURPLE,
+            },
+        }
+
+        self.assets = self._load_logos()
+
+        self.styles = self._build_styles()
+
+        # Load font metrics now, so concurrent renders never race on ReportLab's lazy font cache
+        for font_name in {self.typography.DISPLAY_FONT, self.typography.BODY_FONT, 'Courier'}:
+            pdfmetrics.getFont(font_name)
+
+    @property
+    def pagesize(self):
+        """(width, height) tuple for ReportLab doc templates"""
+        return (self.layout.PAGE_WIDTH, self.layout.PAGE_HEIGHT)
+
+    def _load_logos(self, vector=None):
+        """
+        The raster PNG logos, or with vector (default: VECTOR_LOGOS) logos
+        converted from the SVG artwork, falling back to the PNGs
+
+        The artwork's default brand colors are swapped for this config's. The
+        horizontal logo sits on purple (header, cover), so it is drawn reversed
+        without its white background; the watermark uses the mark alone.
+        """
+        raster = {
+            'horizontal_logo': os.path.join(LOGO_DIR, 'sparken-logo-horizontal-white.png'),
+            'vertical_logo': os.path.join(LOGO_DIR, 'sparken logo-vertical-cropped.png'),
+        }
+        if not (VECTOR_LOGOS if vector is None else vector):
+            return {name: path if os.path.exists(path) else None for name, path in raster.items()}
+
+        c = self.colors
+        purple, yellow = f"#{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}", f"#{BrandColors.BEHAVIORAL_YELLOW_HEX}"
+        svg = os.path.join(LOGO_DIR, 'sparken-logo.svg')
+        vector = {
+            'horizontal_logo': load_logo(svg, 'sparkenLogoReversed', background=False,
+                                         recolor={purple: c.WHITE, '#FFFFFF': c.BRAND_PURPLE,
+                                                  yellow: c.BRAND_YELLOW}),
+            'vertical_logo': load_logo(svg, 'sparkenLogoMark', mark_only=True,
+                                       recolor={purple: c.BRAND_PURPLE, yellow: c.BRAND_YELLOW}),
+        }
+        return {
+            name: vector[name] or (path if os.path.exists(path) else None)
+            for name, path in raster.items()
+        }
+
+    def _build_styles(self):
+        """Precompile the ParagraphStyles shared by every component"""
+        c, t, l = self.colors, self.typography, self.layout
+        body = dict(fontName=t.BODY_FONT, fontSize=t.BODY_SIZE, textColor=c.TEXT_BLACK,
+                    leading=t.BODY_SIZE * t.BODY_LEADING)
+        heading = dict(fontName=t.DISPLAY_FONT, textColor=c.BRAND_PURPLE)
+        return {
+            'h1': ParagraphStyle('Heading1', fontSize=t.H1_SIZE, leading=t.H1_SIZE * t.H1_LEADING,
+                                 spaceAfter=l.PARAGRAPH_SPACING, spaceBefore=l.SECTION_SPACING, **heading),
+            'h2': ParagraphStyle('Heading2', fontSize=t.H2_SIZE, leading=t.H2_SIZE * t.H2_LEADING,
+                                 spaceAfter=l.PARAGRAPH_SPACING, spaceBefore=l.SECTION_SPACING, **heading),
+            'h3': ParagraphStyle('Heading3', fontSize=t.H3_SIZE, leading=t.H3_SIZE * t.H3_LEADING,
+                                 spaceAfter=l.PARAGRAPH_SPACING / 2, spaceBefore=l.PARAGRAPH_SPACING,
+                                 **heading),
+            'body': ParagraphStyle('Body', spaceAfter=l.PARAGRAPH_SPACING, alignment=TA_LEFT, **body),
+            'body_center': ParagraphStyle('BodyCenter', spaceAfter=l.PARAGRAPH_SPACING,
+                                          alignment=TA_CENTER, **body),
+            'body_justify': ParagraphStyle('BodyJustify', spaceAfter=l.PARAGRAPH_SPACING,
+                                           alignment=TA_JUSTIFY, **body),
+            'list_item': ParagraphStyle('ListItem', spaceAfter=l.LINE_SPACING, **body),
+            'callout': ParagraphStyle('Callout', leftIndent=15, rightIndent=10, spaceAfter=10,
+                                      spaceBefore=10, **body),
+            'table_header': ParagraphStyle('TableHeader', fontName=t.DISPLAY_FONT, fontSize=t.BODY_SIZE,
+                                           textColor=c.WHITE, leading=t.BODY_SIZE * 1.2, alignment=TA_LEFT),
+            'table_cell': ParagraphStyle('TableCell', fontName=t.BODY_FONT, fontSize=t.BODY_SIZE,
+                                         textColor=c.TEXT_BLACK, leading=t.BODY_SIZE * 1.2, alignment=TA_LEFT),
+            'toc_title': ParagraphStyle('TOCTitle', fontSize=t.H1_SIZE, leading=t.H1_SIZE * t.H1_LEADING,
+                                        spaceAfter=l.PARAGRAPH_SPACING, **heading),
+            'toc_h1': ParagraphStyle('TOC_H1_text', fontName=t.DISPLAY_FONT, fontSize=12,
+                                     textColor=c.BRAND_PURPLE, leading=15),
+            'toc_h2': ParagraphStyle('TOC_H2_text', fontName=t.BODY_FONT, fontSize=11,
+                                     textColor=c.TEXT_BLACK, leading=14),
+            'toc_h3': ParagraphStyle('TOC_H3_text', fontName=t.BODY_FONT, fontSize=10,
+                                     textColor=c.TEXT_BLACK, leading=13),
+            'toc_page_h1': ParagraphStyle('TOC_page_0', fontName=t.DISPLAY_FONT, fontSize=12,
+                                          textColor=c.BRAND_PURPLE, alignment=TA_RIGHT),
+            'toc_page_h2': ParagraphStyle('TOC_page_1', fontName=t.BODY_FONT, fontSize=11,
+                                          textColor=c.TEXT_BLACK, alignment=TA_RIGHT),
+            'toc_page_h3': ParagraphStyle('TOC_page_2', fontName=t.BODY_FONT, fontSize=10,
+                                          textColor=c.TEXT_BLACK, alignment=TA_RIGHT),
+        }
+
+
+_HEX_COLOR = re.compile(r'^#[0-9A-Fa-f]{6}$')
+
+
+def _check_settings(page_size, overrides):
+    """
+    Validate BrandConfig settings, which may come straight from client metadata
+
+    Returns:
+        (lowercased page size, colors dict)
+
+    Raises:
+        ValueError: For anything other than a known page size name and a
+            {BrandColors Color constant: '#RRGGBB'} mapping
+    """
+    if not isinstance(page_size, str) or page_size.lower() not in PAGE_SIZES:
+        raise ValueError(f"Unknown page size: {page_size!r}")
+    if overrides is None:
+        overrides = {}
+    if not isinstance(overrides, dict):
+        raise ValueError("Brand colors must be a {name: '#RRGGBB'} mapping")
+    for name, value in overrides.items():
+        # Only Color constants can be overridden; the *_HEX strings follow their color
+        if not isinstance(name, str) or not isinstance(getattr(BrandColors, name, None), colors.Color):
+            raise ValueError(f"Unknown brand color: {name}")
+        if not isinstance(value, str) or not _HEX_COLOR.match(value):
+            raise ValueError(f"Brand color {name} must be a '#RRGGBB' string")
+    return page_size.lower(), overrides
+
+
+def _color_overrides(overrides):
+    """Snapshot overrides for validated {name: '#RRGGBB'} settings, hex strings included"""
+    snapshot = {}
+    for name, value in overrides.items():
+        snapshot[name] = colors.HexColor(value)
+        if name in _COLOR_HEX_NAMES:
+            snapshot[_COLOR_HEX_NAMES[name]] = value[1:].upper()
+    return snapshot
+
+
+# Most recently used configurations kept by get_config(); color overrides come
+# from clients, so the cache is bounded to keep long-lived workers from growing
+MAX_CACHED_CONFIGS = 16
+
+_config_cache = OrderedDict()
+_config_lock = threading.Lock()
+
+
+def get_config(page_size='letter', colors=None):
+    """
+    Return a shared BrandConfig for these settings, building it on first use;
+    only the MAX_CACHED_CONFIGS most recently used configurations are kept
+
+    Args:
+        page_size: Key of PAGE_SIZES
+        colors: Optional {constant name: '#RRGGBB'} overrides
+
+    Returns:
+        BrandConfig
+    """
+    page_size, colors = _check_settings(page_size, colors)
+    key = (page_size, tuple(sorted(colors.items())))
+    with _config_lock:
+        config = _config_cache.get(key)
+        if config is None:
+            config = _config_cache[key] = BrandConfig(page_size, colors)
+            if len(_config_cache) > MAX_CACHED_CONFIGS:
+                _config_cache.popitem(last=False)
+        else:
+            _config_cache.move_to_end(key)
+        return config
@@ -4,33 +4,51 @@ Clean PDF Text Utility
 Removes artifacts from PDF-to-text conversions before rebranding
 """
 
+import argparse
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 
-def clean_pdf_artifacts(text):
+# Inputs are cut into pieces of about this many characters for parallel cleaning
+CHUNK_CHARS = 4_000_000
+
+# A line start no trailing-TOC-number match can reach across: the line begins
+# with a character that rule cannot match, like the "-" of a "-- X of Y --"
+# page marker or the lowercase start of a wrapped line
+_SAFE_CUT = re.compile(r'\n(?=[^A-Z&\s\d])')
+
+
+def _strip_links(text):
+    """Remove bold link-wrapped titles, including ones that span lines"""
+    # Remove link-wrapped titles that span multiple lines
+    text = re.sub(r'\*\*\[([^\]]+?)\n+([^\]]*?)\]\([^\)]+?\)\*\*', r'\1 \2', text, flags=re.MULTILINE)
+    return re.sub(r'\*\*\[([^\]]+?)\]\([^\)]+?\)\*\*', r'\1', text)
+
+
+def _clean_chunk(text):
     """
-    Remove common PDF conversion artifacts
-    
-    Args:
-        text: Raw text extracted from PDF
-    
+    Clean one piece of the text as if a heading had already been promoted
+
+    The trailing-TOC-number rule runs first, then the line rules. The parts
+    of the result that depend on earlier pieces are reported for _merge() to
+    settle instead.
+
     Returns:
-        Cleaned text ready for markdown processing
+        (leading_blank, body, heading): whether blank lines came before the
+        first kept line, the kept lines joined with newlines, and the offset
+        in body of the first line that would become the H1 title (or None)
     """
-    # First pass: clean multiline artifacts before processing line by line
-    # Remove link-wrapped titles that span multiple lines
-    text = re.sub(r'\*\*\[([^\]]+?)\n+([^\]]*?)\]\([^\)]+?\)\*\*', r'\1 \2', text, flags=re.MULTILINE)
-    text = re.sub(r'\*\*\[([^\]]+?)\]\([^\)]+?\)\*\*', r'\1', text)
-    
     # Remove trailing numbers from link fragments (like "TITLE\n1" from PDF TOC)
     text = re.sub(r'([A-Z\s&]+)\n+\d+\s*$', r'\1', text, flags=re.MULTILINE)
-    
+
     lines = text.split('\n')
     cleaned_lines = []
+    leading_blank = False
+    heading = None
     
     skip_next = False
-    found_first_heading = False
     
     for i, line in enumerate(lines):
         stripped = line.strip()
@@ -67,28 +85,19 @@ def clean_pdf_artifacts(text):
         # Remove trailing single digits (common in PDF TOC extractions)
         cleaned = re.sub(r'\s+\d+\s*$', '', cleaned)
         
-        # If this looks like a title (ALL CAPS or Title Case, reasonable length) and we haven't found one yet
-        # Add it as H1
-        if not found_first_heading and 10 < len(cleaned) < 100 and not cleaned.startswith('#'):
+        # If this looks like a title (ALL CAPS or Title Case, reasonable length), note where it
+        # lands: the first one in the document becomes the H1
+        if heading is None and 10 < len(cleaned) < 100 and not cleaned.startswith('#'):
             # Check if it's mostly uppercase (at least 70%)
             alpha_chars = [c for c in cleaned if c.isalpha()]
             if alpha_chars and sum(1 for c in alpha_chars if c.isupper()) / len(alpha_chars) > 0.7:
-                cleaned_lines.append(f"# {cleaned}")
-                found_first_heading = True
+                heading = sum(len(kept) + 1 for kept in cleaned_lines)
+                cleaned_lines.append(cleaned)
                 continue
         
-        # Remove ALL markdown bold/italic markers (both inline and full-line)
-        # These should not appear in final PDF output
-        cleaned = re.sub(r'\*\*(.+?)\*\*', r'\1', cleaned)  # Remove bold
-        cleaned = re.sub(r'\*(.+?)\*', r'\1', cleaned)  # Remove italic
-        cleaned = re.sub(r'`(.+?)`', r'\1', cleaned)  # Remove code markers
-        
-        # COMPREHENSIVE: Remove backslash escapes before special characters
-        # This handles \~, \=, \-, \+, \*, \_, \[, \], \(, \), etc.
-        cleaned = re.sub(r'\\([~=\-+*_\[\](){}|<>$#@!&^%])', r'\1', cleaned)
-        
-        # Fix escaped numbered lists like "1\." → "1."
-        cleaned = re.sub(r'(\d+)\\.', r'\1.', cleaned)
+        # Bold/italic/code markers and backslash escapes are left in place:
+        # the generator's inline markup converter turns them into Paragraph
+        # markup instead of losing the emphasis here
         
         # Remove bullet point artifacts like "•" followed by "--"
         cleaned = re.sub(r'^[•\-]\s*--\s*$', '', cleaned)
@@ -103,26 +112,100 @@ def clean_pdf_artifacts(text):
         elif cleaned_lines and cleaned_lines[-1] != '':
             # Keep single blank lines for paragraph breaks
             cleaned_lines.append('')
+        elif not cleaned_lines:
+            leading_blank = True
     
     # Join lines and clean up excessive blank lines
-    text = '\n'.join(cleaned_lines)
+    body = '\n'.join(cleaned_lines)
     
     # Remove more than 2 consecutive blank lines
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    body = re.sub(r'\n{3,}', '\n\n', body)
     
-    return text
+    return leading_blank, body, heading
+
+
+def _merge(pieces):
+    """
+    Join cleaned pieces in order, as one serial pass would have produced them
+
+    A piece's leading blank lines become a paragraph break unless the text so
+    far is empty or already ends with one, and only the first title candidate
+    in the whole document is promoted to H1.
+    """
+    parts = []
+    ends_blank = False
+    promoted = False
+    for leading_blank, body, heading in pieces:
+        if leading_blank and parts and not ends_blank:
+            parts.append('')
+            ends_blank = True
+        if body:
+            if heading is not None and not promoted:
+                body = f"{body[:heading]}# {body[heading:]}"
+                promoted = True
+            parts.append(body)
+            ends_blank = body.endswith('\n')
+    # Pieces never start with a blank line, so joining them makes no new runs of blank lines
+    return '\n'.join(parts)
+
+
+def _split(text, chunk_chars):
+    """Cut text into pieces of at least chunk_chars at safe line starts (the newline before each cut is dropped)"""
+    pieces = []
+    start = 0
+    while len(text) - start > chunk_chars:
+        cut = _SAFE_CUT.search(text, start + chunk_chars)
+        if cut is None:
+            break
+        pieces.append(text[start:cut.start()])
+        start = cut.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+def clean_pdf_artifacts(text, workers=1):
+    """
+    Remove common PDF conversion artifacts
+    
+    With several workers, inputs longer than CHUNK_CHARS are cut at safe line
+    starts and the pieces cleaned in a process pool; the result is identical
+    to cleaning in one pass.
+    
+    Args:
+        text: Raw text extracted from PDF
+        workers: Processes to clean large inputs with (1 cleans in this process)
+    
+    Returns:
+        Cleaned text ready for markdown processing
+    """
+    # First pass: clean multiline link artifacts before processing line by line.
+    # These can span any line, so they run over the whole text
+    text = _strip_links(text)
+    
+    pieces = _split(text, CHUNK_CHARS) if workers > 1 else [text]
+    if len(pieces) == 1:
+        return _merge([_clean_chunk(text)])
+    
+    with ProcessPoolExecutor(min(workers, len(pieces))) as executor:
+        return _merge(executor.map(_clean_chunk, pieces))
 
 
 def main():
-    """Process text from stdin and output cleaned version"""
-    if len(sys.argv) > 1 and sys.argv[1] != '-':
-        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+    """Process text from a file or stdin and output cleaned version"""
+    parser = argparse.ArgumentParser(description='Remove PDF conversion artifacts from extracted text')
+    parser.add_argument('input', nargs='?', default='-', help="text file to clean ('-' or omitted: stdin)")
+    parser.add_argument('--workers', type=int,
+                        help='processes for inputs over CHUNK_CHARS (default: one per CPU)')
+    args = parser.parse_args()
+    
+    if args.input != '-':
+        with open(args.input, 'r', encoding='utf-8') as f:
             input_text = f.read()
     else:
         input_text = sys.stdin.read()
     
     # Clean PDF artifacts
-    cleaned_text = clean_pdf_artifacts(input_text)
+    cleaned_text = clean_pdf_artifacts(input_text, workers=args.workers or os.cpu_count() or 1)
     
     # Output cleaned text
     print(cleaned_text)
@@ -5,20 +5,26 @@ Reusable components for generating branded PDF elements
 
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import Table, TableStyle, Paragraph, Spacer, Image, KeepTogether
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab.platypus import Table, TableStyle, Spacer, Image, KeepTogether, ListFlowable
 from reportlab.pdfgen import canvas
-import os
 
-from brand_constants import BrandColors, Typography, Layout, ComponentStyles, DocumentTheme
+from brand_constants import BrandColors, Typography, Layout, ComponentStyles, get_config
+from inline_markup import escape_markup
+from vector_logo import draw_logo
+from images import LazyImage
+from layout_cache import CachedParagraph
+
+
+# Table cell padding (points): sides and body rows, and the header row's top/bottom
+TABLE_CELL_PADDING = 10
+TABLE_HEADER_PADDING = 12
 
 
 class CoverPageComponent:
     """Generate a branded cover page"""
     
     @staticmethod
-    def create(canvas_obj, title, subtitle="", theme_type="formal", logo_path=None):
+    def create(canvas_obj, title, subtitle="", theme_type="formal", logo_path=None, config=None):
         """
         Create a cover page with full-color background
         
@@ -27,23 +33,25 @@ class CoverPageComponent:
             title: Main title text
             subtitle: Subtitle or "Prepared For" text
             theme_type: "formal" (purple) or "creative" (yellow)
-            logo_path: Path to logo image file
+            logo_path: VectorLogo or path to a logo image file
+            config: BrandConfig (defaults to the standard Letter configuration)
         """
-        theme = DocumentTheme.FORMAL if theme_type == "formal" else DocumentTheme.CREATIVE
+        config = config or get_config()
+        Layout, Typography = config.layout, config.typography
+        theme = config.themes['formal' if theme_type == "formal" else 'creative']
         
         # Full page background
         canvas_obj.setFillColor(theme['background'])
         canvas_obj.rect(0, 0, Layout.PAGE_WIDTH, Layout.PAGE_HEIGHT, fill=1, stroke=0)
         
         # Add logo (centered, upper third)
-        if logo_path and os.path.exists(logo_path):
+        if logo_path:
             try:
                 logo_width = 300
                 logo_height = 100
                 x = (Layout.PAGE_WIDTH - logo_width) / 2
                 y = Layout.PAGE_HEIGHT - 200
-                canvas_obj.drawImage(logo_path, x, y, width=logo_width, height=logo_height, 
-                                   mask='auto', preserveAspectRatio=True)
+                draw_logo(canvas_obj, logo_path, x, y, logo_width, logo_height)
             except Exception as e:
                 print(f"Could not load logo: {e}")
         
@@ -112,29 +120,31 @@ class HeaderComponent:
     """Generate page headers with logo and accent line"""
     
     @staticmethod
-    def create(canvas_obj, logo_path=None, page_num=1):
+    def create(canvas_obj, logo_path=None, page_num=1, config=None):
         """
         Create header with optional logo and purple bar
         
         Args:
             canvas_obj: ReportLab canvas object
-            logo_path: Path to logo image (horizontal white logo)
+            logo_path: VectorLogo or path to a logo image (horizontal white logo)
             page_num: Current page number
+            config: BrandConfig (defaults to the standard Letter configuration)
         """
+        config = config or get_config()
+        Layout, BrandColors = config.layout, config.colors
         # Small purple header bar (reduced from 80 to 35 points to avoid covering text)
         canvas_obj.setFillColor(BrandColors.BRAND_PURPLE)
         canvas_obj.rect(0, Layout.PAGE_HEIGHT - Layout.HEADER_HEIGHT, 
                        Layout.PAGE_WIDTH, Layout.HEADER_HEIGHT, fill=1, stroke=0)
         
         # White horizontal logo in header (smaller to fit reduced header)
-        if logo_path and os.path.exists(logo_path):
+        if logo_path:
             try:
                 logo_width = 100  # Reduced from 140
                 logo_height = 25  # Reduced from 45
                 x = Layout.MARGIN_LEFT - 10
                 y = Layout.PAGE_HEIGHT - Layout.HEADER_HEIGHT + 5
-                canvas_obj.drawImage(logo_path, x, y, width=logo_width, height=logo_height,
-                                   mask='auto', preserveAspectRatio=True)
+                draw_logo(canvas_obj, logo_path, x, y, logo_width, logo_height)
             except Exception as e:
                 print(f"Could not load header logo: {e}")
 
@@ -143,15 +153,18 @@ class FooterComponent:
     """Generate page footers with branding"""
     
     @staticmethod
-    def create(canvas_obj, page_num, total_pages):
+    def create(canvas_obj, page_num, total_pages, config=None):
         """
         Create footer with purple bar and page numbers
         
         Args:
             canvas_obj: ReportLab canvas object
-            page_num: Current page number
-            total_pages: Total number of pages
+            page_num: Current page number (or label, e.g. "2-5")
+            total_pages: Total number of pages, or None to show the page number alone
+            config: BrandConfig (defaults to the standard Letter configuration)
         """
+        config = config or get_config()
+        Layout, BrandColors, Typography = config.layout, config.colors, config.typography
         footer_y = Layout.MARGIN_BOTTOM - 20
         
         # Purple footer bar
@@ -161,7 +174,8 @@ class FooterComponent:
         # Page number (left side in white)
         canvas_obj.setFillColor(BrandColors.WHITE)
         canvas_obj.setFont(Typography.BODY_FONT, Typography.SMALL_SIZE)
-        canvas_obj.drawString(Layout.MARGIN_LEFT, 20, f"Page {page_num} of {total_pages}")
+        page_text = f"Page {page_num}" if total_pages is None else f"Page {page_num} of {total_pages}"
+        canvas_obj.drawString(Layout.MARGIN_LEFT, 20, page_text)
         
         # "Sparken Solutions" (right side in white)
         canvas_obj.setFont(Typography.DISPLAY_FONT, Typography.SMALL_SIZE + 1)
@@ -174,17 +188,20 @@ class WatermarkComponent:
     """Generate repeated logo watermark pattern"""
     
     @staticmethod
-    def create(canvas_obj, logo_path):
+    def create(canvas_obj, logo_path, config=None):
         """
         Create repeated vertical logo watermark across the page
         
         Args:
             canvas_obj: ReportLab canvas object
-            logo_path: Path to vertical logo image
+            logo_path: VectorLogo or path to the vertical logo image (None skips the watermark)
+            config: BrandConfig (defaults to the standard Letter configuration)
         """
-        if not logo_path or not os.path.exists(logo_path):
+        if not logo_path:
             return
         
+        Layout = (config or get_config()).layout
+        
         try:
             size = Layout.WATERMARK_SIZE
             spacing = Layout.WATERMARK_SPACING
@@ -203,8 +220,7 @@ class WatermarkComponent:
                 for col in range(cols):
                     x = col * spacing - (size / 2)
                     y = row * spacing - (size / 2)
-                    canvas_obj.drawImage(logo_path, x, y, width=size, height=size,
-                                       mask='auto', preserveAspectRatio=True)
+                    draw_logo(canvas_obj, logo_path, x, y, size, size)
             
             canvas_obj.restoreState()
         except Exception as e:
@@ -215,13 +231,16 @@ class TableComponent:
     """Generate styled tables with brand colors"""
     
     @staticmethod
-    def create(data, col_widths=None):
+    def create(data, col_widths=None, simple=False, config=None):
         """
         Create a branded table with purple headers and striped rows
         
         Args:
-            data: List of lists containing table data (first row is header)
+            data: List of lists of Paragraph markup (first row is header)
             col_widths: Optional list of column widths
+            simple: Draft styling - header background only, no striping or grid.
+                    Paddings are kept so the table's size is unchanged
+            config: BrandConfig (defaults to the standard Letter configuration)
         
         Returns:
             ReportLab Table object
@@ -229,46 +248,45 @@ class TableComponent:
         if not data or len(data) == 0:
             return None
         
+        config = config or get_config()
+        Layout = config.layout
+        header_style, cell_style = config.styles['table_header'], config.styles['table_cell']
+        
         # Default column widths if not provided
         if not col_widths:
             num_cols = len(data[0])
             col_widths = [Layout.CONTENT_WIDTH / num_cols] * num_cols
         
         # Convert text to Paragraph objects for better word wrapping
+        # (header and body cells share the config's precompiled styles)
         processed_data = []
         for i, row in enumerate(data):
-            processed_row = []
-            for j, cell in enumerate(row):
-                # Clean cell text
-                cell_text = str(cell).strip()
-                
-                # Create paragraph style
-                if i == 0:  # Header row
-                    style = ParagraphStyle(
-                        f'TableHeader_{i}_{j}',
-                        fontName=Typography.DISPLAY_FONT,
-                        fontSize=Typography.BODY_SIZE,
-                        textColor=BrandColors.WHITE,
-                        leading=Typography.BODY_SIZE * 1.2,
-                        alignment=TA_LEFT
-                    )
-                else:  # Body rows
-                    style = ParagraphStyle(
-                        f'TableCell_{i}_{j}',
-                        fontName=Typography.BODY_FONT,
-                        fontSize=Typography.BODY_SIZE,
-                        textColor=BrandColors.TEXT_BLACK,
-                        leading=Typography.BODY_SIZE * 1.2,
-                        alignment=TA_LEFT
-                    )
-                
-                # Create paragraph for word wrapping
-                para = Paragraph(cell_text, style)
-                processed_row.append(para)
-            processed_data.append(processed_row)
+            style = header_style if i == 0 else cell_style
+            processed_data.append([CachedParagraph(str(cell).strip(), style) for cell in row])
         
         # Create table with processed data
         table = Table(processed_data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(TableComponent.style(len(processed_data), simple, config))
+        return table
+    
+    @staticmethod
+    def style(row_count, simple=False, config=None, first_row=1):
+        """
+        TableStyle for a branded table: purple header row, padded cells and,
+        unless simple, striped rows and a grid
+        
+        Args:
+            row_count: Rows in the table, header included
+            simple: Draft styling (header background only)
+            config: BrandConfig (defaults to the standard Letter configuration)
+            first_row: Number of the first body row, so stripes continue across
+                       tables that each hold one chunk of a longer table
+        
+        Returns:
+            ReportLab TableStyle
+        """
+        config = config or get_config()
+        BrandColors = config.colors
         
         # Build style commands
         style_commands = [
@@ -276,58 +294,49 @@ class TableComponent:
             ('BACKGROUND', (0, 0), (-1, 0), BrandColors.BRAND_PURPLE),
             ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), TABLE_HEADER_PADDING),
+            ('TOPPADDING', (0, 0), (-1, 0), TABLE_HEADER_PADDING),
             
             # Body styling
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 1), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
+            ('LEFTPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), TABLE_CELL_PADDING),
+            ('TOPPADDING', (0, 1), (-1, -1), TABLE_CELL_PADDING),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), TABLE_CELL_PADDING),
         ]
         
-        # Add striped row backgrounds
-        for i in range(1, len(processed_data)):
-            bg_color = BrandColors.BRAND_LAVENDER if i % 2 == 1 else BrandColors.WHITE
-            style_commands.append(('BACKGROUND', (0, i), (-1, i), bg_color))
-        
-        # Add grid
-        style_commands.append(('GRID', (0, 0), (-1, -1), 0.5, BrandColors.BRAND_PURPLE))
+        if not simple:
+            # Add striped row backgrounds
+            for i in range(1, row_count):
+                bg_color = BrandColors.BRAND_LAVENDER if (first_row + i - 1) % 2 == 1 else BrandColors.WHITE
+                style_commands.append(('BACKGROUND', (0, i), (-1, i), bg_color))
+            
+            # Add grid
+            style_commands.append(('GRID', (0, 0), (-1, -1), 0.5, BrandColors.BRAND_PURPLE))
         
-        table.setStyle(TableStyle(style_commands))
-        return table
+        return TableStyle(style_commands)
 
 
 class CalloutComponent:
     """Generate callout boxes with yellow left border"""
     
     @staticmethod
-    def create(text, callout_type="info"):
+    def create(text, callout_type="info", config=None):
         """
         Create a callout box with yellow left border
         
         Args:
-            text: Content text
+            text: Content as Paragraph markup
             callout_type: Type of callout ("info", "warning", "quote")
+            config: BrandConfig (defaults to the standard Letter configuration)
         
         Returns:
             List of ReportLab flowables
         """
-        # Create paragraph style for callout
-        style = ParagraphStyle(
-            'Callout',
-            fontName=Typography.BODY_FONT,
-            fontSize=Typography.BODY_SIZE,
-            textColor=BrandColors.TEXT_BLACK,
-            leading=Typography.BODY_SIZE * Typography.BODY_LEADING,
-            leftIndent=15,
-            rightIndent=10,
-            spaceAfter=10,
-            spaceBefore=10
-        )
+        config = config or get_config()
+        Layout, BrandColors = config.layout, config.colors
         
         # Create the paragraph
-        para = Paragraph(text, style)
+        para = CachedParagraph(text, config.styles['callout'])
         
         # Wrap in a table to create the left border effect
         data = [[para]]
@@ -345,71 +354,106 @@ class CalloutComponent:
         return [table, Spacer(1, Layout.PARAGRAPH_SPACING)]
 
 
+class ImageComponent:
+    """Generate document images (charts, figures)"""
+    
+    @staticmethod
+    def create(path, alt='', placeholder=False, config=None, dpi=None):
+        """
+        Create a lazily decoded image scaled to the content width
+        
+        Args:
+            path: Resolved image file path, or None if unavailable (draws a placeholder)
+            alt: Alt text
+            placeholder: Draw a same-sized box instead of decoding the image (draft mode)
+            config: BrandConfig (defaults to the standard Letter configuration)
+            dpi: Resolution the image is downscaled to (default images.TARGET_DPI)
+        
+        Returns:
+            List of ReportLab flowables
+        """
+        config = config or get_config()
+        Layout, BrandColors = config.layout, config.colors
+        image = LazyImage(path, alt, max_height=Layout.CONTENT_HEIGHT - Layout.PARAGRAPH_SPACING,
+                          placeholder=placeholder, fill_color=BrandColors.SOFT_GRAY,
+                          text_color=BrandColors.BRAND_PURPLE, dpi=dpi)
+        image.hAlign = 'CENTER'
+        return [image, Spacer(1, Layout.PARAGRAPH_SPACING)]
+
+
 class HeadingComponent:
     """Generate styled headings"""
     
     @staticmethod
-    def create_h1(text):
-        """Create H1 heading in purple, all caps"""
-        style = ParagraphStyle(
-            'Heading1',
-            fontName=Typography.DISPLAY_FONT,
-            fontSize=Typography.H1_SIZE,
-            textColor=BrandColors.BRAND_PURPLE,
-            leading=Typography.H1_SIZE * Typography.H1_LEADING,
-            spaceAfter=Layout.PARAGRAPH_SPACING,
-            spaceBefore=Layout.SECTION_SPACING
-        )
-        return Paragraph(text.upper(), style)
+    def create_h1(text, config=None):
+        """Create H1 heading in purple, all caps (text is plain, not markup)"""
+        config = config or get_config()
+        return CachedParagraph(escape_markup(text.upper()), config.styles['h1'])
     
     @staticmethod
-    def create_h2(text):
-        """Create H2 heading in purple"""
-        style = ParagraphStyle(
-            'Heading2',
-            fontName=Typography.DISPLAY_FONT,
-            fontSize=Typography.H2_SIZE,
-            textColor=BrandColors.BRAND_PURPLE,
-            leading=Typography.H2_SIZE * Typography.H2_LEADING,
-            spaceAfter=Layout.PARAGRAPH_SPACING,
-            spaceBefore=Layout.SECTION_SPACING
-        )
-        return Paragraph(text, style)
+    def create_h2(text, config=None):
+        """Create H2 heading in purple (text is plain, not markup)"""
+        config = config or get_config()
+        return CachedParagraph(escape_markup(text), config.styles['h2'])
     
     @staticmethod
-    def create_h3(text):
-        """Create H3 heading in purple"""
-        style = ParagraphStyle(
-            'Heading3',
-            fontName=Typography.DISPLAY_FONT,
-            fontSize=Typography.H3_SIZE,
-            textColor=BrandColors.BRAND_PURPLE,
-            leading=Typography.H3_SIZE * Typography.H3_LEADING,
-            spaceAfter=Layout.PARAGRAPH_SPACING / 2,
-            spaceBefore=Layout.PARAGRAPH_SPACING
-        )
-        return Paragraph(text, style)
+    def create_h3(text, config=None):
+        """Create H3 heading in purple (text is plain, not markup)"""
+        config = config or get_config()
+        return CachedParagraph(escape_markup(text), config.styles['h3'])
 
 
 class BodyTextComponent:
     """Generate body text paragraphs"""
     
     @staticmethod
-    def create(text, alignment='left'):
-        """Create body text paragraph"""
-        align_map = {
-            'left': TA_LEFT,
-            'center': TA_CENTER,
-            'justify': TA_JUSTIFY
+    def style(alignment='left', config=None):
+        """Body ParagraphStyle for an alignment"""
+        style_names = {
+            'left': 'body',
+            'center': 'body_center',
+            'justify': 'body_justify'
         }
         
-        style = ParagraphStyle(
-            'Body',
-            fontName=Typography.BODY_FONT,
-            fontSize=Typography.BODY_SIZE,
-            textColor=BrandColors.TEXT_BLACK,
-            leading=Typography.BODY_SIZE * Typography.BODY_LEADING,
-            spaceAfter=Layout.PARAGRAPH_SPACING,
-            alignment=align_map.get(alignment, TA_LEFT)
+        config = config or get_config()
+        return config.styles[style_names.get(alignment, 'body')]
+    
+    @staticmethod
+    def create(text, alignment='left', config=None):
+        """Create body text paragraph from Paragraph markup"""
+        return CachedParagraph(text, BodyTextComponent.style(alignment, config))
+
+
+class ListComponent:
+    """Generate bulleted and numbered lists"""
+    
+    @staticmethod
+    def create(items, start=None, config=None, delimiter='.'):
+        """
+        Create a list as a single flowable
+        
+        Args:
+            items: List item texts as Paragraph markup
+            start: First number for a numbered list, or None for bullets
+            config: BrandConfig (defaults to the standard Letter configuration)
+            delimiter: Character after each number, '.' or ')' as in the source
+        
+        Returns:
+            ReportLab ListFlowable
+        """
+        config = config or get_config()
+        Layout, BrandColors, Typography = config.layout, config.colors, config.typography
+        style = config.styles['list_item']
+        
+        numbered = start is not None
+        return ListFlowable(
+            [CachedParagraph(item, style) for item in items],
+            bulletType='1' if numbered else 'bullet',
+            start=start if numbered else None,
+            bulletFormat='%s' + delimiter if numbered else None,
+            bulletFontName=Typography.DISPLAY_FONT if numbered else Typography.BODY_FONT,
+            bulletFontSize=Typography.BODY_SIZE,
+            bulletColor=BrandColors.BRAND_PURPLE,
+            leftIndent=18,
+            spaceAfter=Layout.PARAGRAPH_SPACING
         )
-        return Paragraph(text, style)
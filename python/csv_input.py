@@ -0,0 +1,258 @@
+"""
+Sparken CSV/TSV Input
+Data exports rendered as one branded table, parsed and laid out a page of
+rows at a time so memory stays bounded however long the export is
+"""
+
+import csv
+import sys
+
+from reportlab.platypus import Flowable, Paragraph, Table
+
+from brand_constants import get_config
+from components import TableComponent, TABLE_CELL_PADDING, TABLE_HEADER_PADDING
+from inline_markup import escape_markup
+from text_sanitizer import sanitize_text
+
+
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+# Padding ReportLab's Frame keeps on each side (points)
+_FRAME_PADDING = 6
+
+# Appended to cells cut short because their row would not fit on a page
+CLIPPED_MARKER = ' … [truncated]'
+
+
+def input_format(metadata, path=None):
+    """
+    The tabular input format of a render, or None for markdown
+
+    metadata's inputFormat ('csv', 'tsv' or 'markdown') wins; otherwise a
+    .csv/.tsv input file name decides.
+    """
+    name = metadata.get('inputFormat')
+    if name is None and path:
+        name = path.rsplit('.', 1)[-1].lower()
+    return name if name in DELIMITERS else None
+
+
+def read_rows(stream, delimiter=',', budget=None):
+    """
+    Parse rows from a binary stream as it is read
+
+    Lines are decoded one at a time (a UTF-8 byte order mark is dropped and
+    undecodable bytes replaced), so nothing but the current row is held.
+
+    Args:
+        stream: Binary file object (a file or sys.stdin.buffer)
+        delimiter: ',' for CSV, '\\t' for TSV
+        budget: Optional RenderBudget; input bytes are counted as they are read
+
+    Yields:
+        Lists of cell strings
+
+    Raises:
+        BudgetExceeded: If the input goes over the budget's max_input_bytes
+        csv.Error: If the input is not valid CSV (e.g. an oversized field)
+    """
+    def lines():
+        size = 0
+        encoding = 'utf-8-sig'
+        for line in stream:
+            size += len(line)
+            if budget:
+                budget.check_input_bytes(size)
+            yield line.decode(encoding, errors='replace')
+            encoding = 'utf-8'
+
+    return csv.reader(lines(), delimiter=delimiter)
+
+
+class _RowStream:
+    """Rows of one table, shared by the StreamedTable pieces that lay it out"""
+
+    def __init__(self, rows, columns, col_widths, style):
+        self.rows = rows
+        self.columns = columns
+        self.col_widths = col_widths
+        self.style = style
+        self.pending = []      # Measured rows pulled from the iterator but not yet placed: (cells, height)
+        self.placed = 0        # Body rows already handed out in chunks
+        self.exhausted = False
+        self.truncated = False
+        self.header_height = None  # Set by StreamedTable, which measures the header once
+        self.max_height = None     # Tallest row a page can hold
+        self.clipped = False
+
+    def measure(self, cells, style, padding):
+        """Wrap a row's cells at their column widths; returns the row height as Table computes it"""
+        tallest = 0
+        for cell, width in zip(cells, self.col_widths):
+            tallest = max(tallest, cell.wrap(width - 2 * TABLE_CELL_PADDING, 72000)[1])
+        return tallest + 2 * padding
+
+    def clip(self, values, cells):
+        """
+        Cut the cells that make a row taller than a page, so the row still fits on one
+
+        A table row cannot split across pages, so without this a single huge
+        cell would stop the whole render with a LayoutError.
+
+        Returns:
+            (cells, row height)
+        """
+        if not self.clipped:
+            self.clipped = True
+            print("CSV cells too tall for a page are truncated", file=sys.stderr)
+        limit = self.max_height - 2 * TABLE_CELL_PADDING
+        for i, (value, width) in enumerate(zip(values, self.col_widths)):
+            if cells[i].height <= limit:
+                continue
+            # Longest prefix that still fits, by bisection on its length
+            width -= 2 * TABLE_CELL_PADDING
+            low, high = 0, len(value)
+            while low < high:
+                middle = (low + high + 1) // 2
+                cell = Paragraph(escape_markup(value[:middle].rstrip() + CLIPPED_MARKER), self.style)
+                if cell.wrap(width, 72000)[1] <= limit:
+                    low = middle
+                else:
+                    high = middle - 1
+            cells[i] = Paragraph(escape_markup(value[:low].rstrip() + CLIPPED_MARKER), self.style)
+        return cells, self.measure(cells, self.style, TABLE_CELL_PADDING)
+
+    def fill(self, height):
+        """Pull and measure rows until the pending ones are taller than height"""
+        total = sum(row_height for _, row_height in self.pending)
+        while total <= height and not self.exhausted:
+            values = next(self.rows, None)
+            if values is None:
+                self.exhausted = True
+                break
+            if len(values) > self.columns and not self.truncated:
+                self.truncated = True
+                print(f"CSV rows wider than the header ({self.columns} columns) are truncated", file=sys.stderr)
+            values = values[:self.columns] + [''] * (self.columns - len(values))
+            values = [sanitize_text(value.strip()) for value in values]
+            cells = [Paragraph(escape_markup(value), self.style) for value in values]
+            row_height = self.measure(cells, self.style, TABLE_CELL_PADDING)
+            if row_height > self.max_height:
+                cells, row_height = self.clip(values, cells)
+            self.pending.append((cells, row_height))
+            total += row_height
+
+
+class StreamedTable(Flowable):
+    """
+    Branded table whose body rows come from an iterator, laid out a page at a time
+
+    When the frame asks it to split, it takes as many rows as fit in the
+    space left and returns them as a TableComponent-styled Table under its
+    own copy of the header row, followed by a StreamedTable for the rest.
+    Only the rows of the page being laid out are in memory; stripes continue
+    across pages.
+    """
+
+    def __init__(self, header, rows, simple=False, config=None, _stream=None):
+        """
+        Args:
+            header: Header row (list of strings)
+            rows: Iterator of body rows (lists of strings; short rows are padded,
+                  long rows truncated to the header's width, and cells too tall
+                  for a page cut short with CLIPPED_MARKER)
+            simple: Draft styling, as for TableComponent.create
+            config: BrandConfig (defaults to the standard Letter configuration)
+        """
+        Flowable.__init__(self)
+        self.simple = simple
+        self.config = config or get_config()
+        if _stream is None:
+            Layout, styles = self.config.layout, self.config.styles
+            columns = max(len(header), 1)
+            col_widths = [Layout.CONTENT_WIDTH / columns] * columns
+            _stream = _RowStream(rows, columns, col_widths, styles['table_cell'])
+        self.stream = _stream
+        self._header = header
+        self._chunk = None
+        self._taken = None  # (availHeight, table, row count) of the last _take
+        if _stream.header_height is None:
+            _stream.header_height = _stream.measure(self._header_cells(), self.config.styles['table_header'],
+                                                    TABLE_HEADER_PADDING)
+            page_height = self.config.layout.CONTENT_HEIGHT - 2 * _FRAME_PADDING
+            _stream.max_height = page_height - _stream.header_height
+
+    def _header_cells(self):
+        """Fresh header cells: a flowable can only be drawn by one table"""
+        style = self.config.styles['table_header']
+        values = self._header + [''] * (self.stream.columns - len(self._header))
+        return [Paragraph(escape_markup(sanitize_text(value.strip())), style) for value in values]
+
+    def _take(self, availHeight):
+        """Table of the pending rows that fit under the header in availHeight, or None"""
+        # wrap() and then split() ask for the same height: build that chunk once
+        if self._taken is not None and self._taken[0] == availHeight:
+            return self._taken[1:]
+        stream = self.stream
+        header_height = stream.header_height
+        stream.fill(availHeight - header_height)
+        used, count = header_height, 0
+        for _, row_height in stream.pending:
+            if used + row_height > availHeight:
+                break
+            used += row_height
+            count += 1
+        if count == 0 and (stream.pending or not stream.exhausted):
+            return None, 0
+        rows = stream.pending[:count]
+        table = Table([self._header_cells()] + [cells for cells, _ in rows], colWidths=stream.col_widths,
+                      rowHeights=[header_height] + [row_height for _, row_height in rows])
+        table.setStyle(TableComponent.style(count + 1, self.simple, self.config, first_row=stream.placed + 1))
+        self._taken = (availHeight, table, count)
+        return table, count
+
+    def wrap(self, availWidth, availHeight):
+        self._chunk, count = self._take(availHeight)
+        stream = self.stream
+        if self._chunk is not None and count == len(stream.pending) and stream.exhausted:
+            return self._chunk.wrap(availWidth, availHeight)
+        # More rows than fit: report a height the frame cannot take, so it splits
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        table, count = self._take(availHeight)
+        if table is None:
+            return []
+        stream = self.stream
+        del stream.pending[:count]
+        stream.placed += count
+        if not stream.pending and stream.exhausted:
+            return [table]
+        return [table, StreamedTable(self._header, None, self.simple, self.config, _stream=stream)]
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        # Only reached when the rest of the table fit: draw the chunk wrap() built
+        self.stream.placed += len(self.stream.pending)
+        self.stream.pending = []
+        self._chunk.drawOn(canvas, x, y, _sW)
+
+
+def create_table(stream, delimiter=',', simple=False, config=None, budget=None):
+    """
+    Parse the header row of a CSV/TSV stream and return a StreamedTable for it
+
+    Args:
+        stream: Binary file object
+        delimiter: Field delimiter
+        simple: Draft styling
+        config: BrandConfig
+        budget: Optional RenderBudget
+
+    Returns:
+        StreamedTable, or None for an empty input
+    """
+    rows = read_rows(stream, delimiter, budget)
+    header = next(rows, None)
+    if not header:
+        return None
+    return StreamedTable(header, rows, simple, config)
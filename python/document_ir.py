@@ -0,0 +1,218 @@
+"""
+Sparken Document IR
+Compact intermediate representation produced by the markdown parser and
+consumed by the PDF and preview renderers
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+# Bump whenever the parser or the block layout changes so stale cache entries are ignored
+IR_VERSION = 4
+
+
+# ============================================================================
+# BLOCKS
+# ============================================================================
+
+class Block:
+    """
+    Base class for document blocks
+
+    Text fields hold inline markdown source; each renderer converts it to its
+    own markup. start/end are 1-based source line numbers.
+    """
+
+    __slots__ = ('start', 'end')
+    kind = None
+    fields = ()
+
+    def __init__(self, *values, start=0, end=0):
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+        self.start = start
+        self.end = end or start
+
+    def to_list(self):
+        """Serialize as a compact JSON-friendly list: [kind, *fields, start, end]"""
+        return [self.kind] + [getattr(self, name) for name in self.fields] + [self.start, self.end]
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_list() == other.to_list()
+
+    def __repr__(self):
+        values = ', '.join(repr(getattr(self, name)) for name in self.fields)
+        return f"{type(self).__name__}({values}, start={self.start}, end={self.end})"
+
+
+class HeadingBlock(Block):
+    """Heading - level 1-3, plain text"""
+    __slots__ = ('level', 'text')
+    kind = 'h'
+    fields = __slots__
+
+
+class ParagraphBlock(Block):
+    """Body paragraph"""
+    __slots__ = ('text',)
+    kind = 'p'
+    fields = __slots__
+
+
+class ListBlock(Block):
+    """Bulleted list (start_number is None) or numbered list with its '.' or ')' delimiter"""
+    __slots__ = ('items', 'start_number', 'delimiter')
+    kind = 'l'
+    fields = __slots__
+
+
+class TableBlock(Block):
+    """Table - list of rows, first row is the header"""
+    __slots__ = ('rows',)
+    kind = 't'
+    fields = __slots__
+
+
+class CalloutBlock(Block):
+    """Callout box text"""
+    __slots__ = ('text',)
+    kind = 'c'
+    fields = __slots__
+
+
+class ImageBlock(Block):
+    """Image on its own line - source path as written, plus alt text"""
+    __slots__ = ('src', 'alt')
+    kind = 'i'
+    fields = __slots__
+
+
+BLOCK_TYPES = {cls.kind: cls for cls in (HeadingBlock, ParagraphBlock, ListBlock, TableBlock, CalloutBlock,
+                                         ImageBlock)}
+
+
+class Document:
+    """Parsed document: metadata (title, subtitle) plus an ordered list of blocks"""
+
+    __slots__ = ('metadata', 'blocks')
+
+    def __init__(self, metadata=None, blocks=None):
+        self.metadata = metadata or {}
+        self.blocks = blocks or []
+
+    def headings(self):
+        """Return the heading blocks in document order"""
+        return [block for block in self.blocks if block.kind == 'h']
+
+    def to_json(self):
+        """Serialize to compact JSON"""
+        payload = {
+            'v': IR_VERSION,
+            'metadata': self.metadata,
+            'blocks': [block.to_list() for block in self.blocks],
+        }
+        return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Deserialize from to_json() output
+
+        Raises:
+            ValueError: If the data was written by a different IR version
+        """
+        payload = json.loads(data)
+        if payload.get('v') != IR_VERSION:
+            raise ValueError(f"Unsupported IR version: {payload.get('v')}")
+
+        blocks = []
+        for entry in payload['blocks']:
+            block_type = BLOCK_TYPES[entry[0]]
+            values = entry[1:-2]
+            blocks.append(block_type(*values, start=entry[-2], end=entry[-1]))
+        return cls(payload['metadata'], blocks)
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def content_key(text):
+    """Cache key for a markdown input"""
+    digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    return f"v{IR_VERSION}-{digest}"
+
+
+class DocumentCache:
+    """
+    Parsed-document cache keyed by input hash
+
+    Keeps a bounded in-memory LRU and, when cache_dir is set, a JSON file per
+    entry on disk so short-lived CLI processes can share parse results.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached Document for key, or None"""
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return document
+
+        if self.cache_dir:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    document = Document.from_json(f.read())
+            except (OSError, ValueError, KeyError, IndexError):
+                document = None
+            if document is not None:
+                self._remember(key, document)
+                with self._lock:
+                    self.hits += 1
+                return document
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, document):
+        """Store a Document in memory and, if configured, on disk"""
+        self._remember(key, document)
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write then rename so concurrent readers never see a partial file
+                tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(document.to_json())
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                pass  # The disk cache is best-effort
+
+    def _remember(self, key, document):
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Process-wide cache; SPARKEN_CACHE_DIR enables the on-disk layer
+document_cache = DocumentCache(cache_dir=os.environ.get('SPARKEN_CACHE_DIR') or None)
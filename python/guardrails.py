@@ -0,0 +1,212 @@
+"""
+Sparken Render Guardrails
+Resource budgets (input size, blocks, table cells, pages, wall time, memory)
+checked while reading, parsing and laying out a document
+"""
+
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# Exit code the CLI uses for budget breaches, so callers can tell them from crashes
+BUDGET_EXIT_CODE = 3
+
+# Bytes read from the input per chunk
+_READ_CHUNK = 64 * 1024
+
+# Extra address space allowed above the RSS budget before allocations fail outright
+_ADDRESS_SPACE_HEADROOM_MB = 512
+
+
+class BudgetExceeded(Exception):
+    """A render went over one of its resource budgets"""
+
+    def __init__(self, limit, value, budget):
+        """
+        Args:
+            limit: Budget name (a RenderLimits attribute, e.g. 'max_table_cells')
+            value: Observed value
+            budget: Configured maximum
+        """
+        super().__init__(f"{limit} exceeded: {value} > {budget}")
+        self.limit = limit
+        self.value = value
+        self.budget = budget
+
+    def __reduce__(self):
+        # Keep the structured fields when the error crosses a process boundary
+        return (BudgetExceeded, (self.limit, self.value, self.budget))
+
+    def to_dict(self):
+        """Structured form reported to callers"""
+        return {
+            'error': 'budget_exceeded',
+            'limit': self.limit,
+            'value': self.value,
+            'budget': self.budget,
+            'message': str(self),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+class RenderLimits:
+    """
+    Budgets for one render
+
+    Defaults can be changed per deployment through SPARKEN_<NAME> environment
+    variables (e.g. SPARKEN_MAX_INPUT_BYTES); 0 disables a budget.
+    """
+
+    DEFAULTS = {
+        'max_input_bytes': 10 * 1024 * 1024,
+        'max_blocks': 20000,
+        'max_table_cells': 50000,
+        'max_pages': 500,
+        'max_seconds': 120,
+        'max_rss_mb': 1024,
+    }
+
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown render limit(s): {', '.join(sorted(unknown))}")
+        for name, default in self.DEFAULTS.items():
+            env_value = os.environ.get(f"SPARKEN_{name.upper()}")
+            if name in overrides:
+                value = overrides[name]
+            elif env_value:
+                value = float(env_value) if name == 'max_seconds' else int(env_value)
+            else:
+                value = default
+            setattr(self, name, value or None)
+
+    def start(self):
+        """Start the clock and return a RenderBudget for one render"""
+        return RenderBudget(self)
+
+
+def _rss_mb():
+    """
+    Current resident set size of this process in MB, or None if unknown
+
+    Read from /proc/self/statm where there is one. Elsewhere the peak RSS is
+    the best available figure; it never goes down, so a long-lived process
+    that once went over the budget keeps failing the check.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class RenderBudget:
+    """
+    Running checks for one render against its RenderLimits
+
+    All check_* methods raise BudgetExceeded. The memory check reads the
+    process's current RSS, so with several renders in one process it bounds
+    their combined usage; memory an earlier render has released does not count.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.started = time.monotonic()
+        self.blocks = 0
+        self.table_cells = 0
+
+    def _check(self, limit, value):
+        budget = getattr(self.limits, limit)
+        if budget and value > budget:
+            raise BudgetExceeded(limit, value, budget)
+
+    def check_input_bytes(self, size):
+        self._check('max_input_bytes', size)
+
+    def add_block(self):
+        """Count a parsed block; also checks the clock"""
+        self.blocks += 1
+        self._check('max_blocks', self.blocks)
+        self.check_time()
+
+    def add_table_cells(self, count):
+        """Count table cells as rows are parsed, before the table is complete"""
+        self.table_cells += count
+        self._check('max_table_cells', self.table_cells)
+
+    def check_document(self, document):
+        """Count a whole Document (e.g. a cache hit) in one go"""
+        for block in document.blocks:
+            if block.kind == 't':
+                self.add_table_cells(sum(len(row) for row in block.rows))
+            self.add_block()
+
+    def check_time(self):
+        if self.limits.max_seconds:
+            self._check('max_seconds', round(time.monotonic() - self.started, 2))
+
+    def check_page(self, page):
+        """Per-page check during layout: page count, clock and memory"""
+        self._check('max_pages', page)
+        self.check_time()
+        self.check_memory()
+
+    def check_memory(self):
+        if self.limits.max_rss_mb:
+            rss = _rss_mb()
+            if rss is not None:
+                self._check('max_rss_mb', round(rss))
+
+
+def read_limited(stream, budget):
+    """
+    Read a text stream in chunks, failing as soon as it exceeds the input budget
+
+    Args:
+        stream: Binary file object (stdin.buffer or an open file)
+        budget: RenderBudget
+
+    Returns:
+        Decoded UTF-8 text
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = stream.read(_READ_CHUNK)
+        if not chunk:
+            break
+        size += len(chunk)
+        budget.check_input_bytes(size)
+        chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8')
+
+
+def cap_address_space(limits):
+    """
+    Make runaway allocations raise MemoryError instead of inviting the OOM killer
+
+    Only for single-render processes (the CLI); the cap applies to the whole process.
+    """
+    if resource is None or not limits.max_rss_mb:
+        return
+    cap = int((limits.max_rss_mb + _ADDRESS_SPACE_HEADROOM_MB) * 1024 * 1024)
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        cap = min(cap, hard)
+    if soft == resource.RLIM_INFINITY or soft > cap:
+        resource.setrlimit(resource.RLIMIT_AS, (cap, hard))
@@ -0,0 +1,243 @@
+"""
+Sparken Images
+Lazily decoded, downscaled document images with a shared, size-bounded cache
+"""
+
+import hashlib
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+
+# Resolution images are downscaled to for print
+TARGET_DPI = 150
+
+# Resolution for renders at reduced image quality (the render service under load)
+LOW_QUALITY_DPI = 72
+
+# Resolution assumed for images without DPI metadata (screen captures, charts)
+DEFAULT_SOURCE_DPI = 96
+
+# Placeholder height for images that cannot be shown
+_PLACEHOLDER_HEIGHT = 36
+
+_READ_CHUNK = 1024 * 1024
+
+
+# ============================================================================
+# PATHS
+# ============================================================================
+
+def resolve_image_path(src, image_dir):
+    """
+    Resolve a markdown image reference to a local file
+
+    Only files inside image_dir are allowed, so documents from the network
+    cannot read arbitrary files. URLs are not fetched.
+
+    Args:
+        src: Path from ![alt](src)
+        image_dir: Directory images are resolved against (None disables images)
+
+    Returns:
+        Absolute path, or None if the image is not allowed or does not exist
+    """
+    if not image_dir or '://' in src or src.startswith('data:'):
+        return None
+    root = os.path.realpath(image_dir)
+    path = os.path.realpath(os.path.join(root, src))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class ImageCache:
+    """
+    Decoded, downscaled images keyed by file content hash and target size
+
+    Bounded by the decoded size in bytes (LRU eviction), so image-heavy
+    documents cannot grow memory without limit. The same chart used in many
+    documents, or on many pages, is decoded once. Safe to use from several threads.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._digests = {}  # (path, mtime, size) -> content hash
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def file_digest(self, path):
+        """Content hash of a file, remembered per path/mtime/size"""
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(_READ_CHUNK), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            with self._lock:
+                if len(self._digests) >= 1024:
+                    self._digests.clear()
+                self._digests[key] = digest
+        return digest
+
+    def get(self, path, width, height):
+        """
+        Return the image at path decoded and downscaled to at most width x height pixels
+
+        Returns:
+            PIL Image (treat as read-only)
+        """
+        key = (self.file_digest(path), width, height)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+        image = _decode(path, width, height)
+        size = image.width * image.height * len(image.getbands())
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = image
+                    self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.bytes -= evicted.width * evicted.height * len(evicted.getbands())
+        return image
+
+
+def _decode(path, width, height):
+    """Decode an image at (at most) the target pixel size"""
+    with Image.open(path) as source:
+        # JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding
+        source.draft('RGB', (width, height))
+        has_alpha = source.mode in ('RGBA', 'LA', 'PA') or 'transparency' in source.info
+        image = source.convert('RGBA' if has_alpha else 'RGB')
+    if image.width > width or image.height > height:
+        image = image.resize((width, height), Image.LANCZOS)
+    return image
+
+
+def _cache_from_env():
+    megabytes = os.environ.get('SPARKEN_IMAGE_CACHE_MB')
+    return ImageCache(int(megabytes) * 1024 * 1024 if megabytes else 64 * 1024 * 1024)
+
+
+# Process-wide cache; SPARKEN_IMAGE_CACHE_MB sets its size
+image_cache = _cache_from_env()
+
+
+# ============================================================================
+# FLOWABLE
+# ============================================================================
+
+def _header_size(path):
+    """(pixel width, pixel height, dpi) from the image header, without decoding"""
+    with Image.open(path) as image:
+        dpi = image.info.get('dpi', (DEFAULT_SOURCE_DPI,))[0] or DEFAULT_SOURCE_DPI
+        return image.width, image.height, float(dpi)
+
+
+class LazyImage(Flowable):
+    """
+    Image sized from its header during layout and decoded only when drawn
+
+    Shown at its natural size (by its DPI metadata) but never wider than the
+    frame or taller than max_height; pixels are downscaled to TARGET_DPI at
+    that size (or dpi). Unreadable images, and every image in placeholder
+    mode, draw a box with the alt text instead.
+    """
+
+    def __init__(self, path, alt='', max_height=None, placeholder=False, cache=None,
+                 fill_color=None, text_color=None, dpi=None):
+        """
+        Args:
+            path: Resolved image path, or None if unavailable
+            alt: Alt text (shown in placeholders)
+            max_height: Tallest allowed size in points (the frame height)
+            placeholder: Draw a same-sized box instead of the image (draft mode)
+            cache: ImageCache (defaults to the process-wide cache)
+            fill_color, text_color: Placeholder colors
+            dpi: Resolution pixels are downscaled to (default TARGET_DPI)
+        """
+        Flowable.__init__(self)
+        self.path = path
+        self.alt = alt
+        self.max_height = max_height
+        self.placeholder = placeholder
+        self.cache = cache if cache is not None else image_cache
+        self.fill_color = fill_color
+        self.text_color = text_color
+        self.dpi = dpi or TARGET_DPI
+        self._natural = None
+        if path:
+            try:
+                self._natural = _header_size(path)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                print(f"Could not read image {path}: {e}", file=sys.stderr)
+                self.path = None
+        self.draw_width = self.draw_height = 0
+
+    def wrap(self, availWidth, availHeight):
+        if self._natural is None:
+            self.draw_width, self.draw_height = availWidth, _PLACEHOLDER_HEIGHT
+        else:
+            pixel_width, pixel_height, dpi = self._natural
+            width = min(availWidth, pixel_width * 72.0 / dpi)
+            height = width * pixel_height / pixel_width
+            if self.max_height and height > self.max_height:
+                width, height = width * self.max_height / height, self.max_height
+            self.draw_width, self.draw_height = width, height
+        return self.draw_width, self.draw_height
+
+    def draw(self):
+        if self.path and not self.placeholder:
+            pixel_width, pixel_height, _ = self._natural
+            target_width = max(1, min(pixel_width, math.ceil(self.draw_width / 72.0 * self.dpi)))
+            target_height = max(1, min(pixel_height, math.ceil(self.draw_height / 72.0 * self.dpi)))
+            try:
+                image = self.cache.get(self.path, target_width, target_height)
+                self.canv.drawImage(ImageReader(image), 0, 0, self.draw_width, self.draw_height,
+                                    mask='auto')
+                return
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                print(f"Could not draw image {self.path}: {e}", file=sys.stderr)
+        self._draw_placeholder()
+
+    def _draw_placeholder(self):
+        canvas_obj = self.canv
+        canvas_obj.saveState()
+        if self.fill_color is not None:
+            canvas_obj.setFillColor(self.fill_color)
+            canvas_obj.rect(0, 0, self.draw_width, self.draw_height, fill=1, stroke=0)
+        if self.text_color is not None:
+            canvas_obj.setFillColor(self.text_color)
+        label = self.alt or os.path.basename(self.path or '') or 'Image'
+        if not self.path:
+            label = f"[Image unavailable: {label}]"
+        canvas_obj.setFont('Helvetica-Oblique', 9)
+        canvas_obj.drawCentredString(self.draw_width / 2, self.draw_height / 2 - 3, label[:120])
+        canvas_obj.restoreState()
@@ -0,0 +1,332 @@
+"""
+Sparken Inline Markup Converter
+Single-pass conversion of inline markdown (bold, italic, code, links) into
+escaped ReportLab Paragraph markup
+"""
+
+import re
+
+from brand_constants import BrandColors
+
+
+# Characters that may be backslash-escaped in markdown source
+ESCAPABLE_CHARS = frozenset('\\`*_{}[]()#+-.!~=|<>$@&^%')
+
+# Characters that can start an inline construct - everything else is literal
+_SPECIAL = re.compile(r'[\\`*_\[]')
+
+# The next inline construct. The groups match the common self-contained forms in
+# one step - an escape, or bold, italic, code or a link whose content holds no
+# other special character - and give exactly what the general scan would;
+# anything else matches as its bare special character. Every branch starts with
+# a literal so the regex engine can still skip ordinary text by first character.
+_TOKEN = re.compile(
+    r'\\([\\`*_{}\[\]()#+\-.!~=|<>$@&^%])'
+    r'|\*\*([^\s\\`*_\[](?:[^\\`*_\[]*[^\s\\`*_\[])?)\*\*(?!\*)'
+    r'|\*([^\s\\`*_\[](?:[^\\`*_\[]*[^\s\\`*_\[])?)\*(?!\*)'
+    r'|`([^`]+)`'
+    r'|\[([^\\`*_\[\]]+)\]\((\s*(?:[^\s()]|\([^\s()]*\))*\s*)\)'
+    r'|\\|`|\*|_|\['
+)
+
+# A link target with balanced parentheses up to its closing ')'; targets with
+# spaces fall back to the first ')'
+_LINK_TARGET = re.compile(r'\s*(?:[^\s()]|\([^\s()]*\))*\s*\)')
+
+
+def escape_markup(text):
+    """Escape text so ReportLab's Paragraph parser treats it literally"""
+    # Chained replace is several times faster than str.translate for short strings
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class _Target:
+    """Output vocabulary for one markup flavour
+
+    Callers escape the whole source once before scanning. None of the characters
+    escaping rewrites are inline delimiters, so every literal slice the scanner
+    copies out is already escaped.
+    """
+
+    def __init__(self, bold, italic, code, link):
+        self.bold = bold
+        self.italic = italic
+        self.code = code
+        self.link = link
+
+
+def _paragraph_target(link_color):
+    """Build the Paragraph markup vocabulary with links drawn in link_color (hex, no '#')"""
+    def link(url, label):
+        # In-document anchors left over from PDF extraction carry no useful target
+        if url.startswith('#') or not url:
+            return label
+        href = url.replace('"', '&quot;')
+        return f'<a href="{href}" color="#{link_color}">{label}</a>'
+
+    return _Target(
+        bold='<b>%s</b>',
+        italic='<i>%s</i>',
+        code='<font face="Courier">%s</font>',
+        link=link,
+    )
+
+
+PARAGRAPH = _paragraph_target(BrandColors.DEEP_COGNITIVE_PURPLE_HEX)
+
+# Paragraph targets for brand color overrides, keyed by link color
+_paragraph_targets = {BrandColors.DEEP_COGNITIVE_PURPLE_HEX: PARAGRAPH}
+
+PLAIN = _Target(
+    bold='%s',
+    italic='%s',
+    code='%s',
+    link=lambda url, label: label,
+)
+
+
+def escape_html(text):
+    """Escape text for HTML element content and double-quoted attributes"""
+    return escape_markup(text).replace('"', '&quot;')
+
+
+def _html_link(url, label):
+    # Only navigable schemes become links in previews; everything else keeps its label
+    if not url.lower().startswith(('http://', 'https://', 'mailto:')):
+        return label
+    return f'<a href="{url}">{label}</a>'
+
+
+HTML = _Target(
+    bold='<strong>%s</strong>',
+    italic='<em>%s</em>',
+    code='<code>%s</code>',
+    link=_html_link,
+)
+
+
+def _convert(text, target):
+    """
+    Scan pre-escaped text once, left to right, emitting target markup
+
+    Plain constructs such as '**word**' convert in one regex step. For the rest,
+    closing delimiters are located with memoised forward searches, so a run of
+    unmatched openers never rescans the rest of the line. Emphasis nests: a
+    single '*' or '_' is closed by an odd-length run of the same character (a
+    pair inside it is bold), '***' opens bold italic and longer runs open bold
+    around the remainder.
+
+    Args:
+        text: Escaped inline markdown source (a single line or paragraph)
+        target: Output vocabulary (PARAGRAPH, HTML or PLAIN)
+
+    Returns:
+        Converted string
+    """
+    if _SPECIAL.search(text) is None:
+        return text
+
+    out = []
+    n = len(text)
+    searches = {}  # Needle -> (start, found) of its last search
+
+    def find(delim, pos):
+        # The last search saw no occurrence in [start, found), so its result is
+        # still the first one for any pos from start up to found (or beyond, for a miss)
+        cached = searches.get(delim)
+        if cached is not None and cached[0] <= pos and (cached[1] == -1 or cached[1] >= pos):
+            return cached[1]
+        found = text.find(delim, pos)
+        searches[delim] = (pos, found)
+        return found
+
+    def run_bounds(pos):
+        # The maximal run of text[pos] around pos, as (start, end)
+        char = text[pos]
+        start = end = pos
+        while start > 0 and text[start - 1] == char:
+            start -= 1
+        while end < n and text[end] == char:
+            end += 1
+        return start, end
+
+    def find_single(char, pos):
+        # First position at or after pos that can close single emphasis: the last
+        # character of an odd-length run, so the pairs of '**b**' are skipped.
+        # Whether a position qualifies does not depend on pos, so results memoise like find()
+        key = (char, 1)
+        cached = searches.get(key)
+        if cached is not None and cached[0] <= pos and (cached[1] == -1 or cached[1] >= pos):
+            return cached[1]
+        start = pos
+        found = text.find(char, pos)
+        while found != -1:
+            if text[found - 1] != char and (found + 1 == n or text[found + 1] != char):
+                break
+            start, end = run_bounds(found)
+            if (end - start) % 2:
+                found = end - 1
+                break
+            found = text.find(char, end)
+        searches[key] = (start, found)
+        return found
+
+    formats = (None, '%s', target.bold, target.italic, target.code)
+    literal_start = 0
+    i = 0
+    while True:
+        # Self-contained constructs convert in place; only a bare special character
+        # drops out of this loop to the general scan below
+        for match in _TOKEN.finditer(text, i):
+            group = match.lastindex
+            if group is None:
+                break
+            start, end = match.span()
+            out.append(text[literal_start:start])
+            if group < 5:
+                out.append(formats[group] % match[group])
+            else:
+                out.append(target.link(match[6].strip(), match[5]))
+            literal_start = end
+        else:
+            break
+        i = match.start()
+        char = text[i]
+        end = -1
+        piece = None
+
+        if char == '\\':
+            if i + 1 < n and text[i + 1] in ESCAPABLE_CHARS:
+                piece = text[i + 1]
+                end = i + 2
+
+        elif char == '`':
+            close = find('`', i + 1)
+            if close > i + 1:
+                piece = target.code % text[i + 1:close]
+                end = close + 1
+
+        elif char == '*' or char == '_':
+            width = 1
+            if i + 1 < n and text[i + 1] == char:
+                width = 3 if text.startswith(char, i + 2) else 2
+            inner = i + width
+            if width == 3 and text.startswith(char, inner):
+                # Four or more: bold around whatever the rest of the run opens, closed by the
+                # last pair of an equally long run ('****a****' is bold inside bold)
+                run = i + 4
+                while run < n and text[run] == char:
+                    run += 1
+                close = find(text[i:run], run)
+                if close == -1:
+                    # Nothing closes the whole run - its leading characters are literal
+                    i = run - 3
+                    continue
+                width, inner, close = 2, i + 2, close + run - i - 2
+            else:
+                close = find_single(char, inner) if width == 1 else find(char * width, inner)
+            if width == 3 and close == -1:
+                # No '***' to close it: whichever of the bold and italic inside closes first
+                # is the inner one, as in '***a* b**' and '***a** b*'
+                single, pair = find_single(char, i + 3), find(char * 2, i + 3)
+                if single != -1 and -1 < pair < single:
+                    width, inner, close = 1, i + 1, single
+                elif single == -1 and pair != -1:
+                    # Only a pair closes: the first character is literal, as in '***a** b'
+                    i += 1
+                    continue
+                else:
+                    width, inner = 2, i + 2
+                    close = find(char * 2, inner)
+            if width == 2 and close != -1 and text.startswith(char, close + 2):
+                # A pair closing at the start of '***' leaves the last character to an inner italic
+                if run_bounds(close)[1] - close == 3:
+                    close += 1
+            if (close > inner and not text[inner].isspace() and not text[close - 1].isspace()
+                    # Underscores only delimit emphasis at word boundaries (snake_case stays intact)
+                    and (char == '*' or ((i == 0 or not text[i - 1].isalnum())
+                                         and (close + width >= n or not text[close + width].isalnum())))):
+                piece = _convert(text[inner:close], target)
+                if width != 2:
+                    piece = target.italic % piece
+                if width != 1:
+                    piece = target.bold % piece
+                end = close + width
+            elif width > 1:
+                # Unmatched run - its characters are literal
+                i += width
+                continue
+
+        else:  # '['
+            close = find(']', i + 1)
+            if close > i + 1 and text.startswith('(', close + 1):
+                # Parentheses inside the target nest, as in https://e.com/a_(b)
+                balanced = _LINK_TARGET.match(text, close + 2)
+                url_end = balanced.end() - 1 if balanced else find(')', close + 2)
+                if url_end != -1:
+                    label = _convert(text[i + 1:close], target)
+                    piece = target.link(text[close + 2:url_end].strip(), label)
+                    end = url_end + 1
+
+        if piece is None:
+            i += 1
+            continue
+
+        if literal_start < i:
+            out.append(text[literal_start:i])
+        out.append(piece)
+        i = literal_start = end
+
+    if literal_start < n:
+        out.append(text[literal_start:])
+    return ''.join(out)
+
+
+def to_paragraph_markup(text, link_color=None):
+    """
+    Convert inline markdown to ReportLab Paragraph markup
+
+    Bold, italic, inline code and links become <b>, <i>, <font> and <a> tags;
+    everything else is escaped so stray '&' or '<' characters cannot break
+    Paragraph parsing.
+
+    Args:
+        text: Inline markdown source
+        link_color: Link hex color without '#' (defaults to the brand purple)
+
+    Returns:
+        Escaped Paragraph markup
+    """
+    target = PARAGRAPH
+    if link_color:
+        target = _paragraph_targets.get(link_color)
+        if target is None:
+            # Benign race: two threads may build equivalent targets
+            target = _paragraph_targets.setdefault(link_color, _paragraph_target(link_color))
+    return _convert(escape_markup(text), target)
+
+
+def to_plain_text(text):
+    """
+    Strip inline markdown, keeping only the visible text
+
+    Args:
+        text: Inline markdown source
+
+    Returns:
+        Unescaped plain text (for cover titles, TOC entries and headings)
+    """
+    return _convert(text, PLAIN)
+
+
+def to_html(text):
+    """
+    Convert inline markdown to escaped HTML (for previews)
+
+    Args:
+        text: Inline markdown source
+
+    Returns:
+        HTML fragment
+    """
+    return _convert(escape_html(text), HTML)
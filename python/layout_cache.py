@@ -0,0 +1,288 @@
+"""
+Sparken Layout Cache
+Parsed markup and wrapped lines of paragraphs, reused across renders when the
+same text is laid out again in the same style and width
+"""
+
+import copy
+import hashlib
+import io
+import os
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from reportlab.platypus import Paragraph
+from reportlab.platypus import paragraph
+
+from outline import HEADING_MARK, TOC_MARK
+
+
+# Longer paragraphs are unlikely to recur word for word and are costly to keep
+MAX_CACHED_CHARS = 4000
+
+# Attributes that mark where a paragraph starts; split() gives them to the first piece
+START_MARKS = (HEADING_MARK, TOC_MARK)
+
+# Classes a cached layout is built from - the only ones the disk layer will load
+_PICKLE_CLASSES = {
+    ('reportlab.platypus.paraparser', 'ParaFrag'),
+    ('reportlab.platypus.paragraph', 'ParaLines'),
+    ('reportlab.platypus.paragraph', 'FragLine'),
+    ('reportlab.lib.abag', 'ABag'),
+    ('reportlab.lib.colors', 'Color'),
+    ('reportlab.lib.colors', 'CMYKColor'),
+}
+# Line breaking also produces word and fragment lists as str/list subclasses
+_PICKLE_CLASSES.update((paragraph.__name__, name) for name, value in vars(paragraph).items()
+                       if isinstance(value, type) and issubclass(value, (str, list))
+                       and value.__module__ == paragraph.__name__)
+
+
+class _LayoutUnpickler(pickle.Unpickler):
+    """Unpickler limited to layout classes, so a tampered cache file cannot run code"""
+
+    def find_class(self, module, name):
+        if (module, name) not in _PICKLE_CLASSES:
+            raise pickle.UnpicklingError(f"{module}.{name} is not a layout class")
+        return super().find_class(module, name)
+
+
+# ============================================================================
+# STYLE IDENTITY
+# ============================================================================
+
+_style_keys = weakref.WeakKeyDictionary()
+_style_lock = threading.Lock()
+
+
+def style_key(style):
+    """
+    Identity of a ParagraphStyle for cache keys
+
+    Derived from the style's resolved attributes rather than its name, so the
+    per-config style sets and styles derived on the fly (continued paragraph
+    pieces) share entries when they lay text out the same way.
+    """
+    with _style_lock:
+        key = _style_keys.get(style)
+    if key is None:
+        attributes = sorted((name, repr(value)) for name, value in style.__dict__.items()
+                            if name not in ('name', 'parent'))
+        key = hashlib.sha256(repr(attributes).encode('utf-8')).hexdigest()[:32]
+        with _style_lock:
+            _style_keys[style] = key
+    return key
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class LayoutCache:
+    """
+    Paragraph layout cache keyed by text, style and available width
+
+    Keeps a bounded in-memory LRU for long-lived render workers and, when
+    cache_dir is set, a pickle file per entry so CLI processes can share
+    layouts. Every entry remembers how long it took to compute, so hits can
+    report the time they saved. Safe to use from several threads.
+    """
+
+    def __init__(self, max_entries=2048, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pickle")
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[0]
+                return entry[1]
+
+        if self.cache_dir:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    entry = _LayoutUnpickler(io.BytesIO(f.read())).load()
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                    self.saved_seconds += entry[0]
+                return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, seconds):
+        """Store a layout that took seconds to compute, in memory and, if configured, on disk"""
+        entry = (seconds, value)
+        self._remember(key, entry)
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write then rename so concurrent readers never see a partial file
+                tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path(key))
+            except (OSError, pickle.PicklingError):
+                pass  # The disk cache is best-effort
+
+    def _remember(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Counters so far - subtract two snapshots to get one render's share"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'savedSeconds': self.saved_seconds}
+
+
+def stats_delta(before, after):
+    """Cache activity between two stats() snapshots"""
+    return {
+        'hits': after['hits'] - before['hits'],
+        'misses': after['misses'] - before['misses'],
+        'savedMs': round((after['savedSeconds'] - before['savedSeconds']) * 1000, 3),
+    }
+
+
+def format_stats(delta):
+    """One-line summary of a stats_delta()"""
+    lookups = delta['hits'] + delta['misses']
+    rate = delta['hits'] / lookups * 100 if lookups else 0
+    return (f"Layout cache: {delta['hits']} hits, {delta['misses']} misses ({rate:.0f}% hit rate), "
+            f"{delta['savedMs']:.1f} ms saved")
+
+
+# Process-wide cache; SPARKEN_LAYOUT_CACHE_ENTRIES sizes it (0 disables) and
+# SPARKEN_LAYOUT_CACHE_DIR enables the on-disk layer
+layout_cache = LayoutCache(max_entries=int(os.environ.get('SPARKEN_LAYOUT_CACHE_ENTRIES', 2048)),
+                           cache_dir=os.environ.get('SPARKEN_LAYOUT_CACHE_DIR') or None)
+
+
+# ============================================================================
+# PARAGRAPH
+# ============================================================================
+
+class CachedParagraph(Paragraph):
+    """
+    Paragraph that takes its parsed markup and line breaks from the layout cache
+
+    Parsing is keyed by text and style, line breaking additionally by the
+    available width. Cached fragments and lines are shared between
+    paragraphs and never modified: ReportLab's split() edits the lines it
+    divides, so a paragraph re-breaks its own copy before splitting. Pieces
+    produced by split() are not cached; they keep the lines they were cut
+    from and only re-break if they are laid out at another width.
+    """
+
+    def __init__(self, text, style=None, bulletText=None, frags=None, caseSensitive=1, encoding='utf8'):
+        self._parse_key = None
+        if (frags is not None or bulletText is not None or style is None or layout_cache.max_entries <= 0
+                or len(text) > MAX_CACHED_CHARS):
+            Paragraph.__init__(self, text, style, bulletText, frags, caseSensitive, encoding)
+            return
+
+        key = (text, style_key(style), caseSensitive)
+        parsed = layout_cache.get(key)
+        if parsed is None:
+            started = time.perf_counter()
+            Paragraph.__init__(self, text, style, None, None, caseSensitive, encoding)
+            layout_cache.put(key, (self.text, self.frags, self.bulletText), time.perf_counter() - started)
+        else:
+            text, frags, bulletText = parsed
+            Paragraph.__init__(self, text, style, bulletText, frags, caseSensitive, encoding)
+        self._parse_key = key
+
+    def wrap(self, availWidth, availHeight):
+        carried = self.__dict__.get('_carried')
+        if carried is not None and carried[0] == availWidth:
+            return self._wrap_carried(*carried)
+        self.__dict__.pop('_line_frags', None)
+        if self._parse_key is None or 'autoLeading' in self.__dict__:
+            return Paragraph.wrap(self, availWidth, availHeight)
+
+        key = self._parse_key + (availWidth,)
+        layout = layout_cache.get(key)
+        if layout is None:
+            started = time.perf_counter()
+            width, height = Paragraph.wrap(self, availWidth, availHeight)
+            if hasattr(self, 'blPara'):
+                layout_cache.put(key, (self.blPara, height), time.perf_counter() - started)
+                self._shared_layout = True
+            return width, height
+
+        # The attributes Paragraph.wrap() leaves behind
+        style = self.style
+        self.width = availWidth
+        self._wrapWidths = [availWidth - (style.leftIndent + style.firstLineIndent) - style.rightIndent,
+                            availWidth - style.leftIndent - style.rightIndent]
+        self.blPara, self.height = layout
+        self._shared_layout = True
+        return self.width, self.height
+
+    def _wrap_carried(self, availWidth, blPara, frags):
+        """Take lines already broken by the paragraph this one was split from"""
+        style = self.style
+        # Processed lines index into the fragment list they were broken from
+        self._line_frags = frags
+        self.width = availWidth
+        self._wrapWidths = [availWidth - (style.leftIndent + style.firstLineIndent) - style.rightIndent,
+                            availWidth - style.leftIndent - style.rightIndent]
+        self.blPara = blPara
+        self.height = len(blPara.lines) * style.leading
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        if self.__dict__.pop('_shared_layout', False):
+            Paragraph.wrap(self, availWidth, availHeight)
+        if not hasattr(self, 'blPara'):
+            self.wrap(availWidth, availHeight)
+        blPara = self.blPara
+        # Split the lines against the fragments they were broken from
+        frags, self.frags = self.frags, self.__dict__.get('_line_frags') or self.frags
+        try:
+            pieces = Paragraph.split(self, availWidth, availHeight)
+            line_frags = self.frags
+        finally:
+            self.frags = frags
+        # Marks that locate where the paragraph starts go with its first piece
+        for mark in START_MARKS:
+            if pieces and mark in self.__dict__:
+                setattr(pieces[0], mark, self.__dict__[mark])
+        # Both pieces would break into exactly the lines they were cut from (the
+        # rest starts a fresh line at the same width), so hand those on instead
+        # of having every page re-break all remaining lines, which is quadratic
+        # in paragraph length
+        if (len(pieces) == 2 and self.width == availWidth
+                and getattr(self, 'autoLeading', getattr(self.style, 'autoLeading', '')) in ('', 'off')):
+            cut = len(pieces[0].blPara.lines)
+            for piece, lines in zip(pieces, (blPara.lines[:cut], blPara.lines[cut:])):
+                carried = copy.copy(blPara)
+                carried.lines = lines
+                piece._carried = (availWidth, carried, line_frags)
+        return pieces
@@ -0,0 +1,309 @@
+"""
+Sparken Layout Estimator
+Fast page count, TOC size and render-cost prediction from the document IR,
+without running ReportLab layout
+"""
+
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from brand_constants import get_config
+from components import ImageComponent
+from images import resolve_image_path
+from inline_markup import to_plain_text
+
+
+# SimpleDocTemplate's frame pads its content by 6pt on every side
+_FRAME_PADDING = 6
+
+# Table layout (see TableComponent and CalloutComponent)
+_CELL_PADDING_X = 20
+_HEADER_PADDING_Y = 24
+_CELL_PADDING_Y = 20
+_CALLOUT_PADDING_X = 24
+_CALLOUT_PADDING_Y = 20
+
+# List indent (see ListComponent)
+_LIST_INDENT = 18
+
+# TOC rows (see SparkEnPDFGenerator._create_simple_toc)
+_TOC_PAGE_COLUMN = 50
+_TOC_ROW_PADDING = 4
+_TOC_LEADING = (15, 14, 13)
+_TOC_FONT_SIZE = (12, 11, 10)
+
+# Render-cost model, fitted against real renders (python3 python/benchmark.py estimate):
+# fixed start-up plus costs per block, wrapped line, table cell and inline markup marker
+_COST_BASE_MS = 6.0
+_COST_PER_BLOCK_MS = 0.32
+_COST_PER_LINE_MS = 0.088
+_COST_PER_CELL_MS = 0.17
+_COST_PER_MARKER_MS = 0.041
+
+
+# ============================================================================
+# TEXT MEASUREMENT
+# ============================================================================
+
+class _WordWidths(dict):
+    """Width of words at 1pt in one font, measured once and remembered"""
+
+    def __init__(self, font_name):
+        dict.__init__(self)
+        self.font_name = font_name
+        self.space = stringWidth(' ', font_name, 1)
+
+    def __missing__(self, word):
+        width = stringWidth(word, self.font_name, 1)
+        if len(self) < 100000:  # Bounded - distinct words are finite in practice
+            self[word] = width
+        return width
+
+
+_word_widths = {}
+
+
+def _widths(font_name):
+    widths = _word_widths.get(font_name)
+    if widths is None:
+        widths = _word_widths.setdefault(font_name, _WordWidths(font_name))
+    return widths
+
+
+def count_lines(text, font_name, font_size, width):
+    """
+    Approximate the lines ReportLab wraps plain text into
+
+    Greedy word wrap with cached word widths; words wider than the line are
+    split, as ReportLab does.
+
+    Args:
+        text: Plain text (inline markup already stripped)
+        font_name: Standard font name
+        font_size: Size in points
+        width: Available line width in points
+
+    Returns:
+        Line count (at least 1)
+    """
+    widths = _widths(font_name)
+    limit = width / font_size
+    space = widths.space
+    lines = 1
+    used = 0.0
+    for word in text.split():
+        word_width = widths[word]
+        if used and used + space + word_width > limit:
+            lines += 1
+            used = 0.0
+        if word_width > limit:
+            lines += int(word_width // limit)
+            word_width %= limit
+        used = used + space + word_width if used else word_width
+    return lines
+
+
+# ============================================================================
+# ESTIMATE
+# ============================================================================
+
+class LayoutEstimate:
+    """Predicted size and cost of a render"""
+
+    __slots__ = ('pages', 'toc_pages', 'cost_ms', 'lines', 'cells')
+
+    def __init__(self, pages, toc_pages, cost_ms, lines, cells):
+        self.pages = pages
+        self.toc_pages = toc_pages
+        self.cost_ms = cost_ms
+        self.lines = lines
+        self.cells = cells
+
+    def to_dict(self):
+        return {'pages': self.pages, 'tocPages': self.toc_pages, 'costMs': round(self.cost_ms, 1),
+                'lines': self.lines, 'cells': self.cells}
+
+
+class _Pager:
+    """
+    Simulates a frame filling up: flowables are placed top to bottom with
+    ReportLab's rules - space before is dropped at the top of a page and
+    overlaps the previous space after, text splits by lines and tables by rows
+    """
+
+    def __init__(self, height):
+        self.height = height
+        self.pages = 1
+        self.used = 0.0
+        self.space_after = 0.0
+
+    def page_break(self):
+        self.pages += 1
+        self.used = 0.0
+        self.space_after = 0.0
+
+    def _space_before(self, space):
+        return 0.0 if self.used == 0 else max(space - self.space_after, 0.0)
+
+    def place(self, height, space_before=0.0, space_after=0.0):
+        """Place a block that cannot split"""
+        if self.used + self._space_before(space_before) + height > self.height and self.used:
+            self.page_break()
+        self.used = min(self.used + self._space_before(space_before) + height, self.height)
+        self._after(space_after)
+
+    def place_lines(self, lines, leading, space_before=0.0, space_after=0.0, min_first=2):
+        """Place text that splits between lines (no single first line at a page end)"""
+        while True:
+            room = self.height - self.used - self._space_before(space_before)
+            fits = int(room // leading + 1e-6)
+            if fits >= lines:
+                self.used += self._space_before(space_before) + lines * leading
+                break
+            if fits >= min(min_first, lines) and fits > 0:
+                self.used += self._space_before(space_before) + fits * leading
+                lines -= fits
+            elif not self.used:  # Taller than a page and nothing fits: overflow
+                self.used = self.height
+                break
+            self.page_break()
+            space_before = 0.0
+        self._after(space_after)
+
+    def place_rows(self, header, rows, space_before=0.0):
+        """Place a table that splits between rows, repeating its header row"""
+        if self.used + self._space_before(space_before) + header + (rows[0] if rows else 0) > self.height:
+            self.page_break()
+        self.used += self._space_before(space_before) + header
+        for row in rows:
+            if self.used + row > self.height and self.used > header:
+                self.page_break()
+                self.used = header
+            self.used += row
+        self._after(0.0)
+
+    def _after(self, space):
+        self.space_after = space
+        self.used = min(self.used + space, self.height)
+
+
+def _markers(text):
+    """Inline markup markers in markdown text - each styled span costs ReportLab extra fragments"""
+    return text.count('*') + text.count('`') + text.count('[')
+
+
+def _paragraph_lines(text, style, width):
+    return count_lines(text, style.fontName, style.fontSize, width - style.leftIndent - style.rightIndent)
+
+
+def estimate_layout(document, metadata=None, config=None):
+    """
+    Estimate a render's page count, TOC size and cost from its document IR
+
+    Follows the generator's layout: cover page, TOC, then the blocks with the
+    component styles' fonts, leading and spacing. Line breaks, table heights
+    and page breaks are approximated, which is typically within a page or
+    two of the real render at a small fraction of its time.
+
+    Args:
+        document: Document IR (from parse_markdown / parse_markdown_cached)
+        metadata: The render's options (title, includeToc, draft, draftPages, imageDir)
+        config: BrandConfig (defaults to the metadata's pageSize and colors)
+
+    Returns:
+        LayoutEstimate
+    """
+    metadata = metadata or {}
+    config = config or get_config(metadata.get('pageSize', 'letter'), metadata.get('colors'))
+    Layout, styles = config.layout, config.styles
+    width = Layout.CONTENT_WIDTH - 2 * _FRAME_PADDING
+    height = Layout.CONTENT_HEIGHT - 2 * _FRAME_PADDING
+    body, item, cell, header_cell, callout = (styles['body'], styles['list_item'], styles['table_cell'],
+                                              styles['table_header'], styles['callout'])
+    has_cover = bool(metadata.get('title') or document.metadata.get('title'))
+    image_dir = metadata.get('imageDir')
+
+    pager = _Pager(height)
+    lines = cells = markers = 0
+    headings = []
+    for block in document.blocks:
+        if block.kind == 'h':
+            if 'appendix' in block.text.lower():
+                pager.page_break()
+            style = styles[f'h{min(block.level, 3)}']
+            text = block.text.upper() if block.level == 1 else block.text
+            count = _paragraph_lines(text, style, width)
+            pager.place_lines(count, style.leading, style.spaceBefore, style.spaceAfter, min_first=count)
+            pager.place(Layout.PARAGRAPH_SPACING / (2 if block.level <= 2 else 4))
+            headings.append((min(block.level, 3) - 1, text))
+            lines += count
+
+        elif block.kind == 'p':
+            count = _paragraph_lines(to_plain_text(block.text), body, width)
+            pager.place_lines(count, body.leading, body.spaceBefore, body.spaceAfter)
+            lines += count
+            markers += _markers(block.text)
+
+        elif block.kind == 'l':
+            for i, text in enumerate(block.items):
+                count = _paragraph_lines(to_plain_text(text), item, width - _LIST_INDENT)
+                last = i == len(block.items) - 1
+                pager.place_lines(count, item.leading, item.spaceBefore,
+                                  max(item.spaceAfter, Layout.PARAGRAPH_SPACING) if last else item.spaceAfter)
+                lines += count
+                markers += _markers(text)
+
+        elif block.kind == 't' and block.rows:
+            columns = len(block.rows[0])
+            text_width = Layout.CONTENT_WIDTH / columns - _CELL_PADDING_X
+            heights = []
+            for i, row in enumerate(block.rows):
+                style = header_cell if i == 0 else cell
+                tallest = max((count_lines(to_plain_text(text), style.fontName, style.fontSize, text_width)
+                               for text in row), default=1)
+                heights.append(tallest * style.leading + (_HEADER_PADDING_Y if i == 0 else _CELL_PADDING_Y))
+                lines += tallest
+                cells += len(row)
+                markers += sum(_markers(text) for text in row)
+            pager.place_rows(heights[0], heights[1:])
+            pager.place(Layout.PARAGRAPH_SPACING)
+
+        elif block.kind == 'c':
+            text_width = Layout.CONTENT_WIDTH - 20 - _CALLOUT_PADDING_X
+            count = _paragraph_lines(to_plain_text(block.text), callout, text_width)
+            pager.place(count * callout.leading + callout.spaceBefore + callout.spaceAfter + _CALLOUT_PADDING_Y)
+            pager.place(Layout.PARAGRAPH_SPACING)
+            lines += count
+            cells += 1
+            markers += _markers(block.text)
+
+        elif block.kind == 'i':
+            path = resolve_image_path(block.src, image_dir)
+            image = ImageComponent.create(path, block.alt, placeholder=True, config=config)[0]
+            pager.place(image.wrap(width, height)[1])
+            pager.place(Layout.PARAGRAPH_SPACING)
+
+    toc_pages = 0
+    if metadata.get('includeToc', True) and headings:
+        toc = _Pager(height)
+        title = styles['toc_title']
+        toc.place(title.leading, space_after=title.spaceAfter)
+        toc.place(0.3 * inch)
+        rows = []
+        for level, text in headings:
+            indent = ' ' * 3 * level
+            count = count_lines(indent + text, styles[f'toc_h{level + 1}'].fontName, _TOC_FONT_SIZE[level],
+                                width - _TOC_PAGE_COLUMN - 2 * _FRAME_PADDING)
+            rows.append(max(count * _TOC_LEADING[level], 12) + _TOC_ROW_PADDING)
+        toc.place_rows(0, rows)
+        toc_pages = toc.pages
+        lines += len(rows)
+
+    pages = int(has_cover) + toc_pages + pager.pages
+    if metadata.get('draft') and metadata.get('draftPages'):
+        pages = min(pages, int(metadata['draftPages']))
+    cost_ms = (_COST_BASE_MS + _COST_PER_BLOCK_MS * len(document.blocks) + _COST_PER_LINE_MS * lines
+               + _COST_PER_CELL_MS * cells + _COST_PER_MARKER_MS * markers)
+    if metadata.get('draft') and metadata.get('draftPages'):
+        cost_ms *= min(1.0, pages / max(1, int(has_cover) + toc_pages + pager.pages))
+    return LayoutEstimate(pages, toc_pages, cost_ms, lines, cells)
@@ -0,0 +1,624 @@
+"""
+Sparken PDF Linearization
+Rewrites a finished PDF for fast web view: the first page's objects come
+first, behind a linearization dictionary and hint tables, so viewers can show
+page 1 while the rest of the file is still downloading
+"""
+
+import re
+import sys
+
+
+class LinearizeError(Exception):
+    """A PDF this module cannot rewrite or check (not a single classic xref table, encrypted, damaged)"""
+
+
+# PDF delimiters and whitespace - what ends a name or keyword
+_DELIMITER = rb'\s/<>\[\]()%{}'
+
+# Tokens that matter when renumbering: names and comments are skipped whole so
+# digits inside them are never taken for references; strings are skipped by
+# _string_end; the stream keyword ends the part of an object that can hold references
+_TOKEN = re.compile(
+    rb'(?P<name>/[^' + _DELIMITER + rb']*)'
+    rb'|(?P<comment>%[^\r\n]*)'
+    rb'|(?P<hex>(?<!<)<(?!<)[0-9A-Fa-f\s]*>)'
+    rb'|(?P<string>\()'
+    rb'|(?<![\w.+-])(?P<ref>(\d+)\s+(\d+)\s+R)(?![^' + _DELIMITER + rb'])'
+    rb'|(?P<stream>\bstream(?=[\r\n]))'
+)
+_STRING_SPECIAL = re.compile(rb'[()\\]')
+_OBJ_HEADER = re.compile(rb'(\d+)\s+(\d+)\s+obj')
+_STARTXREF = re.compile(rb'startxref\s+(\d+)\s*%%EOF\s*$')
+_XREF_SUBSECTION = re.compile(rb'(\d+)\s+(\d+)[ \t]*\r?\n')
+_XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+
+# Fixed field width for values only known once the file is laid out
+_WIDTH = 10
+
+
+def _string_end(body, pos):
+    """Index just past the literal string whose opening parenthesis ends at pos"""
+    depth = 1
+    while depth:
+        match = _STRING_SPECIAL.search(body, pos)
+        if match is None:
+            raise LinearizeError("unterminated string")
+        pos = match.end()
+        char = match.group()
+        if char == b'\\':
+            pos += 1
+        elif char == b'(':
+            depth += 1
+        else:
+            depth -= 1
+    return pos
+
+
+def _scan(body):
+    """
+    Find the indirect references in an object
+
+    Returns:
+        ([(start, end, object number)], end of the dictionary part) - stream
+        data after the stream keyword is never scanned
+    """
+    refs = []
+    pos = 0
+    while True:
+        match = _TOKEN.search(body, pos)
+        if match is None:
+            return refs, len(body)
+        if match.group('stream'):
+            return refs, match.start()
+        if match.group('string'):
+            pos = _string_end(body, match.end())
+            continue
+        if match.group('ref'):
+            refs.append((match.start(), match.end(), int(match.group(6))))
+        pos = match.end()
+
+
+class _Object:
+    """One indirect object of the source PDF"""
+
+    __slots__ = ('num', 'body', 'refs', 'dict_end')
+
+    def __init__(self, num, body):
+        self.num = num
+        self.body = body   # Everything after "N 0 obj", up to the next object
+        spans, self.dict_end = _scan(body)
+        self.refs = spans
+
+    def head(self):
+        """The object's dictionary/value part, without stream data"""
+        return self.body[:self.dict_end]
+
+    def ref(self, key):
+        """Object number a direct /key N 0 R entry points at, or None"""
+        match = re.search(rb'/' + key + rb'\s+(\d+)\s+\d+\s+R', self.head())
+        return int(match.group(1)) if match else None
+
+    def is_type(self, name):
+        return re.search(rb'/Type\s*/' + name + rb'(?![^' + _DELIMITER + rb'])', self.head()) is not None
+
+    def targets(self):
+        return [num for _, _, num in self.refs]
+
+    def renumbered(self, new_num, numbers):
+        """The object's bytes under its new number, with references rewritten"""
+        pieces = [b'%d 0 obj' % new_num]
+        pos = 0
+        for start, end, num in self.refs:
+            pieces.append(self.body[pos:start])
+            # A reference to a missing object means null
+            pieces.append(b'%d 0 R' % numbers[num] if num in numbers else b'null')
+            pos = end
+        pieces.append(self.body[pos:])
+        return b''.join(pieces)
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def _read_xref(pdf, offset):
+    """Parse a classic xref table and its trailer; returns ({number: offset}, trailer bytes)"""
+    if not pdf.startswith(b'xref', offset):
+        raise LinearizeError("cross-reference streams are not supported")
+    pos = offset + 4
+    while pdf[pos:pos + 1] in b' \t\r\n':
+        pos += 1
+    offsets = {}
+    while not pdf.startswith(b'trailer', pos):
+        match = _XREF_SUBSECTION.match(pdf, pos)
+        if match is None:
+            raise LinearizeError(f"malformed xref table at {pos}")
+        first, count = int(match.group(1)), int(match.group(2))
+        pos = match.end()
+        for i in range(count):
+            entry = _XREF_ENTRY.match(pdf, pos + 20 * i)
+            if entry is None:
+                raise LinearizeError(f"malformed xref entry at {pos + 20 * i}")
+            if entry.group(3) == b'n':
+                if entry.group(2) != b'00000':
+                    raise LinearizeError("objects with generation numbers are not supported")
+                offsets[first + i] = int(entry.group(1))
+        pos += 20 * count
+    end = pdf.find(b'startxref', pos)
+    return offsets, pdf[pos + 7:end]
+
+
+def _trailer_ref(trailer, key):
+    match = re.search(rb'/' + key + rb'\s+(\d+)\s+\d+\s+R', trailer)
+    return int(match.group(1)) if match else None
+
+
+def _parse(pdf):
+    """Split a single-revision PDF into its header, objects and trailer entries"""
+    match = _STARTXREF.search(pdf, max(0, len(pdf) - 1024))
+    if match is None:
+        raise LinearizeError("no startxref at end of file")
+    xref_offset = int(match.group(1))
+    offsets, trailer = _read_xref(pdf, xref_offset)
+    if re.search(rb'/(Prev|Encrypt|XRefStm)\b', trailer):
+        raise LinearizeError("incrementally updated or encrypted PDFs are not supported")
+    if not offsets:
+        raise LinearizeError("no objects")
+
+    ordered = sorted(offsets.items(), key=lambda item: item[1])
+    objects = {}
+    for i, (num, start) in enumerate(ordered):
+        end = ordered[i + 1][1] if i + 1 < len(ordered) else xref_offset
+        header = _OBJ_HEADER.match(pdf, start)
+        if header is None or int(header.group(1)) != num:
+            raise LinearizeError(f"object {num} is not at its xref offset")
+        objects[num] = _Object(num, pdf[header.end():end])
+
+    ids = re.search(rb'/ID\s*(\[[^\]]*\])', trailer)
+    return {
+        'header': pdf[:ordered[0][1]],
+        'objects': objects,
+        'root': _trailer_ref(trailer, b'Root'),
+        'info': _trailer_ref(trailer, b'Info'),
+        'id': ids.group(1) if ids else None,
+    }
+
+
+def _page_tree(objects, root):
+    """Page objects in document order, and every node of the page tree"""
+    pages, nodes = [], set()
+    stack = [objects[root].ref(b'Pages')]
+    while stack:
+        num = stack.pop()
+        if num in nodes or num not in objects:
+            continue
+        nodes.add(num)
+        node = objects[num]
+        if node.is_type(b'Pages'):
+            kids = re.search(rb'/Kids\s*\[([^\]]*)\]', node.head())
+            if kids:
+                stack.extend(reversed([int(n) for n in re.findall(rb'(\d+)\s+\d+\s+R', kids.group(1))]))
+        else:
+            pages.append(num)
+    if not pages:
+        raise LinearizeError("the document has no pages")
+    return pages, nodes
+
+
+def _closure(objects, start, stop):
+    """start and every object reachable from it without entering stop; start first, then by number"""
+    seen = {start}
+    stack = [start]
+    while stack:
+        for num in objects[stack.pop()].targets():
+            if num not in seen and num not in stop and num in objects:
+                seen.add(num)
+                stack.append(num)
+    seen.discard(start)
+    return [start] + sorted(seen)
+
+
+# ============================================================================
+# HINT TABLES
+# ============================================================================
+
+class _BitWriter:
+    """Big-endian bit packing for hint tables"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._value = 0
+        self._bits = 0
+
+    def write(self, value, bits):
+        if bits == 0:
+            return
+        self._value = (self._value << bits) | value
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self.data.append((self._value >> self._bits) & 0xff)
+        self._value &= (1 << self._bits) - 1
+
+    def flush(self):
+        """Pad to a byte boundary - each hint table item starts on one"""
+        if self._bits:
+            self.data.append((self._value << (8 - self._bits)) & 0xff)
+            self._value = self._bits = 0
+
+
+def _hint_stream(pages, groups, first_page_groups, first_shared):
+    """
+    Page offset and shared object hint tables (PDF 1.7 Annex F)
+
+    Args:
+        pages: Per page, a dict of nobjects, start, length, content_offset,
+               content_length and shared (shared object group identifiers)
+        groups: Byte length of each shared object group, first page section first
+        first_page_groups: How many of the groups are in the first page section
+        first_shared: (object number, offset) of the first object of the
+                      shared objects section, or (0, 0)
+
+    Returns:
+        (stream data, offset of the shared object hint table in it)
+    """
+    def spread(values):
+        low = min(values)
+        return low, (max(values) - low).bit_length()
+
+    writer = _BitWriter()
+    least_objects, objects_bits = spread([page['nobjects'] for page in pages])
+    least_length, length_bits = spread([page['length'] for page in pages])
+    least_offset, offset_bits = spread([page['content_offset'] for page in pages])
+    least_content, content_bits = spread([page['content_length'] for page in pages])
+    count_bits = max(len(page['shared']) for page in pages).bit_length()
+    id_bits = max((max(page['shared'], default=0) for page in pages)).bit_length()
+
+    writer.write(least_objects, 32)
+    writer.write(pages[0]['start'], 32)
+    writer.write(objects_bits, 16)
+    writer.write(least_length, 32)
+    writer.write(length_bits, 16)
+    writer.write(least_offset, 32)
+    writer.write(offset_bits, 16)
+    writer.write(least_content, 32)
+    writer.write(content_bits, 16)
+    writer.write(count_bits, 16)
+    writer.write(id_bits, 16)
+    writer.write(0, 16)   # No fractional positions for shared references
+    writer.write(1, 16)
+    for key, least, bits in (('nobjects', least_objects, objects_bits), ('length', least_length, length_bits)):
+        for page in pages:
+            writer.write(page[key] - least, bits)
+        writer.flush()
+    for page in pages:
+        writer.write(len(page['shared']), count_bits)
+    writer.flush()
+    for page in pages:
+        for group in page['shared']:
+            writer.write(group, id_bits)
+    writer.flush()
+    for key, least, bits in (('content_offset', least_offset, offset_bits),
+                             ('content_length', least_content, content_bits)):
+        for page in pages:
+            writer.write(page[key] - least, bits)
+        writer.flush()
+
+    shared_offset = len(writer.data)
+    least_group, group_bits = spread(groups)
+    writer.write(first_shared[0], 32)
+    writer.write(first_shared[1], 32)
+    writer.write(first_page_groups, 32)
+    writer.write(len(groups), 32)
+    writer.write(0, 16)   # One object per group
+    writer.write(least_group, 32)
+    writer.write(group_bits, 16)
+    for length in groups:
+        writer.write(length - least_group, group_bits)
+    writer.flush()
+    for _ in groups:
+        writer.write(0, 1)  # No MD5 signatures
+    writer.flush()
+    return bytes(writer.data), shared_offset
+
+
+# ============================================================================
+# LINEARIZATION
+# ============================================================================
+
+def linearize(pdf):
+    """
+    Rewrite a PDF for fast web view (a linearized PDF, PDF 1.7 Annex F)
+
+    Objects are renumbered and reordered: the catalog and the first page's
+    objects (with the outline, when the document opens showing it) come
+    first, then each later page's own objects, then objects several pages
+    share. A linearization dictionary, a cross-reference table for the first
+    page and the page offset and shared object hint tables sit at the front,
+    so a viewer can draw page 1 from the first /E bytes and fetch any other
+    page with a single range request.
+
+    Content, fonts and images are copied byte for byte; only object numbers
+    and positions change. Works on single-revision PDFs with a classic xref
+    table, as ReportLab writes them.
+
+    Args:
+        pdf: PDF bytes
+
+    Returns:
+        Linearized PDF bytes
+
+    Raises:
+        LinearizeError: If the PDF is not in a form this module handles
+    """
+    doc = _parse(pdf)
+    objects = doc['objects']
+    root = doc['root']
+    if root not in objects:
+        raise LinearizeError("no document catalog")
+    pages, tree = _page_tree(objects, root)
+    stop = tree | set(pages)
+
+    # Parts 4 and 6 of Annex F: catalog and document-level objects, then the first page
+    catalog = objects[root]
+    outlines_root = catalog.ref(b'Outlines')
+    document_level = _closure(objects, root, stop | {outlines_root})
+    assigned = set(document_level)
+    first_page = [num for num in _closure(objects, pages[0], stop) if num not in assigned]
+    assigned.update(first_page)
+    outlines = []
+    if outlines_root in objects:
+        outlines = [num for num in _closure(objects, outlines_root, stop) if num not in assigned]
+        if re.search(rb'/PageMode\s*/UseOutlines\b', catalog.head()):
+            assigned.update(outlines)   # Shown on opening, so part of the first page section
+        else:
+            outlines = []
+
+    # Parts 7 and 8: each later page's own objects, then objects several pages use
+    reachable = [_closure(objects, page, stop) for page in pages[1:]]
+    users = {}
+    for reach in reachable:
+        for num in reach:
+            if num not in assigned:
+                users[num] = users.get(num, 0) + 1
+    own_parts = [[num for num in reach if num not in assigned and users[num] == 1] for reach in reachable]
+    for part in own_parts:
+        assigned.update(part)
+    shared = sorted(num for num, count in users.items() if count > 1)
+    assigned.update(shared)
+    # Part 9: the page tree, document information and anything unreferenced
+    other = sorted(num for num in objects if num not in assigned)
+
+    # Later parts are numbered from 1, the first page section after them
+    rest = [num for part in own_parts for num in part] + shared + other
+    numbers = {num: i + 1 for i, num in enumerate(rest)}
+    first_number = len(rest) + 1
+    lin_number = first_number
+    section = document_level + [None] + first_page + outlines   # None: the hint stream
+    for i, num in enumerate(section):
+        if num is None:
+            hint_number = first_number + 1 + i
+        else:
+            numbers[num] = first_number + 1 + i
+    size = first_number + 1 + len(section)
+    encoded = {num: objects[num].renumbered(numbers[num], numbers) for num in objects}
+
+    # Lay the file out as if there were no hint stream: hint tables give offsets that way
+    lin_template = (b'%d 0 obj\n<< /Linearized 1 /L %-*d /H [ %-*d %-*d ] /O %d /E %-*d /N %d /T %-*d >>\n'
+                    b'endobj\n')
+    lin_length = len(lin_template % (lin_number, _WIDTH, 0, _WIDTH, 0, _WIDTH, 0, numbers[pages[0]],
+                                     _WIDTH, 0, len(pages), _WIDTH, 0))
+    trailer_ids = b' /ID %s' % doc['id'] if doc['id'] else b''
+    trailer_info = b' /Info %d 0 R' % numbers[doc['info']] if doc['info'] in numbers else b''
+
+    def first_trailer(prev):
+        return (b'trailer\n<< /Size %d /Root %d 0 R%s%s /Prev %-*d >>\nstartxref\n0\n%%%%EOF\n'
+                % (size, numbers[root], trailer_info, trailer_ids, _WIDTH, prev))
+
+    first_xref_offset = len(doc['header']) + lin_length
+    first_xref_length = len(b'xref\n%d %d\n' % (first_number, size - first_number)) \
+        + 20 * (size - first_number) + len(first_trailer(0))
+
+    offsets = {}
+    pos = first_xref_offset + first_xref_length
+    for num in document_level:
+        offsets[num] = pos
+        pos += len(encoded[num])
+    hint_offset = pos
+    for num in first_page + outlines + rest:
+        offsets[num] = pos
+        pos += len(encoded[num])
+
+    def span(nums):
+        return offsets[nums[0]], offsets[nums[-1]] + len(encoded[nums[-1]]) - offsets[nums[0]]
+
+    groups = [len(encoded[num]) for num in first_page + outlines + shared]
+    group_ids = {num: i for i, num in enumerate(first_page + outlines + shared)}
+    page_hints = []
+    for i, part in enumerate([first_page + outlines] + own_parts):
+        page = pages[i]
+        start, length = span(part)
+        contents = re.search(rb'/Contents\s*(?:\[([^\]]*)\]|(\d+\s+\d+\s+R))', objects[page].head())
+        content_nums = [int(n) for n in re.findall(rb'(\d+)\s+\d+\s+R', contents.group(0))] if contents else []
+        if content_nums and all(num in part for num in content_nums):
+            content_start, _ = span(content_nums[:1])
+            last_start, last_length = span(content_nums[-1:])
+            content_offset = content_start - start
+            content_length = last_start + last_length - content_start
+        else:
+            content_offset = content_length = 0
+        used = [] if i == 0 else sorted(group_ids[num] for num in reachable[i - 1] if num in group_ids)
+        page_hints.append({'nobjects': len(part), 'start': start, 'length': length,
+                           'content_offset': content_offset, 'content_length': content_length,
+                           'shared': used})
+    first_shared = (numbers[shared[0]], offsets[shared[0]]) if shared else (0, 0)
+    data, shared_table = _hint_stream(page_hints, groups, len(first_page) + len(outlines), first_shared)
+    hint = (b'%d 0 obj\n<< /Length %d /S %d >>\nstream\n' % (hint_number, len(data), shared_table)
+            + data + b'\nendstream\nendobj\n')
+
+    # Now place the hint stream for real
+    for num in first_page + outlines + rest:
+        offsets[num] += len(hint)
+    last = (first_page + outlines)[-1]
+    first_page_end = offsets[last] + len(encoded[last])
+    main_xref_offset = pos + len(hint)
+    main_xref = [b'xref\n0 %d\n' % first_number, b'0000000000 65535 f \n']
+    main_xref.extend(b'%010d 00000 n \n' % offsets[num] for num in rest)
+    main_xref.append(b'trailer\n<< /Size %d >>\nstartxref\n%d\n%%%%EOF\n' % (first_number, first_xref_offset))
+    main_xref = b''.join(main_xref)
+    file_length = main_xref_offset + len(main_xref)
+
+    first_xref = [b'xref\n%d %d\n' % (first_number, size - first_number),
+                  b'%010d 00000 n \n' % len(doc['header'])]
+    by_number = {numbers[num]: offsets[num] for num in document_level + first_page + outlines}
+    by_number[hint_number] = hint_offset
+    first_xref.extend(b'%010d 00000 n \n' % by_number[n] for n in range(first_number + 1, size))
+    first_xref.append(first_trailer(main_xref_offset))
+
+    lin = lin_template % (lin_number, _WIDTH, file_length, _WIDTH, hint_offset, _WIDTH, len(hint),
+                          numbers[pages[0]], _WIDTH, first_page_end, len(pages), _WIDTH,
+                          main_xref_offset + len(b'xref\n0 %d' % first_number))
+    out = [doc['header'], lin, b''.join(first_xref)]
+    out.extend(encoded[num] for num in document_level)
+    out.append(hint)
+    out.extend(encoded[num] for num in first_page + outlines + rest)
+    out.append(main_xref)
+    result = b''.join(out)
+    if len(result) != file_length:
+        raise LinearizeError("internal layout mismatch")
+    return result
+
+
+# ============================================================================
+# CHECKING
+# ============================================================================
+
+_LINEARIZED = re.compile(rb'(\d+)\s+0\s+obj\s*<<\s*/Linearized\s+1(?P<entries>.*?)>>\s*endobj', re.S)
+
+
+def _entry(entries, key):
+    match = re.search(rb'/' + key + rb'\s+(\d+)', entries)
+    if match is None:
+        raise LinearizeError(f"linearization dictionary has no /{key.decode()}")
+    return int(match.group(1))
+
+
+def check_linearized(pdf):
+    """
+    Check the structure of a linearized PDF
+
+    Verifies what a viewer relies on before the file has fully arrived: the
+    linearization dictionary within the first 1024 bytes, /L matching the
+    file length, both cross-reference tables pointing at their objects, /T
+    and startxref pointing at the tables, /H at the hint stream, /O at the
+    first page's page object, /N matching the page tree, every object the
+    first page uses ending before /E, and the page offset hint table locating
+    the first page.
+
+    Args:
+        pdf: PDF bytes
+
+    Returns:
+        Dict of the linearization parameters (L, H, O, E, N, T)
+
+    Raises:
+        LinearizeError: Describing the first problem found
+    """
+    match = _LINEARIZED.search(pdf, 0, 1024)
+    if match is None:
+        raise LinearizeError("no linearization dictionary in the first 1024 bytes")
+    entries = match.group('entries')
+    params = {key: _entry(entries, key.encode()) for key in ('L', 'O', 'E', 'N', 'T')}
+    hint = re.search(rb'/H\s*\[\s*(\d+)\s+(\d+)', entries)
+    if hint is None:
+        raise LinearizeError("linearization dictionary has no /H")
+    params['H'] = [int(hint.group(1)), int(hint.group(2))]
+    if params['L'] != len(pdf):
+        raise LinearizeError(f"/L is {params['L']} but the file is {len(pdf)} bytes")
+
+    # First page cross-reference table right after the dictionary, the main one via its /Prev
+    first_xref = match.end()
+    while pdf[first_xref:first_xref + 1] in b' \t\r\n':
+        first_xref += 1
+    first_offsets, first_trailer = _read_xref(pdf, first_xref)
+    prev = re.search(rb'/Prev\s+(\d+)', first_trailer)
+    if prev is None:
+        raise LinearizeError("first page trailer has no /Prev")
+    main_xref = int(prev.group(1))
+    main_offsets, _ = _read_xref(pdf, main_xref)
+    startxref = _STARTXREF.search(pdf, max(0, len(pdf) - 1024))
+    if startxref is None or int(startxref.group(1)) != first_xref:
+        raise LinearizeError("startxref does not point at the first page cross-reference table")
+    if params['T'] != main_xref + len(re.match(rb'xref\s*\d+\s+\d+', pdf[main_xref:]).group()):
+        raise LinearizeError("/T does not point at the main cross-reference table")
+
+    offsets = dict(main_offsets)
+    offsets.update(first_offsets)
+    for num, offset in offsets.items():
+        header = _OBJ_HEADER.match(pdf, offset)
+        if header is None or int(header.group(1)) != num:
+            raise LinearizeError(f"xref entry for object {num} does not point at it")
+
+    hint_offset, hint_length = params['H']
+    hint_header = _OBJ_HEADER.match(pdf, hint_offset)
+    if hint_header is None or not pdf[:hint_offset + hint_length].rstrip().endswith(b'endobj'):
+        raise LinearizeError("/H does not span the hint stream object")
+    hint_object = pdf[hint_header.end():hint_offset + hint_length]
+    stream_start = re.search(rb'stream\r?\n', hint_object)
+    if stream_start is None or not re.search(rb'/S\s+\d+', hint_object[:stream_start.start()]):
+        raise LinearizeError("hint stream has no shared object table offset (/S)")
+    hint_data = hint_object[stream_start.end():]
+
+    # The first page: its object and everything it uses end before /E
+    parsed = {}
+
+    def load(num):
+        if num not in parsed:
+            header = _OBJ_HEADER.match(pdf, offsets[num])
+            parsed[num] = _Object(num, pdf[header.end():pdf.find(b'endobj', header.end())])
+        return parsed[num]
+
+    root = _trailer_ref(first_trailer, b'Root')
+    if root not in offsets:
+        raise LinearizeError("first page trailer has no valid /Root")
+    page_lookup = {num: load(num) for num in offsets}
+    pages, tree = _page_tree(page_lookup, root)
+    if pages[0] != params['O']:
+        raise LinearizeError(f"/O is {params['O']} but the first page is object {pages[0]}")
+    if len(pages) != params['N']:
+        raise LinearizeError(f"/N is {params['N']} but the document has {len(pages)} pages")
+    for num in _closure(page_lookup, pages[0], tree | set(pages)):
+        if pdf.find(b'endobj', offsets[num]) > params['E']:
+            raise LinearizeError(f"first page object {num} ends after /E")
+
+    # Hint offsets leave the hint stream out
+    first_page_offset = int.from_bytes(hint_data[4:8], 'big')
+    expected = offsets[params['O']]
+    if expected > hint_offset:
+        expected -= hint_length
+    if first_page_offset != expected:
+        raise LinearizeError("page offset hint table does not locate the first page")
+    return params
+
+
+def linearize_or_keep(pdf):
+    """
+    Linearize a PDF and check the result, keeping the original if either step fails
+
+    Linearization only speeds up the first page, so a document this module
+    cannot rewrite is still worth delivering as it is.
+
+    Args:
+        pdf: PDF bytes
+
+    Returns:
+        Linearized PDF bytes, or pdf unchanged (with a warning on stderr)
+    """
+    try:
+        linearized = linearize(pdf)
+        check_linearized(linearized)
+    except Exception as e:  # LinearizeError, or a PDF the parser trips over
+        print(f"Warning: Could not linearize the PDF, writing it unlinearized: {e}", file=sys.stderr)
+        return pdf
+    return linearized
@@ -0,0 +1,720 @@
+#!/usr/bin/env python3
+"""
+Sparken Load Test
+Replays a mix of generated documents against the renderer at a set concurrency
+or arrival rate, and reports latency percentiles, throughput, errors and RSS
+
+Usage:
+    python3 python/load_test.py cli --requests 200 --concurrency 4
+    python3 python/load_test.py service --workers 4 --rate 6 --duration 60
+    python3 python/load_test.py service --url http://127.0.0.1:8765 --pid 12345
+    python3 python/load_test.py cli --mix memo=3,report=1,dirty=2 --corpus-dir tests --json load.json
+
+Modes:
+    cli      One clean_pdf_text.py + sparken_pdf_generator.py spawn per request,
+             as lib/python-bridge.ts does
+    service  POST /render to render_service.py - started here with --workers,
+             or an already running one at --url
+
+Everything runs offline on one Linux box; RSS is read from /proc.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from clean_pdf_text import clean_pdf_artifacts
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The options lib/python-bridge.ts renders with (pdfMetadata)
+_BRIDGE_METADATA = {'theme': 'formal', 'includeToc': True, 'draft': False, 'pageSize': 'letter',
+                    'deterministic': True}
+
+_PERCENTILES = (50, 90, 95, 99)
+
+
+# ============================================================================
+# CORPORA
+# ============================================================================
+
+_WORDS = ('the', 'client', 'research', 'shows', 'that', 'behavioral', 'nudges', 'increase',
+          'engagement', 'across', 'every', 'channel', 'we', 'tested', 'and', 'campaign',
+          'results', 'were', 'consistent', 'with', 'prior', 'work', 'retention', 'budget',
+          'quarterly', 'audience', 'pilot', 'conversion', 'spend', 'baseline')
+
+
+def _sentence(rng, low=8, high=24):
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(low, high))).capitalize() + '.'
+
+
+def _paragraph(rng, sentences=(2, 6), markup=0.0):
+    text = ' '.join(_sentence(rng) for _ in range(rng.randint(*sentences)))
+    if markup:
+        text = ' '.join(f"**{word}**" if rng.random() < markup else word for word in text.split(' '))
+    return text
+
+
+def _table(rng, rows, columns=4):
+    header = ['Metric', 'Channel', 'Baseline', 'Result', 'Owner', 'Notes'][:columns]
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * columns]
+    for i in range(rows):
+        cells = [f"Metric {i}", rng.choice(('Email', 'Search', 'Social', 'Display')),
+                 f"{rng.randint(1, 99)}%", f"**{rng.randint(1, 99)}%**",
+                 rng.choice(('Ops', 'Growth', 'Brand')), _sentence(rng, 3, 9)][:columns]
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines)
+
+
+def memo(rng):
+    """One- or two-page internal memo: short paragraphs and lists"""
+    topic = _sentence(rng, 2, 5).rstrip('.')
+    parts = [f"# Memo: {topic}", f"**To:** Client team  \n**From:** Strategy  \n**Re:** {topic}",
+             '## Summary', _paragraph(rng, markup=0.05), _paragraph(rng),
+             '## Key Points', '\n'.join(f"- {_sentence(rng, 5, 14)}" for _ in range(rng.randint(3, 6))),
+             '## Next Steps', '\n'.join(f"{i}. {_sentence(rng, 4, 10)}" for i in range(1, rng.randint(3, 5)))]
+    return '\n\n'.join(parts)
+
+
+def report(rng):
+    """Multi-section report: headings, paragraphs, tables and callouts (roughly 8-15 pages)"""
+    parts = [f"# {_sentence(rng, 3, 6).rstrip('.')} Report"]
+    for section in range(rng.randint(4, 7)):
+        parts.append(f"## {section + 1}. {_sentence(rng, 2, 5).rstrip('.')}")
+        for _ in range(rng.randint(2, 3)):
+            parts.append(f"### {_sentence(rng, 2, 4).rstrip('.')}")
+            parts.extend(_paragraph(rng, (4, 9), markup=0.03) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.6:
+            parts.append(_table(rng, rng.randint(5, 15)))
+        if rng.random() < 0.4:
+            parts.append('> ' + _sentence(rng, 10, 20))
+    return '\n\n'.join(parts)
+
+
+def table_dump(rng):
+    """Spreadsheet export: one large table with a short introduction"""
+    return '\n\n'.join(['# Data Export', _paragraph(rng, (1, 2)),
+                        _table(rng, rng.randint(150, 500), columns=rng.choice((4, 5, 6)))])
+
+
+def dirty(rng):
+    """PDF-extracted text: hard wraps, hyphenation, page furniture, ligatures and smart quotes"""
+    pages = rng.randint(3, 10)
+    lines = []
+    for page in range(1, pages + 1):
+        for _ in range(rng.randint(3, 5)):
+            text = _paragraph(rng, (4, 8))
+            text = text.replace('fi', 'ﬁ').replace('ff', 'ﬀ')
+            text = re.sub(r'\bthat\b', '“that”', text)
+            wrapped = textwrap.wrap(text, rng.randint(60, 80))
+            # Words hyphenated across line ends
+            for i in range(len(wrapped) - 1):
+                if rng.random() < 0.15 and ' ' in wrapped[i + 1]:
+                    head, tail = wrapped[i + 1].split(' ', 1)
+                    cut = len(head) // 2
+                    if cut > 1:
+                        wrapped[i] += f" {head[:cut]}-"
+                        wrapped[i + 1] = head[cut:] + ' ' + tail
+            lines.extend(wrapped)
+            lines.append('')
+        lines.extend([f"Page {page} of {pages} Sparken", str(page), f"-- {page} of {pages} --", ''])
+    return '\n'.join(lines)
+
+
+CORPORA = {
+    'memo': memo,
+    'report': report,
+    'table': table_dump,
+    'dirty': dirty,
+}
+
+DEFAULT_MIX = 'memo=4,report=2,table=1,dirty=2'
+
+
+def _parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def build_corpus(mix, variants, seed, corpus_dir=None):
+    """
+    Generate the documents requests are drawn from
+
+    Args:
+        mix: {corpus name: weight}; 'files' weighs the documents in corpus_dir
+        variants: Documents generated per corpus (requests repeat them, as real traffic does)
+        seed: Random seed
+        corpus_dir: Optional directory of .md/.txt files
+
+    Returns:
+        List of (corpus name, weight, [documents])
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for name, weight in mix.items():
+        if name == 'files':
+            continue
+        if name not in CORPORA:
+            raise ValueError(f"Unknown corpus: {name} (choose from {', '.join(sorted(CORPORA))}, files)")
+        corpus.append((name, weight, [CORPORA[name](rng) for _ in range(variants)]))
+    if corpus_dir:
+        documents = []
+        for entry in sorted(os.listdir(corpus_dir)):
+            if entry.endswith(('.md', '.txt')):
+                with open(os.path.join(corpus_dir, entry), 'r', encoding='utf-8', errors='replace') as f:
+                    documents.append(f.read())
+        if documents:
+            corpus.append(('files', mix.get('files', 1.0), documents))
+    return corpus
+
+
+# ============================================================================
+# TARGETS
+# ============================================================================
+
+class RequestFailed(Exception):
+    """A render that did not produce a PDF; kind groups errors in the report"""
+
+    def __init__(self, kind, message=''):
+        super().__init__(f"{kind}: {message}" if message else kind)
+        self.kind = kind
+
+
+def _title(text):
+    """Cover title the way app/api/brand/route.ts picks it"""
+    match = re.search(r'^#\s+(.+)$', text, re.MULTILINE)
+    return match.group(1).strip() if match else 'Load Test'
+
+
+def _read_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _descendants(root):
+    """pids of a process's children, grandchildren, ... from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # The command name is in parentheses and may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [root]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+class CLITarget:
+    """
+    Per-request process spawns, like lib/python-bridge.ts
+
+    Each request runs clean_pdf_text.py (falling back to the original text if
+    it fails) and then sparken_pdf_generator.py with the bridge's metadata and
+    a reportPath, sharing an on-disk parse cache as the bridge does.
+    """
+
+    name = 'cli'
+
+    def __init__(self, clean=True, extra_metadata=None):
+        self.clean = clean
+        self.extra_metadata = extra_metadata or {}
+        self._children = {}  # pid -> script name
+        self._lock = threading.Lock()
+        self._tmp = None
+        self.env = None
+
+    def start(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix='sparken-load-')
+        self.env = dict(os.environ, SPARKEN_CACHE_DIR=os.path.join(self._tmp.name, 'cache'))
+
+    def stop(self):
+        self._tmp.cleanup()
+
+    def processes(self):
+        """Live (pid, label) pairs for RSS sampling"""
+        with self._lock:
+            return list(self._children.items())
+
+    def _spawn(self, script, args, data):
+        """Run a script, returning (returncode, stdout, stderr, peak RSS in KB)"""
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, script), *args],
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr,
+                                    cwd=SCRIPT_DIR, env=self.env)
+            with self._lock:
+                self._children[proc.pid] = script.replace('.py', '')
+
+            def feed():
+                try:
+                    proc.stdin.write(data)
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass  # The script rejected the input early
+
+            writer = threading.Thread(target=feed, daemon=True)
+            writer.start()
+            out = proc.stdout.read()
+            writer.join()
+            # wait4 rather than wait() so the child's peak RSS comes back with its status
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            with self._lock:
+                self._children.pop(proc.pid, None)
+            stderr.seek(0)
+            return proc.returncode, out, stderr.read().decode('utf-8', 'replace'), usage.ru_maxrss
+
+    def render(self, text):
+        """
+        Render one document
+
+        Returns:
+            Dict with pages, bytes and rss_kb (peak RSS of the largest process)
+
+        Raises:
+            RequestFailed: With kind 'exit N'
+        """
+        data = text.encode('utf-8')
+        rss = 0
+        if self.clean:
+            code, out, _, rss = self._spawn('clean_pdf_text.py', ['-'], data)
+            if code == 0:
+                data = out
+        report_path = os.path.join(self._tmp.name, f"report-{threading.get_ident()}-{time.monotonic_ns()}.json")
+        metadata = dict(_BRIDGE_METADATA, title=_title(text), reportPath=report_path, **self.extra_metadata)
+        code, out, err, generator_rss = self._spawn('sparken_pdf_generator.py', ['-', json.dumps(metadata)], data)
+        try:
+            if code != 0:
+                raise RequestFailed(f"exit {code}", err.strip().splitlines()[-1] if err.strip() else '')
+            with open(report_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        finally:
+            if os.path.exists(report_path):
+                os.remove(report_path)
+        return {'pages': report['pages'], 'bytes': len(out), 'rss_kb': max(rss, generator_rss)}
+
+
+class ServiceTarget:
+    """
+    POST /render against render_service.py
+
+    Without a url the service is started here on a free local port (metrics
+    disabled, plus any service_args) and stopped afterwards. pid selects an
+    external service's process for RSS sampling.
+    """
+
+    name = 'service'
+
+    def __init__(self, url=None, workers=None, max_tasks_per_child=None, pid=None, timeout=300,
+                 extra_metadata=None, service_args=None):
+        self.url = url
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.pid = pid
+        self.timeout = timeout
+        self.extra_metadata = extra_metadata or {}
+        self.service_args = service_args or []
+        self._proc = None
+
+    def start(self):
+        if self.url:
+            return
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        args = [sys.executable, os.path.join(SCRIPT_DIR, 'render_service.py'), '--port', str(port),
+                '--metrics-port', '0']
+        if self.workers:
+            args += ['--workers', str(self.workers)]
+        if self.max_tasks_per_child is not None:
+            args += ['--max-tasks-per-child', str(self.max_tasks_per_child)]
+        args += self.service_args
+        self._proc = subprocess.Popen(args, cwd=SCRIPT_DIR, stderr=subprocess.DEVNULL)
+        self.pid = self._proc.pid
+        self.url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with urllib.request.urlopen(f"{self.url}/healthz", timeout=1):
+                    return
+            except OSError:
+                if self._proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError('render_service.py did not start')
+                time.sleep(0.1)
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+
+    def processes(self):
+        if not self.pid:
+            return []
+        processes = [(self.pid, 'service')]
+        for pid in _descendants(self.pid):
+            try:
+                with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                    helper = b'resource_tracker' in f.read()
+            except OSError:
+                continue
+            processes.append((pid, 'helper' if helper else 'worker'))
+        return processes
+
+    def render(self, text):
+        """
+        Render one document
+
+        Returns:
+            Dict with pages, bytes and quality (the step the service rendered at)
+
+        Raises:
+            RequestFailed: With kind 'http N', 'timeout' or 'connection'
+        """
+        metadata = dict(_BRIDGE_METADATA, title=_title(text), **self.extra_metadata)
+        # The bridge cleans before rendering; the service expects cleaned markdown
+        body = json.dumps({'markdown': clean_pdf_artifacts(text), 'metadata': metadata}).encode('utf-8')
+        request = urllib.request.Request(f"{self.url}/render", body, {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                pdf = response.read()
+                return {'pages': int(response.headers.get('X-Page-Count') or 0), 'bytes': len(pdf),
+                        'quality': response.headers.get('X-Render-Quality') or 'full'}
+        except urllib.error.HTTPError as e:
+            raise RequestFailed(f"http {e.code}", e.read().decode('utf-8', 'replace')[:200])
+        except socket.timeout:
+            raise RequestFailed('timeout')
+        except (urllib.error.URLError, ConnectionError) as e:
+            raise RequestFailed('connection', str(e))
+
+
+# ============================================================================
+# RSS SAMPLING
+# ============================================================================
+
+class RSSSampler:
+    """Samples the RSS of a target's processes at a fixed interval"""
+
+    def __init__(self, target, interval):
+        self.target = target
+        self.interval = interval
+        self.samples = []  # (seconds since start, {pid: (label, rss KB)})
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            processes = {}
+            for pid, label in self.target.processes():
+                rss = _read_rss_kb(pid)
+                if rss is not None:
+                    processes[pid] = (label, rss)
+            self.samples.append((time.monotonic() - self._started, processes))
+            if self._stop.wait(self.interval):
+                return
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+class LoadTest:
+    """
+    Drives requests at a target
+
+    Closed loop (no rate): concurrency clients each send their next request
+    as soon as the previous one finishes. Open loop (rate): requests arrive
+    as a Poisson process at rate per second and queue for up to concurrency
+    clients; latency is measured from arrival, so queueing in front of a
+    saturated renderer counts as it would for users.
+    """
+
+    def __init__(self, target, corpus, concurrency=4, rate=None, requests=100, duration=None,
+                 warmup=0, seed=1):
+        self.target = target
+        self.corpus = corpus
+        self.concurrency = concurrency
+        self.rate = rate
+        self.requests = requests
+        self.duration = duration
+        self.warmup = warmup
+        self.results = []  # Dicts: corpus, start, latency, ok, error kind, pages, bytes, rss_kb
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._started = None
+
+    def _next_document(self):
+        """Pick the next (corpus name, text), or None when the run is over"""
+        with self._lock:
+            if self._issued >= self.requests + self.warmup:
+                return None
+            if self.duration and self._issued >= self.warmup and time.monotonic() - self._started > self.duration:
+                return None
+            index = self._issued
+            self._issued += 1
+            names = [name for name, _, _ in self.corpus]
+            weights = [weight for _, weight, _ in self.corpus]
+            name = self._rng.choices(names, weights)[0]
+            documents = next(documents for corpus_name, _, documents in self.corpus if corpus_name == name)
+            return index, name, self._rng.choice(documents)
+
+    def _send(self, index, name, text, arrived):
+        try:
+            outcome = self.target.render(text)
+            ok, error = True, None
+        except RequestFailed as e:
+            outcome, ok, error = {}, False, e.kind
+        finished = time.monotonic()
+        if index < self.warmup:
+            return
+        with self._lock:
+            self.results.append({'corpus': name, 'start': arrived - self._started, 'latency': finished - arrived,
+                                 'ok': ok, 'error': error, 'chars': len(text), **outcome})
+
+    def _client(self):
+        while True:
+            picked = self._next_document()
+            if picked is None:
+                return
+            self._send(*picked, time.monotonic())
+
+    def run(self):
+        """Run to completion; returns the wall time in seconds (warm-up excluded)"""
+        self._started = time.monotonic()
+        if self.warmup:
+            print(f"Warming up with {self.warmup} request(s)...", file=sys.stderr)
+        if self.rate:
+            with ThreadPoolExecutor(self.concurrency) as clients:
+                arrival = time.monotonic()
+                while True:
+                    picked = self._next_document()
+                    if picked is None:
+                        break
+                    arrival += self._rng.expovariate(self.rate)
+                    delay = arrival - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    clients.submit(self._send, *picked, arrival)
+        else:
+            clients = [threading.Thread(target=self._client) for _ in range(self.concurrency)]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+        finished = time.monotonic()
+        first = min((result['start'] for result in self.results), default=0.0)
+        return finished - self._started - first
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _latency_summary(results):
+    latencies = [result['latency'] * 1000 for result in results if result['ok']]
+    if not latencies:
+        return {}
+    summary = {f"p{pct}": round(percentile(latencies, pct), 1) for pct in _PERCENTILES}
+    summary['max'] = round(max(latencies), 1)
+    summary['mean'] = round(sum(latencies) / len(latencies), 1)
+    return summary
+
+
+def _rss_summary(samples):
+    """Peak RSS per process label, peak total and the total over time"""
+    peaks, timeline = {}, []
+    for elapsed, processes in samples:
+        total = 0
+        for label, rss in processes.values():
+            peaks[label] = max(peaks.get(label, 0), rss)
+            total += rss
+        timeline.append((round(elapsed, 2), total, len(processes)))
+    return {
+        'peakKbByProcess': peaks,
+        'peakTotalKb': max((total for _, total, _ in timeline), default=0),
+        'timeline': [{'t': t, 'totalKb': total, 'processes': count} for t, total, count in timeline],
+    }
+
+
+def summarize(test, elapsed, samples):
+    """JSON-friendly results of a run"""
+    results = test.results
+    ok = [result for result in results if result['ok']]
+    errors = {}
+    for result in results:
+        if not result['ok']:
+            errors[result['error']] = errors.get(result['error'], 0) + 1
+    summary = {
+        'mode': test.target.name,
+        'concurrency': test.concurrency,
+        'rate': test.rate,
+        'requests': len(results),
+        'ok': len(ok),
+        'errorRate': round(1 - len(ok) / len(results), 4) if results else 0.0,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        'pagesPerSecond': round(sum(result['pages'] for result in ok) / elapsed, 2) if elapsed else 0.0,
+        'latencyMs': _latency_summary(results),
+        'byCorpus': {name: dict(_latency_summary([r for r in results if r['corpus'] == name]),
+                                requests=sum(1 for r in results if r['corpus'] == name))
+                     for name in sorted({result['corpus'] for result in results})},
+        'rss': _rss_summary(samples),
+    }
+    qualities = [result['quality'] for result in ok if 'quality' in result]
+    if qualities:
+        summary['quality'] = {name: qualities.count(name) for name in sorted(set(qualities))}
+    child_rss = [result['rss_kb'] for result in ok if 'rss_kb' in result]
+    if child_rss:
+        summary['rss']['perRequestPeakKb'] = {'p50': percentile(child_rss, 50), 'p95': percentile(child_rss, 95),
+                                              'max': max(child_rss)}
+    return summary
+
+
+def format_report(summary, timeline_rows=10):
+    """Plain-text report of a summarize() result"""
+    latency = summary['latencyMs']
+    offered = f"{summary['rate']}/s arrivals, " if summary['rate'] else ''
+    lines = [f"Load test: {summary['mode']}, {offered}concurrency {summary['concurrency']}",
+             f"requests {summary['requests']}  ok {summary['ok']}  error rate {summary['errorRate'] * 100:.1f}%"
+             + (f"  ({', '.join(f'{kind}: {count}' for kind, count in sorted(summary['errors'].items()))})"
+                if summary['errors'] else ''),
+             f"throughput {summary['throughput']:.2f} req/s, {summary['pagesPerSecond']:.1f} pages/s "
+             f"over {summary['seconds']:.1f} s",
+             '',
+             f"{'latency ms':<12}" + ''.join(f"{key:>9}" for key in ('p50', 'p90', 'p95', 'p99', 'max', 'mean'))
+             + f"{'requests':>10}"]
+    rows = [('all', dict(latency, requests=summary['requests']))] + list(summary['byCorpus'].items())
+    for name, stats in rows:
+        lines.append(f"{name:<12}" + ''.join(f"{stats.get(key, '-'):>9}"
+                                             for key in ('p50', 'p90', 'p95', 'p99', 'max', 'mean'))
+                     + f"{stats['requests']:>10}")
+
+    if summary.get('quality'):
+        lines += ['', 'render quality: ' + ', '.join(f"{name} {count}" for name, count in summary['quality'].items())]
+
+    rss = summary['rss']
+    if rss['peakKbByProcess']:
+        lines += ['', 'peak RSS MB: ' + ', '.join(f"{label} {kb / 1024:.0f}"
+                                                  for label, kb in sorted(rss['peakKbByProcess'].items()))
+                  + f"; all processes {rss['peakTotalKb'] / 1024:.0f}"]
+    if 'perRequestPeakKb' in rss:
+        per_request = rss['perRequestPeakKb']
+        lines.append(f"per-request peak RSS MB: p50 {per_request['p50'] / 1024:.0f}, "
+                     f"p95 {per_request['p95'] / 1024:.0f}, max {per_request['max'] / 1024:.0f}")
+    timeline = rss['timeline']
+    if len(timeline) > 1:
+        step = math.ceil(len(timeline) / timeline_rows)
+        lines.append('RSS over time: ' + '  '.join(f"{point['t']:.1f}s {point['totalKb'] / 1024:.0f}MB"
+                                                   f"/{point['processes']}p" for point in timeline[::step]))
+    return '\n'.join(lines)
+
+
+def main():
+    """Run a load test and print its report"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('mode', choices=('cli', 'service'), help='spawn per request, or a long-lived render service')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--rate', type=float, help='open-loop arrivals per second (default: closed loop)')
+    parser.add_argument('--requests', type=int, default=100, help='requests to measure')
+    parser.add_argument('--duration', type=float, help='stop issuing requests after this many seconds')
+    parser.add_argument('--warmup', type=int, default=0, help='unmeasured requests sent first')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f"corpus weights, from {', '.join(sorted(CORPORA))} and files (default: {DEFAULT_MIX})")
+    parser.add_argument('--variants', type=int, default=8, help='documents generated per corpus')
+    parser.add_argument('--corpus-dir', help='directory of .md/.txt files for the files corpus')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for documents and arrivals')
+    parser.add_argument('--draft', action='store_true', help='render drafts')
+    parser.add_argument('--no-clean', action='store_true', help='cli mode: skip the clean_pdf_text.py spawn')
+    parser.add_argument('--url', help='service mode: existing render service (default: start one)')
+    parser.add_argument('--pid', type=int, help='service mode: pid of the existing service, for RSS sampling')
+    parser.add_argument('--workers', type=int, help='service mode: worker processes for the started service')
+    parser.add_argument('--max-tasks-per-child', type=int, help='service mode: worker recycling for the started service')
+    parser.add_argument('--service-args', default='',
+                        help="service mode: extra render_service.py options, e.g. '--degrade-queue 2,4'")
+    parser.add_argument('--sample-interval', type=float, default=0.25, help='seconds between RSS samples')
+    parser.add_argument('--json', help='also write the summary and per-request results to this file')
+    args = parser.parse_args()
+
+    try:
+        corpus = build_corpus(_parse_mix(args.mix), args.variants, args.seed, args.corpus_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    extra_metadata = {'draft': True} if args.draft else {}
+    if args.mode == 'cli':
+        target = CLITarget(clean=not args.no_clean, extra_metadata=extra_metadata)
+    else:
+        target = ServiceTarget(args.url, args.workers, args.max_tasks_per_child, args.pid,
+                               extra_metadata=extra_metadata, service_args=shlex.split(args.service_args))
+
+    target.start()
+    sampler = RSSSampler(target, args.sample_interval)
+    test = LoadTest(target, corpus, args.concurrency, args.rate, args.requests, args.duration, args.warmup, args.seed)
+    try:
+        sampler.start()
+        elapsed = test.run()
+    finally:
+        sampler.stop()
+        target.stop()
+
+    summary = summarize(test, elapsed, sampler.samples)
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(summary, results=test.results), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
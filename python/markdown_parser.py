@@ -0,0 +1,210 @@
+"""
+Sparken Markdown Parser
+Turns markdown/plain text into the document IR (see document_ir.py)
+"""
+
+import re
+
+from inline_markup import to_plain_text
+from text_sanitizer import sanitize_text
+from document_ir import (
+    Document, HeadingBlock, ParagraphBlock, ListBlock, TableBlock, CalloutBlock, ImageBlock,
+    content_key, document_cache
+)
+
+
+# List items: "- ", "* ", "+ ", "• " bullets or "1." / "1)" numbered items
+_LIST_ITEM = re.compile(r'^(?:[-*+•]|(\d+)([.)]))\s+(.*)$')
+
+# Lines that are just bullets with dashes like "• --"
+_BULLET_ARTIFACT = re.compile(r'^[•\-]\s*--\s*$')
+
+# Images on their own line: ![alt](path) or ![alt](path "title")
+_IMAGE = re.compile(r'^!\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)$')
+
+# Table separator cells like "---" or ":--:"
+_SEPARATOR_CELL = re.compile(r'^[-:\s]+$')
+
+
+def _starts_block(line, numbered=True):
+    """
+    Check whether a stripped line begins a heading, table, callout or list
+
+    Args:
+        line: Stripped source line
+        numbered: Whether "1." / "1)" items count. Numbered lists only start
+                  after a blank line or another list item, so a hard-wrapped
+                  line like "2024. Revenue grew..." stays in its paragraph.
+    """
+    if line.startswith(('# ', '## ', '### ', '> ')) or '|' in line or _IMAGE.match(line):
+        return True
+    match = _LIST_ITEM.match(line)
+    return match is not None and (numbered or match.group(1) is None)
+
+
+def parse_markdown(markdown_text, budget=None):
+    """
+    Parse markdown text into a Document
+
+    Consecutive text lines are merged into one paragraph block and
+    consecutive list items into one list block. Block text keeps its inline
+    markdown; renderers convert it. Characters the PDF fonts cannot draw are
+    replaced first (see text_sanitizer.py).
+
+    Args:
+        markdown_text: Raw markdown text
+        budget: Optional RenderBudget; block and table-cell counts are checked
+                as parsing goes, so oversized input fails before layout
+
+    Returns:
+        Document with title/subtitle metadata and blocks
+
+    Raises:
+        BudgetExceeded: If the document goes over the budget
+    """
+    lines = sanitize_text(markdown_text).split('\n')
+    metadata = {}
+    blocks = []
+    offset = 0  # Source lines consumed by metadata
+
+    # Extract metadata from first few lines
+    if lines and lines[0].startswith('# '):
+        metadata['title'] = to_plain_text(lines[0][2:].strip())
+        lines = lines[1:]
+        offset += 1
+
+    # Look for subtitle or "Prepared For" in next lines
+    if lines and (lines[0].startswith('## ') or 'Prepared For' in lines[0] or 'Subtitle' in lines[0]):
+        metadata['subtitle'] = to_plain_text(lines[0].replace('## ', '').strip())
+        lines = lines[1:]
+        offset += 1
+
+    counted = 0  # Blocks already reported to the budget
+    i = 0
+    while i < len(lines):
+        # Each iteration adds at most one block
+        if budget and len(blocks) > counted:
+            budget.add_block()
+            counted += 1
+
+        line = lines[i].strip()
+        first_line = i + offset + 1
+
+        if not line:
+            i += 1
+            continue
+
+        # Headers (plain text - the heading components escape it themselves)
+        if line.startswith(('# ', '## ', '### ')):
+            level = line.index(' ')
+            blocks.append(HeadingBlock(level, to_plain_text(line[level + 1:]), start=first_line))
+
+        # Images on their own line
+        elif _IMAGE.match(line):
+            match = _IMAGE.match(line)
+            blocks.append(ImageBlock(match.group(2), to_plain_text(match.group(1)), start=first_line))
+
+        # Tables (markdown table detection - handles both | column | and column | formats)
+        elif '|' in line:
+            table_rows = []
+            while i < len(lines) and '|' in lines[i].strip():
+                current_line = lines[i].strip()
+
+                # Parse row - handle both |col|col| and col|col formats
+                if current_line.startswith('|') and current_line.endswith('|'):
+                    # Format: | col1 | col2 |
+                    row = [cell.strip() for cell in current_line.split('|')[1:-1]]
+                else:
+                    # Format: col1 | col2 (no leading/trailing pipes)
+                    row = [cell.strip() for cell in current_line.split('|')]
+
+                # Skip separator rows (lines with only dashes, colons, pipes)
+                if row and not all(_SEPARATOR_CELL.match(cell) for cell in row):
+                    cleaned_row = [cell for cell in row if cell]  # Skip empty cells
+                    if cleaned_row:  # Only add if row has content
+                        table_rows.append(cleaned_row)
+                        if budget:
+                            budget.add_table_cells(len(cleaned_row))
+                i += 1
+            if table_rows:
+                blocks.append(TableBlock(table_rows, start=first_line, end=i + offset))
+            continue
+
+        # Callouts (lines starting with > )
+        elif line.startswith('> '):
+            callout_text = line[2:]
+            # Collect multi-line callouts
+            while i + 1 < len(lines) and lines[i + 1].strip().startswith('> '):
+                i += 1
+                callout_text += ' ' + lines[i].strip()[2:]
+            blocks.append(CalloutBlock(callout_text, start=first_line, end=i + offset + 1))
+
+        # Bullet artifacts from PDF extraction like "• --"
+        elif _BULLET_ARTIFACT.match(line):
+            pass
+
+        # Lists - consecutive items (plus indented continuation lines) form one block
+        elif _LIST_ITEM.match(line):
+            first = _LIST_ITEM.match(line)
+            start = int(first.group(1)) if first.group(1) else None
+            delimiter = first.group(2)
+            items = []
+            while i < len(lines):
+                current_line = lines[i].strip()
+                match = _LIST_ITEM.match(current_line)
+                if match and match.group(2) == delimiter:
+                    items.append(match.group(3))
+                elif (items and current_line and lines[i][:1] in (' ', '\t')
+                      and not _starts_block(current_line)):
+                    items[-1] += ' ' + current_line
+                else:
+                    break
+                i += 1
+            blocks.append(ListBlock(items, start, delimiter, start=first_line, end=i + offset))
+            continue
+
+        # Regular paragraphs - hard-wrapped lines are joined into one block
+        else:
+            paragraph_lines = []
+            while i < len(lines):
+                current_line = lines[i].strip()
+                if not current_line or (paragraph_lines and _starts_block(current_line, numbered=False)):
+                    break
+                if not _BULLET_ARTIFACT.match(current_line):
+                    paragraph_lines.append(current_line)
+                i += 1
+
+            if paragraph_lines:
+                blocks.append(ParagraphBlock(' '.join(paragraph_lines), start=first_line, end=i + offset))
+            continue
+
+        i += 1
+
+    if budget and len(blocks) > counted:
+        budget.add_block()
+
+    return Document(metadata, blocks)
+
+
+def parse_markdown_cached(markdown_text, cache=document_cache, budget=None):
+    """
+    Parse markdown, reusing a cached Document for identical input
+
+    Cached Documents are shared - callers must treat them as read-only.
+
+    Args:
+        markdown_text: Raw markdown text
+        cache: DocumentCache to consult (defaults to the process-wide cache)
+        budget: Optional RenderBudget, checked while parsing or against the cached Document
+
+    Returns:
+        Document
+    """
+    key = content_key(markdown_text)
+    document = cache.get(key)
+    if document is None:
+        document = parse_markdown(markdown_text, budget)
+        cache.put(key, document)
+    elif budget:
+        budget.check_document(document)
+    return document
@@ -0,0 +1,74 @@
+"""
+Sparken Heading Outline
+PDF bookmarks and a heading index (level, text, page, source line), recorded
+as headings are laid out
+"""
+
+import json
+
+
+# Attribute register() marks heading flowables with; a split heading's first
+# piece keeps it (see layout_cache.CachedParagraph.split)
+HEADING_MARK = '_outline_heading'
+
+# Attribute binder.py marks the headings its combined TOC points at with
+TOC_MARK = '_toc_key'
+
+
+class HeadingIndex:
+    """
+    Headings registered while the story is built, placed during layout
+
+    The doc template calls placed() after drawing each flowable; registered
+    headings get a bookmark at their position, a PDF outline entry and an
+    index entry with the page they landed on. Nothing is laid out twice.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.page_offset = 0   # Pages before page 1 of the printed numbering (the cover)
+        self._open = []        # Levels of the headings enclosing the next one
+
+    def register(self, flowable, level, text, line):
+        """
+        Track a heading flowable
+
+        Args:
+            flowable: Heading Paragraph from HeadingComponent
+            level: Heading level (1-3)
+            text: Plain heading text
+            line: Source line the heading came from
+        """
+        setattr(flowable, HEADING_MARK, (level, text, line))
+
+    def placed(self, canvas_obj, flowable, page, frame):
+        """Record a flowable the doc template just drew, if it is a registered heading"""
+        heading = getattr(flowable, HEADING_MARK, None)
+        if heading is None:
+            return
+        delattr(flowable, HEADING_MARK)
+        level, text, line = heading
+        key = f"heading{len(self.entries)}"
+
+        # The frame's cursor is below the heading and its space after
+        top = frame._y + flowable.getSpaceAfter() + getattr(flowable, 'height', 0)
+        canvas_obj.bookmarkPage(key, fit='XYZ', left=0, top=top)
+        # Outline depth follows nesting rather than the raw level: PDF outlines may
+        # only go one deeper at a time, and documents can start at H2 or skip levels
+        while self._open and self._open[-1] >= level:
+            self._open.pop()
+        canvas_obj.addOutlineEntry(text, key, level=len(self._open), closed=len(self._open) > 0)
+        self._open.append(level)
+        if len(self.entries) == 0:
+            canvas_obj.showOutline()
+
+        self.entries.append({
+            'level': level,
+            'text': text,
+            'page': page,
+            'label': str(page - self.page_offset),
+            'line': line,
+        })
+
+    def to_json(self):
+        return json.dumps({'headings': self.entries})
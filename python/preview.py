@@ -0,0 +1,119 @@
+"""
+Sparken Preview Renderers
+Lightweight HTML and plain-text renderings of the document IR for instant
+previews - no ReportLab layout involved
+"""
+
+from brand_constants import BrandColors
+from inline_markup import to_html, to_plain_text, escape_html
+
+
+_PREVIEW_CSS = f"""
+body {{ font-family: Helvetica, Arial, sans-serif; font-size: 11pt; line-height: 1.6;
+       color: #{BrandColors.TEXT_BLACK_HEX}; max-width: 6.5in; margin: 0 auto; padding: 24px; }}
+header {{ background: #{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}; color: #fff; padding: 32px 24px; margin-bottom: 24px; }}
+header h1 {{ color: #fff; margin: 0; }}
+header p {{ margin: 8px 0 0; }}
+h1, h2, h3 {{ color: #{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}; line-height: 1.3; }}
+h1 {{ font-size: 24pt; text-transform: uppercase; }}
+h2 {{ font-size: 18pt; }}
+h3 {{ font-size: 14pt; }}
+table {{ border-collapse: collapse; width: 100%; margin-bottom: 12pt; }}
+th, td {{ border: 0.5pt solid #{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}; padding: 8px 10px; text-align: left; vertical-align: top; }}
+th {{ background: #{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}; color: #fff; }}
+tr:nth-child(even) td {{ background: #{BrandColors.SOFT_LAVENDER_HEX}; }}
+blockquote {{ background: #{BrandColors.SOFT_GRAY_HEX}; border-bottom: 4pt solid #{BrandColors.BEHAVIORAL_YELLOW_HEX};
+             margin: 10px 0; padding: 10px 14px; }}
+figure {{ margin: 12pt 0; text-align: center; }}
+figure img {{ max-width: 100%; }}
+li::marker {{ color: #{BrandColors.DEEP_COGNITIVE_PURPLE_HEX}; }}
+"""
+
+
+def render_html(document, title=None, subtitle=None):
+    """
+    Render a Document as a standalone HTML page
+
+    Args:
+        document: Document IR
+        title: Title override (defaults to the parsed title)
+        subtitle: Subtitle override (defaults to the parsed subtitle)
+
+    Returns:
+        HTML string
+    """
+    title = title or document.metadata.get('title', '')
+    subtitle = subtitle or document.metadata.get('subtitle', '')
+
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8">',
+             f'<title>{escape_html(title)}</title><style>{_PREVIEW_CSS}</style></head><body>']
+    if title:
+        parts.append(f'<header><h1>{escape_html(title)}</h1>')
+        if subtitle:
+            parts.append(f'<p>{escape_html(subtitle)}</p>')
+        parts.append('</header>')
+
+    for block in document.blocks:
+        if block.kind == 'h':
+            parts.append(f'<h{block.level}>{escape_html(block.text)}</h{block.level}>')
+        elif block.kind == 'p':
+            parts.append(f'<p>{to_html(block.text)}</p>')
+        elif block.kind == 'l':
+            items = ''.join(f'<li>{to_html(item)}</li>' for item in block.items)
+            if block.start_number is None:
+                parts.append(f'<ul>{items}</ul>')
+            else:
+                parts.append(f'<ol start="{block.start_number}">{items}</ol>')
+        elif block.kind == 't':
+            header, *rows = block.rows
+            parts.append('<table><tr>' + ''.join(f'<th>{to_html(cell)}</th>' for cell in header) + '</tr>')
+            for row in rows:
+                parts.append('<tr>' + ''.join(f'<td>{to_html(cell)}</td>' for cell in row) + '</tr>')
+            parts.append('</table>')
+        elif block.kind == 'c':
+            parts.append(f'<blockquote>{to_html(block.text)}</blockquote>')
+        elif block.kind == 'i':
+            parts.append(f'<figure><img src="{escape_html(block.src)}" alt="{escape_html(block.alt)}"></figure>')
+
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def render_text(document):
+    """
+    Render a Document as plain text (headings underlined, lists bulleted)
+
+    Args:
+        document: Document IR
+
+    Returns:
+        Plain text string
+    """
+    out = []
+    if document.metadata.get('title'):
+        out.append(document.metadata['title'].upper())
+        if document.metadata.get('subtitle'):
+            out.append(document.metadata['subtitle'])
+        out.append('')
+
+    for block in document.blocks:
+        if block.kind == 'h':
+            text = block.text.upper() if block.level == 1 else block.text
+            out.extend([text, ('=' if block.level == 1 else '-') * len(text), ''])
+        elif block.kind == 'p':
+            out.extend([to_plain_text(block.text), ''])
+        elif block.kind == 'l':
+            for number, item in enumerate(block.items, block.start_number or 1):
+                marker = f'{number}{block.delimiter}' if block.start_number is not None else '*'
+                out.append(f'{marker} {to_plain_text(item)}')
+            out.append('')
+        elif block.kind == 't':
+            for row in block.rows:
+                out.append(' | '.join(to_plain_text(cell) for cell in row))
+            out.append('')
+        elif block.kind == 'c':
+            out.extend([f'> {to_plain_text(block.text)}', ''])
+        elif block.kind == 'i':
+            out.extend([f'[Image: {block.alt or block.src}]', ''])
+
+    return '\n'.join(out).rstrip() + '\n'
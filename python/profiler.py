@@ -0,0 +1,139 @@
+"""
+Sparken Layout Profiler
+Opt-in per-flowable timing of ReportLab wrap/split/draw calls, mapped back to
+the markdown source lines each flowable came from
+"""
+
+import time
+
+from reportlab.platypus import Spacer, PageBreak
+
+
+# Block kinds (document_ir) as shown in reports
+_KIND_NAMES = {'h': 'heading', 'p': 'paragraph', 'l': 'list', 't': 'table', 'c': 'callout', 'i': 'image'}
+
+_PHASES = ('wrap', 'split', 'draw')
+
+# Flowable method timed for each phase - containers such as lists override
+# drawOn rather than draw
+_METHODS = {'wrap': 'wrap', 'split': 'split', 'draw': 'drawOn'}
+
+
+class FlowableStats:
+    """Call counts and time for one block's flowable (and the pieces it was split into)"""
+
+    __slots__ = ('kind', 'start', 'end', 'label', 'calls', 'seconds')
+
+    def __init__(self, kind, start, end, label):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.label = label
+        self.calls = dict.fromkeys(_PHASES, 0)
+        self.seconds = dict.fromkeys(_PHASES, 0.0)
+
+    @property
+    def total(self):
+        return sum(self.seconds.values())
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'lines': [self.start, self.end],
+            'label': self.label,
+            'seconds': round(self.total, 6),
+            **{phase: {'calls': self.calls[phase], 'seconds': round(self.seconds[phase], 6)}
+               for phase in _PHASES},
+        }
+
+
+def _label(block):
+    """Short description of a block's content"""
+    if block.kind == 't':
+        columns = max((len(row) for row in block.rows), default=0)
+        return f"{len(block.rows)}x{columns} table: {' | '.join(block.rows[0])[:40]}"
+    if block.kind == 'l':
+        return f"{len(block.items)} items: {block.items[0][:40]}"
+    if block.kind == 'i':
+        return block.src
+    text = block.text
+    return text if len(text) <= 60 else f"{text[:57]}... ({len(text)} chars)"
+
+
+class LayoutProfiler:
+    """
+    Times wrap, split and draw for the flowables of each document block
+
+    Tracked flowables get timing wrappers on the instance. Pieces produced
+    by split() are wrapped too and charged to the same block, so repeated
+    split attempts near page breaks show up against the content that caused
+    them. Nested flowables (table cells) count towards their container.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def track_block(self, block, flowables):
+        """Instrument the flowables built for one IR block"""
+        stats = None
+        for flowable in flowables:
+            if isinstance(flowable, (Spacer, PageBreak)):
+                continue
+            if stats is None:
+                stats = FlowableStats(_KIND_NAMES.get(block.kind, block.kind), block.start, block.end,
+                                      _label(block))
+                self.entries.append(stats)
+            self._instrument(flowable, stats)
+
+    def _instrument(self, flowable, stats):
+        if flowable.__dict__.get('_profile_stats') is stats:
+            return  # split() can hand back the same object
+        flowable._profile_stats = stats
+        for phase, name in _METHODS.items():
+            method = getattr(flowable, name, None)
+            if method is not None:
+                setattr(flowable, name, self._timed(method, phase, stats))
+
+    def _timed(self, method, phase, stats):
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                stats.calls[phase] += 1
+                stats.seconds[phase] += perf_counter() - started
+            if phase == 'split':
+                for piece in result:
+                    self._instrument(piece, stats)
+            return result
+        return timed
+
+    def ranked(self):
+        """Entries, slowest first"""
+        return sorted(self.entries, key=lambda stats: stats.total, reverse=True)
+
+    def to_dict(self, top=None):
+        """JSON-friendly profile: totals plus the slowest entries"""
+        ranked = self.ranked()
+        return {
+            'flowables': len(ranked),
+            'seconds': round(sum(stats.total for stats in ranked), 6),
+            'entries': [stats.to_dict() for stats in ranked[:top]],
+        }
+
+    def report(self, top=20):
+        """Ranked plain-text report of the slowest flowables"""
+        ranked = self.ranked()
+        total = sum(stats.total for stats in ranked)
+        lines = [f"Layout profile: {len(ranked)} flowables, {total * 1000:.1f} ms in wrap/split/draw",
+                 f"{'#':>3} {'ms':>9} {'share':>6} {'wrap':>6} {'split':>6} {'draw':>5} {'lines':>11}  "
+                 f"{'kind':<9} content"]
+        for rank, stats in enumerate(ranked[:top], 1):
+            share = stats.total / total * 100 if total else 0
+            source = f"{stats.start}-{stats.end}" if stats.end != stats.start else str(stats.start)
+            lines.append(f"{rank:>3} {stats.total * 1000:>9.2f} {share:>5.1f}% {stats.calls['wrap']:>6} "
+                         f"{stats.calls['split']:>6} {stats.calls['draw']:>5} {source:>11}  "
+                         f"{stats.kind:<9} {stats.label}")
+        return '\n'.join(lines)
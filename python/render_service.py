@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Sparken Render Service
+Long-lived HTTP render service: a pool of worker processes behind a small JSON
+API, with Prometheus metrics on a separate local port
+
+Usage:
+    python3 python/render_service.py --port 8765 --metrics-port 9464 --workers 4
+    python3 python/render_service.py --workers 4 --degrade-queue 4,8,12,16 --degrade-latency 3,6
+
+Endpoints:
+    POST /render    {"markdown": "...", "metadata": {...}} -> application/pdf
+                    (X-Render-Quality names the QUALITY_LEVELS step applied)
+    GET  /healthz
+    GET  /metrics   (metrics port only)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from brand_constants import get_config
+from guardrails import BudgetExceeded, RenderLimits, cap_address_space
+from document_ir import document_cache
+from metrics import Registry, CONTENT_TYPE, size_bucket
+from sparken_pdf_generator import render_pdf, QUALITY_LEVELS
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+REGISTRY = Registry()
+
+RENDER_SECONDS = REGISTRY.histogram(
+    'sparken_render_duration_seconds',
+    'Render latency by phase (queue, parse, layout, total) and input size',
+    ('phase', 'size'))
+RENDERS = REGISTRY.counter('sparken_renders_total', 'Render requests by outcome', ('status',))
+PAGES = REGISTRY.counter('sparken_pages_rendered_total', 'Pages rendered')
+PDF_BYTES = REGISTRY.counter('sparken_pdf_bytes_total', 'PDF bytes produced')
+CACHE = REGISTRY.counter('sparken_document_cache_total', 'Parsed-document cache lookups', ('result',))
+LAYOUT_CACHE = REGISTRY.counter('sparken_layout_cache_total', 'Paragraph layout cache lookups', ('result',))
+LAYOUT_CACHE_SAVED = REGISTRY.counter('sparken_layout_cache_saved_seconds_total',
+                                      'Layout time saved by layout cache hits')
+QUEUE_DEPTH = REGISTRY.gauge('sparken_queue_depth', 'Renders waiting for a worker')
+ACTIVE_WORKERS = REGISTRY.gauge('sparken_active_workers', 'Workers currently rendering')
+WORKERS = REGISTRY.gauge('sparken_workers', 'Configured worker processes')
+WORKER_RESTARTS = REGISTRY.counter('sparken_worker_restarts_total', 'Worker pool restarts after a worker died')
+COALESCED = REGISTRY.counter('sparken_coalesced_renders_total',
+                             'Requests answered by an identical render already in flight')
+BUDGET_REJECTIONS = REGISTRY.counter('sparken_budget_rejections_total', 'Renders rejected by a resource budget',
+                                     ('limit',))
+QUALITY_LEVEL = REGISTRY.gauge('sparken_quality_level',
+                               'Quality step new renders start at (0 = full, see QUALITY_LEVELS)')
+DEGRADED = REGISTRY.counter('sparken_degraded_renders_total', 'Renders at reduced quality', ('quality',))
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def _init_worker():
+    """Worker process setup - each worker renders one document at a time"""
+    cap_address_space(RenderLimits())
+    get_config()  # Load the logos and fonts before the first request
+
+
+def _render_job(markdown_text, metadata, submitted):
+    """
+    Render in a worker process
+
+    Returns:
+        Dict with pdf, pages, content_hash, timings (queue/parse/layout), cache_hit,
+        layout_cache (the render's layout cache hits, misses and savedMs) and
+        quality (the QUALITY_LEVELS step applied)
+    """
+    started = time.time()
+    hits = document_cache.hits
+    limits = RenderLimits()
+    try:
+        result = render_pdf(markdown_text, metadata, limits.start())
+    except MemoryError:
+        raise BudgetExceeded('max_rss_mb', None, limits.max_rss_mb)
+    return {
+        'pdf': result.pdf,
+        'pages': result.pages,
+        'content_hash': result.content_hash,
+        'timings': dict(result.timings, queue=max(0.0, started - submitted)),
+        'cache_hit': document_cache.hits > hits,
+        'layout_cache': result.layout_cache,
+        'quality': result.quality,
+    }
+
+
+def _render_key(markdown_text, metadata):
+    """Identity of a render request: identical input and options give identical PDFs"""
+    payload = json.dumps([markdown_text, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderPool:
+    """
+    Process pool that tracks queue depth and replaces itself when a worker dies
+
+    Identical requests that arrive while the first one is rendering attach to
+    it instead of taking another worker (single flight): a team opening the
+    same shared link, or a double-submitted form, costs one render.
+    """
+
+    def __init__(self, workers, max_tasks_per_child=None):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._flights = {}  # Render key -> Future shared by the requests waiting on it
+        self._executor = self._new_executor()
+        WORKERS.set(workers)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                   max_tasks_per_child=self.max_tasks_per_child)
+
+    def queue_depth(self):
+        """Renders waiting for a worker"""
+        with self._lock:
+            return max(0, self._in_flight - self.workers)
+
+    def _update_gauges(self):
+        ACTIVE_WORKERS.set(min(self._in_flight, self.workers))
+        QUEUE_DEPTH.set(max(0, self._in_flight - self.workers))
+
+    def render(self, markdown_text, metadata):
+        """
+        Render on a worker and wait for the result, or wait for an identical
+        render that is already in flight
+
+        Returns:
+            _render_job's dict plus coalesced (True if another request's render
+            was shared)
+
+        Raises:
+            BudgetExceeded: If the render goes over its budget
+            BrokenProcessPool: If the worker died (the pool is replaced for later requests)
+        """
+        key = _render_key(markdown_text, metadata)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            return dict(flight.result(), coalesced=True)
+
+        try:
+            result = self._submit(markdown_text, metadata)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return dict(result, coalesced=False)
+
+    def _submit(self, markdown_text, metadata):
+        with self._lock:
+            executor = self._executor
+            self._in_flight += 1
+            self._update_gauges()
+        try:
+            return executor.submit(_render_job, markdown_text, metadata, time.time()).result()
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._update_gauges()
+
+    def _restart(self, broken):
+        with self._lock:
+            if self._executor is broken:  # Only the first failing request replaces the pool
+                self._executor = self._new_executor()
+                WORKER_RESTARTS.inc()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+# ============================================================================
+# DEGRADATION
+# ============================================================================
+
+class QualityGovernor:
+    """
+    Chooses the render quality from the service's own load
+
+    Each threshold list holds, per QUALITY_LEVELS step after 'full', the
+    queue depth or p95 request latency (seconds, over the last window
+    seconds) at which that step engages; a step with no threshold is never
+    used. Overload moves straight to the step it calls for. Recovery goes one
+    step at a time, at most every cooldown seconds, so quality does not
+    flap as the cheaper renders bring latency down.
+    """
+
+    def __init__(self, queue_thresholds=(), latency_thresholds=(), window=30.0, cooldown=10.0):
+        self.queue_thresholds = list(queue_thresholds)[:len(QUALITY_LEVELS) - 1]
+        self.latency_thresholds = list(latency_thresholds)[:len(QUALITY_LEVELS) - 1]
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies = deque()  # (finished, seconds) of recent requests
+        self._level = 0
+        self._changed = 0.0
+
+    def observe(self, seconds):
+        """Record a finished request's latency"""
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def _p95(self, now):
+        while self._latencies and self._latencies[0][0] < now - self.window:
+            self._latencies.popleft()
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(seconds for _, seconds in self._latencies)
+        return ordered[max(0, -(-len(ordered) * 95 // 100) - 1)]
+
+    def level(self, queue_depth):
+        """
+        The quality step for a request arriving now
+
+        Args:
+            queue_depth: Renders waiting for a worker
+
+        Returns:
+            Index into QUALITY_LEVELS
+        """
+        now = time.monotonic()
+        with self._lock:
+            p95 = self._p95(now)
+            wanted = max(sum(1 for threshold in self.queue_thresholds if queue_depth >= threshold),
+                         sum(1 for threshold in self.latency_thresholds if p95 >= threshold))
+            if wanted > self._level:
+                self._level, self._changed = wanted, now
+            elif wanted < self._level and now - self._changed >= self.cooldown:
+                self._level, self._changed = self._level - 1, now
+            QUALITY_LEVEL.set(self._level)
+            return self._level
+
+
+def _thresholds(text):
+    """Parse a comma-separated threshold list (an empty string disables it)"""
+    values = [float(value) for value in text.split(',') if value.strip()]
+    if any(b < a for a, b in zip(values, values[1:])):
+        raise argparse.ArgumentTypeError('thresholds must not decrease')
+    return values
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Shared response helpers"""
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode('utf-8'))
+
+
+class RenderHandler(_JSONHandler):
+    """POST /render and GET /healthz"""
+
+    def do_GET(self):
+        if self.path == '/healthz':
+            self._send_json(200, {'status': 'ok', 'workers': self.server.pool.workers})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length < 0:
+                raise ValueError('Content-Length must not be negative')
+            # Reject oversized bodies before reading them
+            max_bytes = RenderLimits().max_input_bytes
+            if max_bytes and length > max_bytes:
+                self._reject(BudgetExceeded('max_input_bytes', length, max_bytes))
+                return
+            payload = json.loads(self.rfile.read(length))
+            markdown_text = payload['markdown']
+            metadata = payload.get('metadata') or {}
+            if not isinstance(markdown_text, str) or not isinstance(metadata, dict):
+                raise ValueError('markdown must be a string and metadata an object')
+            # Clients may ask for a cheaper render; load can only lower it further
+            quality = metadata.get('quality', 'full')
+            if quality not in QUALITY_LEVELS:
+                raise ValueError(f"unknown quality: {quality}")
+            requested = QUALITY_LEVELS.index(quality)
+            # Clients never choose which server directory images are read from
+            metadata['imageDir'] = self.server.image_dir
+            # Fixed timestamps and IDs, so a repeat request gets the same bytes and its ETag matches
+            metadata.setdefault('deterministic', True)
+        except (ValueError, KeyError, TypeError) as e:
+            RENDERS.inc(status='bad_request')
+            self._send_json(400, {'error': f"Invalid request: {e}"})
+            return
+
+        size = size_bucket(length)
+        started = time.perf_counter()
+        level = self.server.governor.level(self.server.pool.queue_depth())
+        metadata['quality'] = QUALITY_LEVELS[max(level, requested)]
+        try:
+            result = self.server.pool.render(markdown_text, metadata)
+        except BudgetExceeded as e:
+            self._reject(e)
+            return
+        except BrokenProcessPool:
+            RENDERS.inc(status='error')
+            self._send_json(503, {'error': 'Render worker died; retry'})
+            return
+        except ValueError as e:  # Unknown pageSize or color override
+            RENDERS.inc(status='bad_request')
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            RENDERS.inc(status='error')
+            print(f"Render failed: {e!r}", file=sys.stderr)
+            self._send_json(500, {'error': 'Render failed'})
+            return
+
+        # A shared render's phases, pages and cache lookups were counted by the request that ran it
+        if result['coalesced']:
+            COALESCED.inc()
+        else:
+            for phase, seconds in result['timings'].items():
+                RENDER_SECONDS.observe(seconds, phase=phase, size=size)
+            PAGES.inc(result['pages'])
+            PDF_BYTES.inc(len(result['pdf']))
+            CACHE.inc(result='hit' if result['cache_hit'] else 'miss')
+            LAYOUT_CACHE.inc(result['layout_cache']['hits'], result='hit')
+            LAYOUT_CACHE.inc(result['layout_cache']['misses'], result='miss')
+            LAYOUT_CACHE_SAVED.inc(result['layout_cache']['savedMs'] / 1000)
+            if result['quality'] != 'full':
+                DEGRADED.inc(quality=result['quality'])
+        elapsed = time.perf_counter() - started
+        RENDER_SECONDS.observe(elapsed, phase='total', size=size)
+        RENDERS.inc(status='ok')
+        self.server.governor.observe(elapsed)
+
+        etag = f'"{result["content_hash"]}"'
+        headers = {'ETag': etag, 'X-Render-Quality': result['quality']}
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, headers=headers)
+            return
+        self._send(200, result['pdf'], 'application/pdf', dict(headers, **{'X-Page-Count': str(result['pages'])}))
+
+    def _reject(self, error):
+        BUDGET_REJECTIONS.inc(limit=error.limit)
+        RENDERS.inc(status='budget')
+        self._send_json(413 if error.limit == 'max_input_bytes' else 422, error.to_dict())
+
+
+class MetricsHandler(_JSONHandler):
+    """GET /metrics in Prometheus text format"""
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, REGISTRY.render().encode('utf-8'), CONTENT_TYPE)
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the access log
+
+
+def main():
+    """Start the metrics listener and serve renders until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='render API bind address')
+    parser.add_argument('--port', type=int, default=8765, help='render API port')
+    parser.add_argument('--metrics-host', default='127.0.0.1', help='metrics bind address')
+    parser.add_argument('--metrics-port', type=int, default=9464, help='metrics port (0 disables)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='worker processes')
+    parser.add_argument('--max-tasks-per-child', type=int, default=200,
+                        help='renders before a worker is recycled (bounds memory growth)')
+    parser.add_argument('--image-dir', help='directory markdown images are read from (default: images disabled)')
+    parser.add_argument('--degrade-queue', type=_thresholds, default=[], metavar='N,N,...',
+                        help=f"queue depths at which renders step down to {', '.join(QUALITY_LEVELS[1:])} "
+                             '(default: never)')
+    parser.add_argument('--degrade-latency', type=_thresholds, default=[], metavar='S,S,...',
+                        help='p95 request latencies (seconds) at which renders step down, as --degrade-queue')
+    parser.add_argument('--degrade-window', type=float, default=30.0, help='seconds of latency the p95 covers')
+    parser.add_argument('--degrade-cooldown', type=float, default=10.0,
+                        help='seconds between quality steps back up once load eases')
+    args = parser.parse_args()
+
+    pool = RenderPool(args.workers, args.max_tasks_per_child or None)
+
+    if args.metrics_port:
+        metrics_server = ThreadingHTTPServer((args.metrics_host, args.metrics_port), MetricsHandler)
+        metrics_server.daemon_threads = True
+        threading.Thread(target=metrics_server.serve_forever, daemon=True).start()
+        print(f"Metrics on http://{args.metrics_host}:{args.metrics_port}/metrics", file=sys.stderr)
+
+    server = ThreadingHTTPServer((args.host, args.port), RenderHandler)
+    server.daemon_threads = True
+    server.pool = pool
+    server.image_dir = args.image_dir
+    server.governor = QualityGovernor(args.degrade_queue, args.degrade_latency,
+                                      args.degrade_window, args.degrade_cooldown)
+    print(f"Rendering on http://{args.host}:{args.port}/render with {args.workers} workers", file=sys.stderr)
+
+    # SIGTERM (service managers, load_test.py) stops serving like Ctrl-C, so the
+    # worker pool is shut down instead of left running. shutdown() waits for
+    # serve_forever() to return, so it cannot run in this (the serving) thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
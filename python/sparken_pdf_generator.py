@@ -6,169 +6,146 @@ Main script to generate fully branded PDFs from markdown/text content
 
 import sys
 import os
-import re
+import csv
 import json
+import time
+import hashlib
 from io import BytesIO
 
-from reportlab.lib.pagesizes import letter
 from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, PageBreak, 
                                 KeepTogether, Table, TableStyle)
-from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus.doctemplate import PageBegin
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_JUSTIFY
 
-from brand_constants import BrandColors, Typography, Layout
+from brand_constants import get_config
+from guardrails import (BudgetExceeded, RenderLimits, BUDGET_EXIT_CODE, read_limited,
+                        cap_address_space)
+from inline_markup import to_paragraph_markup, escape_markup
+from markdown_parser import parse_markdown_cached
+from preview import render_html, render_text
+from text_sanitizer import sanitize_text
 from components import (
     CoverPageComponent, HeaderComponent, FooterComponent, WatermarkComponent,
-    TableComponent, CalloutComponent, HeadingComponent, BodyTextComponent
+    TableComponent, CalloutComponent, HeadingComponent, BodyTextComponent, ListComponent,
+    ImageComponent
 )
+from images import resolve_image_path, LOW_QUALITY_DPI
+from profiler import LayoutProfiler
+from layout_estimator import estimate_layout
+from outline import HeadingIndex
+from csv_input import create_table, input_format, DELIMITERS
+from layout_cache import layout_cache, stats_delta, format_stats
+from linearize import linearize_or_keep
+
+
+class _PageLimitDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that can stop layout once max_pages pages are finished
+    
+    With a RenderBudget, the clock is checked per flowable and the page count,
+    clock and memory after every page. With a HeadingIndex, headings get
+    bookmarks and outline entries as they are drawn.
+    """
+    
+    def __init__(self, filename, max_pages=None, budget=None, heading_index=None, **kwargs):
+        SimpleDocTemplate.__init__(self, filename, **kwargs)
+        self.max_pages = max_pages
+        self.budget = budget
+        self.heading_index = heading_index
+    
+    def afterFlowable(self, flowable):
+        if self.heading_index is not None:
+            self.heading_index.placed(self.canv, flowable, self.page, self.frame)
+    
+    def afterPage(self):
+        if self.budget:
+            self.budget.check_page(self.page)
+    
+    def handle_flowable(self, flowables):
+        if self.budget:
+            self.budget.check_time()
+        SimpleDocTemplate.handle_flowable(self, flowables)
+        # A pending PageBegin means the current page was just finished; dropping
+        # the rest of the story here ends the build without an extra blank page
+        if (self.max_pages and self.page >= self.max_pages
+                and self._hanging and self._hanging[-1] is PageBegin):
+            del flowables[:]
+
+
+# Cheaper rendering steps the render service switches to under load, mildest
+# first; each level keeps the reductions of the levels before it
+QUALITY_LEVELS = ('full', 'no-watermark', 'no-toc', 'plain-chrome', 'low-images')
 
 
 class SparkEnPDFGenerator:
     """Main PDF generator class"""
     
-    def __init__(self, output_path=None, include_toc=True):
+    def __init__(self, output_path=None, include_toc=True, draft=False, max_pages=None, config=None,
+                 budget=None, deterministic=False, image_dir=None, profiler=None, quality='full'):
         """
         Initialize PDF generator
         
         Args:
             output_path: Path to save PDF (or None for BytesIO)
             include_toc: Whether to include a table of contents (default: True)
+            draft: Fast preview rendering - no watermark or logos, plain tables.
+                   Layout is unchanged, so pages break exactly as in the final PDF
+            max_pages: Stop after this many pages (draft previews of long documents)
+            config: BrandConfig for page size and colors (defaults to Letter, standard palette)
+            budget: Optional RenderBudget checked while parsing and during layout
+            deterministic: Fixed creation date and document ID, so identical input
+                           always produces byte-identical PDFs
+            image_dir: Directory markdown images are resolved against; images outside
+                       it (and all images when None) draw a placeholder
+            profiler: Optional LayoutProfiler that times each block's flowables
+            quality: A QUALITY_LEVELS name - 'no-watermark' skips the watermark
+                     grid, 'no-toc' also the printed TOC (the PDF outline remains),
+                     'plain-chrome' also the logos and table striping (visibly
+                     off-brand, so it comes late) and 'low-images' also
+                     downscales images to LOW_QUALITY_DPI
+        
+        Raises:
+            ValueError: If quality is not a QUALITY_LEVELS name
         """
+        if quality not in QUALITY_LEVELS:
+            raise ValueError(f"Unknown quality: {quality}")
+        self.config = config or get_config()
+        self.budget = budget
+        self.deterministic = deterministic
+        self.page_count = 0
         self.output_path = output_path or BytesIO()
         self.story = []
         self.metadata = {}
         self.has_cover = False
         self.include_toc = include_toc
+        self.draft = draft
+        self.max_pages = max_pages
+        self.image_dir = image_dir
+        self.profiler = profiler
+        self.quality = quality
         self.toc_entries = []  # Track heading entries for TOC
+        self.heading_index = HeadingIndex()  # Bookmarks, outline and heading sidecar
         
+    def _reduced(self, quality):
+        """Whether the render is at the given QUALITY_LEVELS step or a cheaper one"""
+        return QUALITY_LEVELS.index(self.quality) >= QUALITY_LEVELS.index(quality)
+    
     def parse_markdown(self, markdown_text):
         """
-        Parse markdown text and extract components
+        Parse markdown text into the document IR
         
         Args:
             markdown_text: Raw markdown text
         
         Returns:
-            Parsed content structure
-        """
-        lines = markdown_text.split('\n')
-        content = []
-        
-        # Extract metadata from first few lines
-        if lines and lines[0].startswith('# '):
-            self.metadata['title'] = lines[0][2:].strip()
-            lines = lines[1:]
-        
-        # Look for subtitle or "Prepared For" in next lines
-        if lines and (lines[0].startswith('## ') or 'Prepared For' in lines[0] or 'Subtitle' in lines[0]):
-            self.metadata['subtitle'] = lines[0].replace('## ', '').strip()
-            lines = lines[1:]
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if not line:
-                i += 1
-                continue
-            
-            # Headers
-            if line.startswith('# '):
-                content.append(('h1', line[2:]))
-            elif line.startswith('## '):
-                content.append(('h2', line[3:]))
-            elif line.startswith('### '):
-                content.append(('h3', line[4:]))
-            
-            # Tables (markdown table detection - handles both | column | and column | formats)
-            elif '|' in line:
-                table_rows = []
-                # Check if this looks like a table (has multiple pipes or starts with pipe)
-                pipe_count = line.count('|')
-                if pipe_count >= 1:
-                    while i < len(lines) and '|' in lines[i].strip():
-                        current_line = lines[i].strip()
-                        
-                        # Parse row - handle both |col|col| and col|col formats
-                        if current_line.startswith('|') and current_line.endswith('|'):
-                            # Format: | col1 | col2 |
-                            row = [cell.strip() for cell in current_line.split('|')[1:-1]]
-                        else:
-                            # Format: col1 | col2 (no leading/trailing pipes)
-                            row = [cell.strip() for cell in current_line.split('|')]
-                        
-                        # Skip separator rows (lines with only dashes, colons, pipes)
-                        if row and not all(re.match(r'^[-:\s]+$', cell) for cell in row):
-                            # Clean ALL markdown formatting from cells
-                            cleaned_row = []
-                            for cell in row:
-                                if cell:  # Skip empty cells
-                                    # Remove bold markers (both ** and __)
-                                    cell = re.sub(r'\*\*(.+?)\*\*', r'\1', cell)
-                                    cell = re.sub(r'__(.+?)__', r'\1', cell)
-                                    # Remove italic markers (both * and _)
-                                    cell = re.sub(r'\*(.+?)\*', r'\1', cell)
-                                    cell = re.sub(r'_(.+?)_', r'\1', cell)
-                                    # Remove inline code markers
-                                    cell = re.sub(r'`(.+?)`', r'\1', cell)
-                                    # Remove links [text](url)
-                                    cell = re.sub(r'\[([^\]]+?)\]\([^\)]+?\)', r'\1', cell)
-                                    cleaned_row.append(cell)
-                            if cleaned_row:  # Only add if row has content
-                                table_rows.append(cleaned_row)
-                        i += 1
-                    if table_rows:
-                        content.append(('table', table_rows))
-                    i -= 1
-            
-            # Callouts (lines starting with > )
-            elif line.startswith('> '):
-                callout_text = line[2:]
-                # Collect multi-line callouts
-                while i + 1 < len(lines) and lines[i + 1].strip().startswith('> '):
-                    i += 1
-                    callout_text += ' ' + lines[i].strip()[2:]
-                content.append(('callout', callout_text))
-            
-            # Lists
-            elif line.startswith('- ') or line.startswith('* ') or line.startswith('+ '):
-                # Clean markdown formatting from list items
-                cleaned_line = re.sub(r'\*\*(.+?)\*\*', r'\1', line)  # Remove bold
-                cleaned_line = re.sub(r'\*(.+?)\*', r'\1', cleaned_line)  # Remove italic
-                cleaned_line = re.sub(r'`(.+?)`', r'\1', cleaned_line)  # Remove code
-                content.append(('body', cleaned_line))
-            
-            # Regular paragraphs
-            else:
-                # Skip lines that are just bullets with dashes like "• --"
-                if re.match(r'^[•\-]\s*--\s*$', line):
-                    i += 1
-                    continue
-                
-                # Clean markdown formatting from paragraphs
-                # Remove ALL markdown markers - they should not appear in PDF
-                cleaned_line = re.sub(r'\*\*(.+?)\*\*', r'\1', line)  # Remove bold markers
-                cleaned_line = re.sub(r'\*(.+?)\*', r'\1', cleaned_line)  # Remove italic markers
-                cleaned_line = re.sub(r'`(.+?)`', r'\1', cleaned_line)  # Remove code markers
-                
-                # COMPREHENSIVE: Remove backslash escapes before special characters
-                cleaned_line = re.sub(r'\\([~=\-+*_\[\](){}|<>$#@!&^%])', r'\1', cleaned_line)
-                
-                # Fix escaped numbered lists like "1\." → "1."
-                cleaned_line = re.sub(r'(\d+)\\.', r'\1.', cleaned_line)
-                
-                # Skip if line became empty after cleaning
-                if not cleaned_line.strip():
-                    i += 1
-                    continue
-                    
-                content.append(('body', cleaned_line))
-            
-            i += 1
+            Document (see document_ir.py); title/subtitle are copied into self.metadata
         
-        return content
+        Raises:
+            BudgetExceeded: If the document goes over the generator's budget
+        """
+        document = parse_markdown_cached(markdown_text, budget=self.budget)
+        self.metadata.update(document.metadata)
+        return document
     
     def add_cover_page(self, title=None, subtitle=None, theme='formal'):
         """
@@ -179,8 +156,8 @@ class SparkEnPDFGenerator:
             subtitle: Cover page subtitle
             theme: 'formal' (purple) or 'creative' (yellow)
         """
-        title = title or self.metadata.get('title', 'Untitled Document')
-        subtitle = subtitle or self.metadata.get('subtitle', '')
+        title = sanitize_text(title or self.metadata.get('title', 'Untitled Document'))
+        subtitle = sanitize_text(subtitle or self.metadata.get('subtitle', ''))
         
         self.has_cover = True
         self.cover_data = {
@@ -195,17 +172,10 @@ class SparkEnPDFGenerator:
             return []
         
         toc_elements = []
+        styles = self.config.styles
         
         # Add TOC title
-        toc_title_style = ParagraphStyle(
-            'TOCTitle',
-            fontName=Typography.DISPLAY_FONT,
-            fontSize=Typography.H1_SIZE,
-            textColor=BrandColors.BRAND_PURPLE,
-            leading=Typography.H1_SIZE * Typography.H1_LEADING,
-            spaceAfter=Layout.PARAGRAPH_SPACING
-        )
-        toc_title = Paragraph('<b>TABLE OF CONTENTS</b>', toc_title_style)
+        toc_title = Paragraph('<b>TABLE OF CONTENTS</b>', styles['toc_title'])
         toc_elements.append(toc_title)
         toc_elements.append(Spacer(1, 0.3 * inch))
         
@@ -217,46 +187,19 @@ class SparkEnPDFGenerator:
         for level, text, _ in self.toc_entries:
             # Define style based on level
             if level == 0:  # H1
-                style = ParagraphStyle(
-                    'TOC_H1_text',
-                    fontName=Typography.DISPLAY_FONT,
-                    fontSize=12,
-                    textColor=BrandColors.BRAND_PURPLE,
-                    leading=15
-                )
                 display_text = text.upper()
                 indent = ""
             elif level == 1:  # H2
-                style = ParagraphStyle(
-                    'TOC_H2_text',
-                    fontName=Typography.BODY_FONT,
-                    fontSize=11,
-                    textColor=BrandColors.TEXT_BLACK,
-                    leading=14
-                )
                 display_text = text
                 indent = "&nbsp;&nbsp;&nbsp;"
             else:  # H3
-                style = ParagraphStyle(
-                    'TOC_H3_text',
-                    fontName=Typography.BODY_FONT,
-                    fontSize=10,
-                    textColor=BrandColors.TEXT_BLACK,
-                    leading=13
-                )
                 display_text = text
                 indent = "&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;"
+            style_level = min(level, 2) + 1
             
             # Create table row with heading and page number
-            heading_para = Paragraph(f'{indent}{display_text}', style)
-            page_style = ParagraphStyle(
-                f'TOC_page_{level}',
-                fontName=Typography.BODY_FONT if level > 0 else Typography.DISPLAY_FONT,
-                fontSize=11 if level ==1 else (10 if level == 2 else 12),
-                textColor=BrandColors.BRAND_PURPLE if level == 0 else BrandColors.TEXT_BLACK,
-                alignment=TA_RIGHT
-            )
-            page_para = Paragraph(f'<b>{page_counter}</b>', page_style)
+            heading_para = Paragraph(f'{indent}{escape_markup(display_text)}', styles[f'toc_h{style_level}'])
+            page_para = Paragraph(f'<b>{page_counter}</b>', styles[f'toc_page_h{style_level}'])
             
             toc_data.append([heading_para, page_para])
             
@@ -265,7 +208,7 @@ class SparkEnPDFGenerator:
             page_counter += 1
         
         # Create table with two columns
-        toc_table = Table(toc_data, colWidths=[Layout.CONTENT_WIDTH - 50, 50])
+        toc_table = Table(toc_data, colWidths=[self.config.layout.CONTENT_WIDTH - 50, 50])
         toc_table.setStyle(TableStyle([
             ('ALIGN', (0, 0), (0, -1), 'LEFT'),
             ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
@@ -286,7 +229,32 @@ class SparkEnPDFGenerator:
         Args:
             markdown_text: Raw markdown text
         """
-        parsed = self.parse_markdown(markdown_text)
+        self.add_document(self.parse_markdown(markdown_text))
+    
+    def add_csv(self, stream, delimiter=','):
+        """
+        Add a CSV/TSV export as one branded table
+        
+        Rows are parsed and laid out a page at a time during generate(), with
+        the header repeated on every page, so the input is never held whole.
+        
+        Args:
+            stream: Binary file object, read during generate()
+            delimiter: ',' for CSV, '\\t' for TSV
+        """
+        simple = self.draft or self._reduced('plain-chrome')
+        table = create_table(stream, delimiter, simple=simple, config=self.config, budget=self.budget)
+        if table is not None:
+            self.story.append(table)
+    
+    def add_document(self, document):
+        """
+        Render a parsed Document into the story
+        
+        Args:
+            document: Document IR (treated as read-only)
+        """
+        self.metadata.update(document.metadata)
         
         # Add cover page if we found title metadata and no cover exists yet
         # OR update existing cover with parsed title if it's better
@@ -300,55 +268,68 @@ class SparkEnPDFGenerator:
                 if self.metadata.get('subtitle'):
                     self.cover_data['subtitle'] = self.metadata['subtitle']
         
+        config = self.config
+        Layout = config.layout
+        link_color = config.colors.DEEP_COGNITIVE_PURPLE_HEX
+        
         # Convert parsed content to PDF components
         # If TOC is enabled, track headings for later
-        for content_type, content_data in parsed:
-            if content_type == 'h1':
+        for block in document.blocks:
+            first = len(self.story)
+            if block.kind == 'h':
                 # SPECIAL CASE: Appendix always starts on a new page
-                if 'appendix' in content_data.lower():
+                if 'appendix' in block.text.lower():
                     self.story.append(PageBreak())
                 
-                self.story.append(HeadingComponent.create_h1(content_data))
-                self.story.append(Spacer(1, Layout.PARAGRAPH_SPACING / 2))
-                # Track for TOC (page number will be calculated later)
-                if self.include_toc:
-                    self.toc_entries.append((0, content_data, None))
-            
-            elif content_type == 'h2':
-                # SPECIAL CASE: Appendix always starts on a new page
-                if 'appendix' in content_data.lower():
-                    self.story.append(PageBreak())
+                if block.level == 1:
+                    heading = HeadingComponent.create_h1(block.text, config)
+                    spacing = Layout.PARAGRAPH_SPACING / 2
+                elif block.level == 2:
+                    heading = HeadingComponent.create_h2(block.text, config)
+                    spacing = Layout.PARAGRAPH_SPACING / 2
+                else:
+                    heading = HeadingComponent.create_h3(block.text, config)
+                    spacing = Layout.PARAGRAPH_SPACING / 4
+                self.story.append(heading)
+                self.story.append(Spacer(1, spacing))
                 
-                self.story.append(HeadingComponent.create_h2(content_data))
-                self.story.append(Spacer(1, Layout.PARAGRAPH_SPACING / 2))
-                # Track for TOC
+                # Track for TOC - the heading flowable lets a doc template find its page
                 if self.include_toc:
-                    self.toc_entries.append((1, content_data, None))
+                    self.toc_entries.append((block.level - 1, block.text, heading))
+                self.heading_index.register(heading, block.level, block.text, block.start)
             
-            elif content_type == 'h3':
-                # SPECIAL CASE: Appendix always starts on a new page
-                if 'appendix' in content_data.lower():
-                    self.story.append(PageBreak())
-                
-                self.story.append(HeadingComponent.create_h3(content_data))
-                self.story.append(Spacer(1, Layout.PARAGRAPH_SPACING / 4))
-                # Track for TOC
-                if self.include_toc:
-                    self.toc_entries.append((2, content_data, None))
+            elif block.kind == 'p':
+                markup = to_paragraph_markup(block.text, link_color)
+                self.story.append(BodyTextComponent.create(markup, config=config))
             
-            elif content_type == 'body':
-                self.story.append(BodyTextComponent.create(content_data))
+            elif block.kind == 'l':
+                items = [to_paragraph_markup(item, link_color) for item in block.items]
+                self.story.append(ListComponent.create(items, block.start_number, config, block.delimiter))
             
-            elif content_type == 'table':
-                table = TableComponent.create(content_data)
+            elif block.kind == 't':
+                rows = [[to_paragraph_markup(cell, link_color) for cell in row] for row in block.rows]
+                table = TableComponent.create(rows, simple=self.draft or self._reduced('plain-chrome'),
+                                              config=config)
                 if table:
                     self.story.append(table)
                     self.story.append(Spacer(1, Layout.PARAGRAPH_SPACING))
             
-            elif content_type == 'callout':
-                callout_elements = CalloutComponent.create(content_data)
+            elif block.kind == 'c':
+                callout_elements = CalloutComponent.create(to_paragraph_markup(block.text, link_color),
+                                                           config=config)
                 for element in callout_elements:
                     self.story.append(element)
+            
+            elif block.kind == 'i':
+                path = resolve_image_path(block.src, self.image_dir)
+                if path is None:
+                    print(f"Image not found or not allowed: {block.src}", file=sys.stderr)
+                dpi = LOW_QUALITY_DPI if self._reduced('low-images') else None
+                self.story.extend(ImageComponent.create(path, block.alt, placeholder=self.draft,
+                                                        config=config, dpi=dpi))
+            
+            if self.profiler is not None:
+                self.profiler.track_block(block, self.story[first:])
     
     def _add_page_decorations(self, canvas_obj, doc):
         """
@@ -368,37 +349,42 @@ class SparkEnPDFGenerator:
         actual_page = page_num - 1 if self.has_cover else page_num
         total_pages = doc.page - 1 if self.has_cover else doc.page
         
-        # Get logo paths
-        logo_dir = os.path.join(os.path.dirname(__file__), '..', 'public', 'logos')
-        horizontal_logo = os.path.join(logo_dir, 'sparken-logo-horizontal-white.png')
-        vertical_logo = os.path.join(logo_dir, 'sparken logo-vertical-cropped.png')
+        # Get logo paths (None when the asset is missing)
+        horizontal_logo = self.config.assets['horizontal_logo']
+        vertical_logo = self.config.assets['vertical_logo']
+        
+        # Drafts skip the watermark grid and logo images - neither affects layout
+        if self.draft or self._reduced('plain-chrome'):
+            vertical_logo = horizontal_logo = None
+        elif self._reduced('no-watermark'):
+            vertical_logo = None
         
         # Add watermark first (so it's behind content)
-        WatermarkComponent.create(canvas_obj, vertical_logo)
+        WatermarkComponent.create(canvas_obj, vertical_logo, self.config)
         
         # Add header
-        HeaderComponent.create(canvas_obj, horizontal_logo, actual_page)
+        HeaderComponent.create(canvas_obj, horizontal_logo, actual_page, self.config)
         
         # Add footer
-        FooterComponent.create(canvas_obj, actual_page, total_pages)
+        FooterComponent.create(canvas_obj, actual_page, total_pages, self.config)
     
     def _draw_cover_page(self, canvas_obj):
         """Draw the cover page"""
         if not self.has_cover:
             return
         
-        logo_dir = os.path.join(os.path.dirname(__file__), '..', 'public', 'logos')
         theme = self.cover_data.get('theme', 'formal')
         
         # Use white logo for both themes for consistency
-        logo_path = os.path.join(logo_dir, 'sparken-logo-horizontal-white.png')
+        logo_path = None if self.draft or self._reduced('plain-chrome') else self.config.assets['horizontal_logo']
         
         CoverPageComponent.create(
             canvas_obj,
             self.cover_data['title'],
             self.cover_data.get('subtitle', ''),
             theme,
-            logo_path
+            logo_path,
+            self.config
         )
     
     def generate(self):
@@ -409,14 +395,19 @@ class SparkEnPDFGenerator:
             PDF bytes (if output_path is BytesIO) or None (if writing to file)
         """
         # Insert TOC at the beginning of story if enabled
-        if self.include_toc and self.toc_entries:
+        if self.include_toc and self.toc_entries and not self._reduced('no-toc'):
             toc_elements = self._create_simple_toc()
             self.story = toc_elements + self.story
         
         # Create document
-        doc = SimpleDocTemplate(
+        Layout = self.config.layout
+        doc = _PageLimitDocTemplate(
             self.output_path,
-            pagesize=letter,
+            max_pages=self.max_pages,
+            budget=self.budget,
+            heading_index=self.heading_index,
+            pagesize=self.config.pagesize,
+            invariant=1 if self.deterministic else None,
             leftMargin=Layout.MARGIN_LEFT,
             rightMargin=Layout.MARGIN_RIGHT,
             topMargin=Layout.MARGIN_TOP + Layout.HEADER_HEIGHT,
@@ -424,6 +415,7 @@ class SparkEnPDFGenerator:
         )
         
         # Build PDF
+        self.heading_index.page_offset = 1 if self.has_cover else 0
         if self.has_cover:
             # Create a custom canvas for cover page
             def add_decorations(canvas_obj, doc):
@@ -439,6 +431,8 @@ class SparkEnPDFGenerator:
             doc.build(self.story, onFirstPage=self._add_page_decorations, 
                      onLaterPages=self._add_page_decorations)
         
+        self.page_count = doc.page
+        
         # Return bytes if using BytesIO
         if isinstance(self.output_path, BytesIO):
             return self.output_path.getvalue()
@@ -446,32 +440,110 @@ class SparkEnPDFGenerator:
         return None
 
 
-def main():
-    """Main entry point for command-line usage"""
-    # Read input from stdin or file
-    if len(sys.argv) > 1 and sys.argv[1] != '-':
-        input_file = sys.argv[1]
-        with open(input_file, 'r', encoding='utf-8') as f:
-            markdown_text = f.read()
-        metadata_arg_index = 2
-    else:
-        # Read from stdin (either no args or first arg is '-')
-        markdown_text = sys.stdin.read()
-        metadata_arg_index = 2
+class RenderResult:
+    """A rendered PDF plus the facts callers report or cache on
     
-    # Parse metadata if JSON is provided
-    metadata = {}
-    if len(sys.argv) > metadata_arg_index:
-        try:
-            metadata = json.loads(sys.argv[metadata_arg_index])
-        except Exception as e:
-            print(f"Warning: Could not parse metadata: {e}", file=sys.stderr)
-            pass
+    timings maps render phases ('parse', 'layout') to seconds; profile is the
+    LayoutProfiler when the render was profiled; headings is the HeadingIndex;
+    layout_cache counts the render's layout cache hits, misses and time saved;
+    quality is the QUALITY_LEVELS step the PDF was rendered at.
+    """
     
-    # Generate PDF
-    output = BytesIO()
+    __slots__ = ('pdf', 'pages', 'content_hash', 'timings', 'profile', 'headings', 'layout_cache', 'quality')
+    
+    def __init__(self, pdf, pages, timings=None, profile=None, headings=None, layout_cache=None,
+                 quality='full'):
+        self.pdf = pdf
+        self.pages = pages
+        self.timings = timings or {}
+        self.profile = profile
+        self.headings = headings
+        self.layout_cache = layout_cache
+        self.quality = quality
+        # Stable across runs for deterministic renders - usable as an ETag or dedupe key
+        self.content_hash = hashlib.sha256(pdf).hexdigest()
+    
+    def to_dict(self):
+        report = {'sha256': self.content_hash, 'bytes': len(self.pdf), 'pages': self.pages}
+        if self.profile is not None:
+            report['profile'] = self.profile.to_dict()
+        if self.layout_cache is not None:
+            report['layoutCache'] = self.layout_cache
+        if self.quality != 'full':
+            report['quality'] = self.quality
+        return report
+    
+    def write(self, output_path=None, report_path=None, headings_path=None):
+        """
+        Hand the PDF to the command-line caller
+        
+        By default the PDF goes to stdout. With output_path it is written
+        straight to that file instead (a tmpfs path, or /dev/fd/N for a memfd
+        the caller passed in) and stdout gets only the one-line JSON report
+        with the file's path and size, so no PDF bytes pass through the pipe.
+        
+        Args:
+            output_path: File the caller reads the PDF from (None for stdout)
+            report_path: Optional file for the JSON report
+            headings_path: Optional file for the heading index sidecar (level,
+                           text, page, printed page label and source line)
+        
+        Raises:
+            OSError: If a file cannot be written
+        """
+        report = self.to_dict()
+        if output_path:
+            with open(output_path, 'wb') as f:
+                f.write(self.pdf)
+            report['path'] = output_path
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f)
+        if headings_path and self.headings is not None:
+            with open(headings_path, 'w', encoding='utf-8') as f:
+                f.write(self.headings.to_json())
+        if output_path:
+            sys.stdout.write(json.dumps(report) + '\n')
+        else:
+            sys.stdout.buffer.write(self.pdf)
+
+
+def render_pdf(markdown_text, metadata=None, budget=None):
+    """
+    Render markdown to PDF with the standard metadata options
+    
+    Every call builds its own generator and output buffer and uses a read-only
+    shared BrandConfig, so renders can run concurrently in one process.
+    
+    Args:
+        markdown_text: Raw markdown text. With inputFormat 'csv' or 'tsv', the
+                       export instead - a binary stream (read while the PDF is
+                       laid out), bytes or str
+        metadata: Options dict (title, subtitle, theme, includeToc, draft,
+                  draftPages, pageSize, colors, deterministic, imageDir, profile,
+                  inputFormat, linearize, quality; headingsPath is handled by the CLI)
+        budget: RenderBudget (defaults to a fresh one with the standard RenderLimits)
+    
+    Returns:
+        RenderResult
+    
+    Raises:
+        BudgetExceeded: If the render goes over its budget
+        csv.Error: If CSV/TSV input is malformed
+    """
+    metadata = metadata or {}
+    budget = budget or RenderLimits().start()
+    tabular = input_format(metadata)
+    config = get_config(metadata.get('pageSize', 'letter'), metadata.get('colors'))
     include_toc = metadata.get('includeToc', True)  # Default to True
-    generator = SparkEnPDFGenerator(output, include_toc=include_toc)
+    draft = bool(metadata.get('draft', False))
+    max_pages = metadata.get('draftPages') if draft else None
+    profiler = LayoutProfiler() if metadata.get('profile') else None
+    generator = SparkEnPDFGenerator(BytesIO(), include_toc=include_toc, draft=draft,
+                                    max_pages=max_pages, config=config, budget=budget,
+                                    deterministic=bool(metadata.get('deterministic', False)),
+                                    image_dir=metadata.get('imageDir'), profiler=profiler,
+                                    quality=metadata.get('quality', 'full'))
     
     # Add cover page if metadata provided
     if metadata.get('title'):
@@ -482,18 +554,140 @@ def main():
             metadata.get('theme', 'formal')
         )
     
-    # Add content
-    generator.add_content_from_markdown(markdown_text)
+    # Add content (parse and build flowables)
+    cache_stats = layout_cache.stats()
+    started = time.perf_counter()
+    if tabular:
+        if isinstance(markdown_text, str):
+            markdown_text = markdown_text.encode('utf-8')
+        if isinstance(markdown_text, bytes):
+            markdown_text = BytesIO(markdown_text)
+        generator.add_csv(markdown_text, DELIMITERS[tabular])
+    else:
+        generator.add_content_from_markdown(markdown_text)
+    parsed = time.perf_counter()
     
     # Debug: print final cover title
     if generator.has_cover:
         print(f"Final cover title: {generator.cover_data.get('title')}", file=sys.stderr)
     
-    # Generate and output
     pdf_bytes = generator.generate()
+    timings = {'parse': parsed - started, 'layout': time.perf_counter() - parsed}
+    if metadata.get('linearize'):
+        laid_out = time.perf_counter()
+        pdf_bytes = linearize_or_keep(pdf_bytes)
+        timings['linearize'] = time.perf_counter() - laid_out
+    return RenderResult(pdf_bytes, generator.page_count, timings, profiler, generator.heading_index,
+                        stats_delta(cache_stats, layout_cache.stats()), generator.quality)
+
+
+def main():
+    """Main entry point for command-line usage"""
+    limits = RenderLimits()
+    budget = limits.start()
+    cap_address_space(limits)
+    
+    try:
+        _run(budget)
+    except BudgetExceeded as e:
+        # One JSON line the caller can parse, and a distinct exit code
+        print(e.to_json(), file=sys.stderr)
+        sys.exit(BUDGET_EXIT_CODE)
+    except MemoryError:
+        print(BudgetExceeded('max_rss_mb', None, limits.max_rss_mb).to_json(), file=sys.stderr)
+        sys.exit(BUDGET_EXIT_CODE)
+
+
+def _run(budget):
+    """Read input and metadata from the command line and write the output to stdout"""
+    input_file = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != '-' else None
+    
+    # Parse metadata if JSON is provided
+    metadata = {}
+    metadata_arg_index = 2
+    if len(sys.argv) > metadata_arg_index:
+        try:
+            metadata = json.loads(sys.argv[metadata_arg_index])
+        except Exception as e:
+            print(f"Warning: Could not parse metadata: {e}", file=sys.stderr)
+            pass
+    
+    # CSV/TSV exports are streamed into the layout instead of being read up front
+    tabular = input_format(metadata, input_file)
+    if tabular:
+        metadata['inputFormat'] = tabular  # When it came from the file name
+        if metadata.get('format', 'pdf') != 'pdf':
+            print("Error: CSV/TSV input can only be rendered as a PDF", file=sys.stderr)
+            sys.exit(1)
+        if input_file:
+            budget.check_input_bytes(os.path.getsize(input_file))
+            with open(input_file, 'rb') as f:
+                _render_and_write(f, metadata, budget)
+        else:
+            _render_and_write(sys.stdin.buffer, metadata, budget)
+        return
+    
+    # Read input from stdin or file, stopping as soon as it is over the input budget
+    if input_file:
+        budget.check_input_bytes(os.path.getsize(input_file))
+        with open(input_file, 'rb') as f:
+            markdown_text = read_limited(f, budget)
+        image_dir = os.path.dirname(os.path.abspath(input_file))
+    else:
+        # Read from stdin (either no args or first arg is '-')
+        markdown_text = read_limited(sys.stdin.buffer, budget)
+        # Stdin is how the web bridge sends uploads: without an explicit imageDir,
+        # images are disabled rather than read from the app's working directory
+        image_dir = None
+    
+    # Images resolve next to the input file
+    metadata.setdefault('imageDir', image_dir)
+    
+    # Previews and estimates skip ReportLab layout entirely and work straight from the IR
+    output_format = metadata.get('format', 'pdf')
+    if output_format != 'pdf':
+        document = parse_markdown_cached(markdown_text, budget=budget)
+        if output_format == 'html':
+            rendered = render_html(document, metadata.get('title'), metadata.get('subtitle'))
+        elif output_format == 'text':
+            rendered = render_text(document)
+        elif output_format == 'ir':
+            rendered = document.to_json()
+        elif output_format == 'estimate':
+            rendered = json.dumps(estimate_layout(document, metadata).to_dict())
+        else:
+            print(f"Error: Unknown output format: {output_format}", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.buffer.write(rendered.encode('utf-8'))
+        return
+    
+    _render_and_write(markdown_text, metadata, budget)
+
+
+def _render_and_write(source, metadata, budget):
+    """Render for the CLI and hand the PDF and its report to the caller"""
+    # Generate PDF
+    try:
+        result = render_pdf(source, metadata, budget)
+    except ValueError as e:  # Unknown pageSize or color override
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except csv.Error as e:
+        print(f"Error: Invalid CSV/TSV input: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Slowest flowables first, with the markdown lines they came from
+    if result.profile is not None:
+        print(result.profile.report(), file=sys.stderr)
+    print(format_stats(result.layout_cache), file=sys.stderr)
     
-    # Write to stdout (binary)
-    sys.stdout.buffer.write(pdf_bytes)
+    # PDF to stdout or outputPath, plus the optional JSON report (content hash,
+    # size, page count, profile, layout cache) for the caller
+    try:
+        result.write(metadata.get('outputPath'), metadata.get('reportPath'), metadata.get('headingsPath'))
+    except OSError as e:
+        print(f"Error: Could not write output: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,140 @@
+"""
+Sparken Text Sanitizer
+Single-pass cleanup of characters the base-14 fonts cannot draw, so they
+don't render as boxes
+"""
+
+import codecs
+import re
+import unicodedata
+
+from reportlab.pdfbase.rl_codecs import RL_Codecs
+
+
+# ============================================================================
+# SUPPORTED CHARACTERS
+# ============================================================================
+
+# Marks unencodable characters with NUL ('?' itself is missing from some font encodings)
+codecs.register_error('sparken-nul', lambda error: (b'\0' * (error.end - error.start), error.end))
+
+
+def _font_repertoire():
+    """
+    Characters the standard fonts can draw: WinAnsi for Helvetica/Times/Courier,
+    plus the Symbol and ZapfDingbats fonts ReportLab substitutes for missing glyphs
+    """
+    RL_Codecs.register()
+    # The codecs map several code points onto one glyph (e.g. U+03A9 and U+2126 are
+    # both Omega), so test every BMP character rather than decoding the 256 bytes
+    candidates = ''.join(chr(code) for code in range(0x80, 0x10000) if not 0xD800 <= code < 0xE000)
+    chars = set(chr(code) for code in range(0x80))
+    for encoding in ('winansi', 'symbol', 'zapfdingbats'):
+        # Single-byte codecs, so bytes line up with characters
+        encoded = candidates.encode(encoding, 'sparken-nul')
+        chars.update(char for char, byte in zip(candidates, encoded) if byte)
+    return chars
+
+
+SUPPORTED = frozenset(_font_repertoire())
+
+# Runs of characters cp1252 could not encode (or literal question marks)
+_REPLACED_RUN = re.compile(rb'\?+')
+
+
+# ============================================================================
+# TRANSLATION TABLE
+# ============================================================================
+
+# Explicit replacements for characters outside the repertoire. Smart quotes,
+# en/em dashes, bullets and the ellipsis are WinAnsi characters and pass through;
+# their look-alikes are folded onto them. Common arrows come from the Symbol font.
+_REPLACEMENTS = {
+    # Arrows
+    '⟶': '->', '⟹': '=>', '⟵': '<-', '⟸': '<=', '⟷': '<->', '⟺': '<=>',
+    '↗': '->', '↘': '->', '↦': '->', '⇢': '->', '⇨': '->', '↝': '->',
+    '↖': '<-', '↙': '<-', '⇠': '<-', '⇦': '<-',
+    '⇧': '^', '⇡': '^', '⇩': 'v', '⇣': 'v',
+    # Dashes and minus signs
+    '‐': '-', '‑': '-', '‒': '–', '―': '—', '⁃': '-', '﹣': '-', '－': '-',
+    # Quotes and primes
+    '‛': '‘', '‟': '“', '‵': "'", '‶': '"', '″': '"', '‴': "'''",
+    '❮': '‹', '❯': '›', '「': '“', '」': '”', '『': '“', '』': '”',
+    # Bullets
+    '◦': '•', '▪': '•', '▫': '•', '‣': '•', '∙': '•', '⦁': '•', '⁌': '•', '⁍': '•',
+    '◘': '•', '◉': '•', '○': '•', '□': '•', '☐': '•', '☑': '✓', '☒': '✗',
+    # Ellipsis and spacing
+    '⋯': '…', '‥': '..', '․': '.',
+    '\u2002': ' ', '\u2003': ' ', '\u2007': ' ', '\u2008': ' ', '\u2009': ' ',
+    '\u200a': ' ', '\u202f': ' ', '\u205f': ' ', '\u3000': ' ',
+    '\u2028': '\n', '\u2029': '\n',
+    # Invisible characters
+    '\u200b': '', '\u200c': '', '\u200d': '', '\u2060': '', '\ufeff': '',
+}
+
+
+def _fallback(char):
+    """
+    Replacement for a character with no table entry: its compatibility
+    decomposition without combining marks (e.g. 'ﬁ' -> 'fi', 'ő' -> 'o'), or
+    nothing if that still cannot be drawn
+    """
+    decomposed = unicodedata.normalize('NFKD', char)
+    if decomposed == char:
+        return ''
+    kept = []
+    for part in decomposed:
+        if part in SUPPORTED:
+            kept.append(part)
+        elif part in _REPLACEMENTS:
+            kept.append(_REPLACEMENTS[part])
+        elif not unicodedata.combining(part):
+            return ''
+    return ''.join(kept)
+
+
+class _TranslationTable(dict):
+    """str.translate table that fills in missing characters from the fallback"""
+
+    def __missing__(self, code):
+        char = chr(code)
+        replacement = code if char in SUPPORTED else _fallback(char)
+        self[code] = replacement
+        return replacement
+
+
+_TABLE = _TranslationTable(str.maketrans(_REPLACEMENTS))
+
+
+def sanitize_text(text):
+    """
+    Replace characters the standard fonts cannot draw, in one pass
+
+    ASCII text is returned as-is. Otherwise the text is encoded to cp1252 once
+    (in C, one byte per character, unencodable characters coming out as '?')
+    and only the '?' runs go through the translation table, which is much
+    faster than translating the whole text. Real question marks map to
+    themselves.
+
+    Args:
+        text: Markdown or plain text
+
+    Returns:
+        Text using only characters the PDF fonts can draw
+    """
+    if text.isascii():
+        return text
+    encoded = text.encode('cp1252', 'replace')
+    start = encoded.find(b'?')
+    if start < 0:
+        return text
+    parts = []
+    position = 0
+    while start >= 0:  # bytes.find scans far faster than a regex search
+        end = _REPLACED_RUN.match(encoded, start).end()
+        parts.append(text[position:start])
+        parts.append(text[start:end].translate(_TABLE))
+        position = end
+        start = encoded.find(b'?', end)
+    parts.append(text[position:])
+    return ''.join(parts)
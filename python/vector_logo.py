@@ -0,0 +1,393 @@
+"""
+Sparken Vector Logo
+Converts the SVG logo into a ReportLab drawing once per process and draws it
+through one PDF form per document, so every page reuses the same few
+hundred bytes of vector operators instead of an embedded raster image
+"""
+
+import math
+import os
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, Group, Rect, Circle, Ellipse, Line, Polygon, Path, String
+from reportlab.lib import colors as reportlab_colors
+from reportlab.pdfbase import pdfmetrics
+
+
+_SVG_NS = '{http://www.w3.org/2000/svg}'
+
+# Path data tokens: a command letter or a number
+_PATH_TOKEN = re.compile(r'[MmLlHhVvCcSsQqZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+_TRANSFORM = re.compile(r'(matrix|translate|scale|rotate)\s*\(([^)]*)\)')
+
+
+# ============================================================================
+# SVG CONVERSION
+# ============================================================================
+
+def _numbers(text):
+    return [float(value) for value in _NUMBER.findall(text or '')]
+
+
+def _length(value, default=0.0):
+    """SVG length in user units ('12', '12px'); percentages and other units are not supported"""
+    numbers = _numbers(value)
+    return numbers[0] if numbers else default
+
+
+def _multiply(a, b):
+    """Compose two affine transforms (a applied after b)"""
+    return (a[0] * b[0] + a[2] * b[1], a[1] * b[0] + a[3] * b[1],
+            a[0] * b[2] + a[2] * b[3], a[1] * b[2] + a[3] * b[3],
+            a[0] * b[4] + a[2] * b[5] + a[4], a[1] * b[4] + a[3] * b[5] + a[5])
+
+
+def _transform(text):
+    """Parse an SVG transform attribute into a 6-tuple matrix"""
+    matrix = (1, 0, 0, 1, 0, 0)
+    for name, args in _TRANSFORM.findall(text or ''):
+        values = _numbers(args)
+        if name == 'matrix' and len(values) == 6:
+            step = tuple(values)
+        elif name == 'translate' and values:
+            step = (1, 0, 0, 1, values[0], values[1] if len(values) > 1 else 0)
+        elif name == 'scale' and values:
+            step = (values[0], 0, 0, values[1] if len(values) > 1 else values[0], 0, 0)
+        elif name == 'rotate' and values:
+            angle = math.radians(values[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            step = (cos, sin, -sin, cos, 0, 0)
+            if len(values) == 3:
+                cx, cy = values[1], values[2]
+                step = _multiply((1, 0, 0, 1, cx, cy), _multiply(step, (1, 0, 0, 1, -cx, -cy)))
+        else:
+            continue
+        matrix = _multiply(matrix, step)
+    return matrix
+
+
+def _style(element, inherited):
+    """Resolve the paint properties of an element, including a style="" attribute"""
+    style = dict(inherited)
+    properties = dict(element.attrib)
+    for declaration in element.get('style', '').split(';'):
+        if ':' in declaration:
+            key, value = declaration.split(':', 1)
+            properties[key.strip()] = value.strip()
+    for key in ('fill', 'stroke', 'stroke-width', 'font-family', 'font-size', 'font-weight',
+                'font-style', 'text-anchor', 'letter-spacing'):
+        if key in properties:
+            style[key] = properties[key]
+    return style
+
+
+class _Converter:
+    """Builds a ReportLab Group from the SVG subset used by logo artwork"""
+
+    def __init__(self, recolor, background):
+        """
+        Args:
+            recolor: {'#RRGGBB': Color} replacements for fills and strokes
+            background: Keep a rect covering the whole canvas (False drops it)
+        """
+        self.recolor = recolor
+        self.background = background
+
+    def color(self, value):
+        if not value or value == 'none':
+            return None
+        key = value.strip().upper()
+        if key in self.recolor:
+            return self.recolor[key]
+        try:
+            return reportlab_colors.toColor(value.strip())
+        except ValueError:
+            return None
+
+    def paint(self, shape, style):
+        """Apply fill and stroke to a shape"""
+        shape.fillColor = self.color(style.get('fill', 'black'))
+        shape.strokeColor = self.color(style.get('stroke'))
+        shape.strokeWidth = _length(style.get('stroke-width'), 1.0)
+        return shape
+
+    def element(self, element, style, viewport):
+        """Convert one element (recursively for groups); returns a shape or None"""
+        tag = element.tag.replace(_SVG_NS, '')
+        style = _style(element, style)
+        number = lambda name, default=0.0: _length(element.get(name), default)
+        shape = None
+
+        if tag in ('g', 'svg'):
+            shape = Group()
+            for child in element:
+                converted = self.element(child, style, viewport)
+                if converted is not None:
+                    shape.add(converted)
+        elif tag == 'rect':
+            width, height = number('width'), number('height')
+            x, y = number('x'), number('y')
+            if not self.background and (x, y, width, height) == (0, 0) + viewport:
+                return None
+            radius = number('rx', number('ry'))
+            shape = self.paint(Rect(x, y, width, height, rx=radius, ry=number('ry', radius)), style)
+        elif tag == 'circle':
+            shape = self.paint(Circle(number('cx'), number('cy'), number('r')), style)
+        elif tag == 'ellipse':
+            shape = self.paint(Ellipse(number('cx'), number('cy'), number('rx'), number('ry')), style)
+        elif tag == 'line':
+            shape = self.paint(Line(number('x1'), number('y1'), number('x2'), number('y2')), style)
+        elif tag in ('polygon', 'polyline'):
+            points = _numbers(element.get('points'))
+            shape = self.paint(Polygon(points) if tag == 'polygon' else _polyline(points), style)
+        elif tag == 'path':
+            shape = self.paint(_path(element.get('d', '')), style)
+        elif tag == 'text':
+            shape = self.text(element, style, number)
+
+        if shape is not None and element.get('transform'):
+            shape = Group(shape, transform=_transform(element.get('transform')))
+        return shape
+
+    def text(self, element, style, number):
+        """Text is drawn with the closest standard font; each glyph is flipped upright"""
+        text = ' '.join(''.join(element.itertext()).split())
+        if not text:
+            return None
+        family = style.get('font-family', '').lower()
+        bold = style.get('font-weight', '') in ('bold', 'bolder') or _length(style.get('font-weight'), 400) >= 600
+        italic = style.get('font-style', '') in ('italic', 'oblique')
+        if 'mono' in family or 'courier' in family:
+            base, suffixes = 'Courier', ('', '-Bold', '-Oblique', '-BoldOblique')
+        elif 'serif' in family and 'sans' not in family or 'times' in family:
+            base, suffixes = 'Times', ('-Roman', '-Bold', '-Italic', '-BoldItalic')
+        else:
+            base, suffixes = 'Helvetica', ('', '-Bold', '-Oblique', '-BoldOblique')
+        font = base + suffixes[bold + 2 * italic]
+        size = _length(style.get('font-size'), 16.0)
+        spacing = _length(style.get('letter-spacing'))
+        fill = self.color(style.get('fill', 'black'))
+
+        width = pdfmetrics.stringWidth(text, font, size) + spacing * (len(text) - 1)
+        anchor = style.get('text-anchor', 'start')
+        x = number('x') - (width / 2 if anchor == 'middle' else width if anchor == 'end' else 0)
+        group = Group()
+        # One String per glyph so letter-spacing is honoured
+        for char in (text if spacing else [text]):
+            string = String(0, 0, char, fontName=font, fontSize=size, fillColor=fill)
+            group.add(Group(string, transform=(1, 0, 0, -1, x, number('y'))))
+            x += pdfmetrics.stringWidth(char, font, size) + spacing
+        return group
+
+
+def _polyline(points):
+    path = Path()
+    path.moveTo(points[0], points[1])
+    for index in range(2, len(points) - 1, 2):
+        path.lineTo(points[index], points[index + 1])
+    return path
+
+
+def _path(data):
+    """Convert SVG path data (M/L/H/V/C/S/Q/Z, absolute and relative) into a Path"""
+    tokens = _PATH_TOKEN.findall(data)
+    path = Path()
+    x = y = start_x = start_y = 0.0
+    control = None  # Last cubic control point, for S
+    command = None
+    index = 0
+
+    def take(count):
+        nonlocal index
+        values = [float(value) for value in tokens[index:index + count]]
+        index += count
+        return values
+
+    while index < len(tokens):
+        if tokens[index].isalpha():
+            command = tokens[index]
+            index += 1
+            if command in 'Zz':
+                path.closePath()
+                x, y = start_x, start_y
+                continue
+        relative = command.islower()
+        upper = command.upper()
+        dx, dy = (x, y) if relative else (0.0, 0.0)
+        if upper == 'M':
+            x, y = (lambda p: (p[0] + dx, p[1] + dy))(take(2))
+            path.moveTo(x, y)
+            start_x, start_y = x, y
+            command = 'l' if relative else 'L'  # Further pairs are implicit lineto
+        elif upper == 'L':
+            x, y = (lambda p: (p[0] + dx, p[1] + dy))(take(2))
+            path.lineTo(x, y)
+        elif upper == 'H':
+            x = take(1)[0] + dx
+            path.lineTo(x, y)
+        elif upper == 'V':
+            y = take(1)[0] + dy
+            path.lineTo(x, y)
+        elif upper in ('C', 'S'):
+            if upper == 'C':
+                x1, y1, x2, y2, ex, ey = take(6)
+                x1, y1 = x1 + dx, y1 + dy
+            else:
+                x2, y2, ex, ey = take(4)
+                x1, y1 = (2 * x - control[0], 2 * y - control[1]) if control else (x, y)
+            x2, y2, ex, ey = x2 + dx, y2 + dy, ex + dx, ey + dy
+            path.curveTo(x1, y1, x2, y2, ex, ey)
+            control = (x2, y2)
+            x, y = ex, ey
+            continue
+        elif upper == 'Q':
+            qx, qy, ex, ey = take(4)
+            qx, qy, ex, ey = qx + dx, qy + dy, ex + dx, ey + dy
+            # Quadratic -> cubic
+            path.curveTo(x + 2 * (qx - x) / 3, y + 2 * (qy - y) / 3,
+                         ex + 2 * (qx - ex) / 3, ey + 2 * (qy - ey) / 3, ex, ey)
+            x, y = ex, ey
+        control = None
+    return path
+
+
+def svg_to_drawing(path, recolor=None, background=True, mark_only=False):
+    """
+    Convert an SVG file into a ReportLab Drawing
+
+    Supports the subset logo artwork uses: rect, circle, ellipse, line,
+    polygon/polyline, path, text and nested groups with transforms, fill and
+    stroke. Opacity is ignored so the drawing takes the alpha it is drawn with
+    (the watermark's), and gradients, clipping and embedded images are skipped.
+
+    Args:
+        path: SVG file path
+        recolor: Optional {'#RRGGBB': Color} replacements (e.g. white on purple)
+        background: Keep a rect that fills the whole canvas
+        mark_only: Keep only the first top-level group (the logo mark) and crop to it
+
+    Returns:
+        Drawing
+
+    Raises:
+        ValueError: If the file is not parseable SVG
+    """
+    try:
+        root = ET.parse(path).getroot()
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid SVG {path}: {e}")
+    view_box = _numbers(root.get('viewBox'))
+    width = _length(root.get('width'), view_box[2] if len(view_box) == 4 else 100.0)
+    height = _length(root.get('height'), view_box[3] if len(view_box) == 4 else 100.0)
+
+    # SVG's y axis points down: flip, then map the viewBox onto width x height
+    matrix = (1, 0, 0, -1, 0, height)
+    viewport = (width, height)
+    if len(view_box) == 4 and view_box[2] and view_box[3]:
+        matrix = _multiply(matrix, (width / view_box[2], 0, 0, height / view_box[3],
+                                    -view_box[0] * width / view_box[2], -view_box[1] * height / view_box[3]))
+        viewport = (view_box[2], view_box[3])
+
+    converter = _Converter({key.upper(): value for key, value in (recolor or {}).items()}, background)
+    children = list(root)
+    if mark_only:
+        children = [child for child in children if child.tag.replace(_SVG_NS, '') == 'g'][:1]
+    content = Group(transform=matrix)
+    for child in children:
+        converted = converter.element(child, {}, viewport)
+        if converted is not None:
+            content.add(converted)
+
+    if mark_only:
+        x0, y0, x1, y1 = content.getBounds()
+        drawing = Drawing(x1 - x0, y1 - y0)
+        drawing.add(Group(content, transform=(1, 0, 0, 1, -x0, -y0)))
+    else:
+        drawing = Drawing(width, height)
+        drawing.add(content)
+    return drawing
+
+
+# ============================================================================
+# DRAWING
+# ============================================================================
+
+class VectorLogo:
+    """
+    A converted logo, drawn as a PDF form XObject
+
+    The form is defined on a canvas the first time the logo is drawn there;
+    later pages only reference it, however often the logo repeats.
+    """
+
+    def __init__(self, drawing, name):
+        self.drawing = drawing
+        self.name = name
+        self.width = drawing.width
+        self.height = drawing.height
+
+    def draw(self, canvas_obj, x, y, width, height):
+        """Draw scaled to fit the box, centered, keeping the aspect ratio (like drawImage)"""
+        forms = canvas_obj.__dict__.setdefault('_sparken_logo_forms', set())
+        if self.name not in forms:
+            canvas_obj.beginForm(self.name, 0, 0, self.width, self.height)
+            renderPDF.draw(self.drawing, canvas_obj, 0, 0)
+            canvas_obj.endForm()
+            forms.add(self.name)
+        scale = min(width / self.width, height / self.height)
+        canvas_obj.saveState()
+        canvas_obj.translate(x + (width - self.width * scale) / 2, y + (height - self.height * scale) / 2)
+        canvas_obj.scale(scale, scale)
+        canvas_obj.doForm(self.name)
+        canvas_obj.restoreState()
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_logo(path, name, recolor=None, background=True, mark_only=False):
+    """
+    Convert an SVG logo once per process and file version
+
+    Args:
+        path: SVG file path
+        name: PDF form name (unique per variant)
+        recolor, background, mark_only: See svg_to_drawing
+
+    Returns:
+        VectorLogo, or None if the file is missing or cannot be converted
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    colors = tuple(sorted((source.upper(), color.hexval()) for source, color in (recolor or {}).items()))
+    key = (path, mtime, name, colors, background, mark_only)
+    with _cache_lock:
+        logo = _cache.get(key)
+    if logo is None:
+        try:
+            logo = VectorLogo(svg_to_drawing(path, recolor, background, mark_only), name)
+        except (ValueError, IndexError, TypeError) as e:
+            print(f"Could not convert logo {path}: {e}", file=sys.stderr)
+            return None
+        with _cache_lock:
+            _cache[key] = logo
+    return logo
+
+
+def draw_logo(canvas_obj, logo, x, y, width, height):
+    """Draw a VectorLogo, or a raster image path through drawImage"""
+    if isinstance(logo, VectorLogo):
+        logo.draw(canvas_obj, x, y, width, height)
+    else:
+        canvas_obj.drawImage(logo, x, y, width=width, height=height,
+                             mask='auto', preserveAspectRatio=True)
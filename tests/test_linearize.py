@@ -0,0 +1,66 @@
+"""
+Structural checks for linearized (fast web view) output
+
+Renders the sample markdown in this folder with linearization on and runs
+check_linearized on every result.
+
+    python3 tests/test_linearize.py
+"""
+
+import glob
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'python'))
+
+from linearize import LinearizeError, check_linearized, linearize, linearize_or_keep
+from sparken_pdf_generator import render_pdf
+
+
+SAMPLE_DOCS = sorted(glob.glob(os.path.join(TESTS_DIR, '*.md')))
+
+METADATA = {'title': 'Linearize Check', 'deterministic': True, 'linearize': True}
+
+
+class LinearizeStructureTest(unittest.TestCase):
+
+    def check(self, markdown_text, metadata=METADATA):
+        result = render_pdf(markdown_text, dict(metadata))
+        params = check_linearized(result.pdf)
+        self.assertEqual(params['N'], result.pages)
+        self.assertEqual(params['L'], len(result.pdf))
+        return result
+
+    def test_sample_docs(self):
+        self.assertTrue(SAMPLE_DOCS)
+        for path in SAMPLE_DOCS:
+            with self.subTest(doc=os.path.basename(path)):
+                with open(path, encoding='utf-8') as f:
+                    self.check(f.read())
+
+    def test_sample_docs_draft_and_a4(self):
+        metadata = dict(METADATA, draft=True, pageSize='a4')
+        for path in SAMPLE_DOCS:
+            with self.subTest(doc=os.path.basename(path)):
+                with open(path, encoding='utf-8') as f:
+                    self.check(f.read(), metadata)
+
+    def test_long_document(self):
+        sections = [f"## Section {i}\n\n" + "Body text for the section. " * 80 for i in range(40)]
+        result = self.check("# Long Report\n\n" + "\n\n".join(sections))
+        self.assertGreater(result.pages, 10)
+
+    def test_linearizing_twice_is_rejected(self):
+        result = render_pdf("# Twice\n\nBody", dict(METADATA))
+        with self.assertRaises(LinearizeError):
+            linearize(result.pdf)
+
+    def test_unlinearizable_pdf_is_kept(self):
+        pdf = b'%PDF-1.4\nnot a real document\n%%EOF\n'
+        self.assertEqual(linearize_or_keep(pdf), pdf)
+
+
+if __name__ == '__main__':
+    unittest.main()